@@ -0,0 +1,226 @@
+"""
+aio.py - Asyncio client-side workload engine for pypgio
+Copyright (c) 2024 - Bart Sjerps <bart@dirty-cache.com>
+License: GPLv3+
+
+Alternative for mypgio(): keys are generated on the client and the range
+SELECT/UPDATE statements are sent in pipeline mode, so one process can drive
+many sessions and no server-side functions are needed to run the workload.
+"""
+
+import asyncio, math, random, time, logging
+from datetime import datetime
+
+import psycopg
+from psycopg.sql import SQL, Identifier
+from lib.database import connect_args, HEARTBEAT, SLICE
+from lib.keys import KeyGenerator
+
+def latency_bucket(seconds):
+    """log2 latency bucket in microseconds, same as in mypgio()"""
+    return min(31, int(math.log2(max(seconds * 1000000, 1))))
+
+class Session():
+    """One client session running the select/update mix against one table"""
+    def __init__(self, config, num, table_name, key_low, key_high, depth, rate, metrics=None):
+        self.config     = config
+        self.num        = num
+        self.table_name = table_name
+        self.key_low    = key_low
+        self.key_high   = key_high
+        self.depth      = depth
+        self.rate       = rate
+        self.metrics    = metrics
+        self.select     = SQL('SELECT sum(scratch) FROM {} WHERE mykey BETWEEN %s::bigint AND %s::bigint').format(Identifier(table_name))
+        self.update     = SQL('UPDATE {} SET scratch = scratch + 1 WHERE mykey BETWEEN %s::bigint AND %s::bigint').format(Identifier(table_name))
+        # Same write operation types as mypgio(): non-HOT update of the key, delete + insert.
+        # The keys are cast, psycopg sends small ints as int2 and the sums would overflow
+        self.indexed    = SQL('UPDATE {} SET mykey = %s::bigint + %s::bigint - mykey WHERE mykey BETWEEN %s::bigint AND %s::bigint').format(Identifier(table_name))
+        self.churn      = SQL('WITH d AS (DELETE FROM {0} WHERE mykey BETWEEN %s::bigint AND %s::bigint RETURNING mykey, scratch, filler) '
+                              'INSERT INTO {0} SELECT mykey, scratch + 1, filler FROM d').format(Identifier(table_name))
+        self.conn       = None
+        self.pid        = None
+        self.ts         = None
+        # Counters per optype (0=select, 1=write), kept in the session so they can be saved
+        # with the heartbeats and when the session fails
+        self.loops      = 0
+        self.count      = [0, 0]
+        self.max_tm     = [0.0, 0.0]
+        self.total_tm   = [0.0, 0.0]
+        self.blocks     = [0, 0]
+        self.hist       = [[0] * 32, [0] * 32]
+        self.writeops   = [0, 0, 0]
+        self.commits    = 0
+        self.commit_every = config.commit_every or 0
+
+    def record(self):
+        """Counters so far, in the same layout as pgio_return"""
+        commits = self.commits if self.commit_every else self.count[1]  # autocommit
+        return (self.pid, self.loops, self.count[0], self.count[1], self.max_tm[0], self.max_tm[1], self.blocks[0], self.blocks[1],
+            self.hist[0], self.hist[1], self.writeops[1], self.writeops[2], commits)
+
+    def write(self, low, high):
+        """Statement, parameters and write op type (0=update, 1=indexed, 2=churn) for a write of keys low..high"""
+        pick = random.random() * 100
+        if pick < self.config.indexed_pct:
+            return self.indexed, (low, high, low, high), 1
+        if pick < self.config.indexed_pct + self.config.churn_pct:
+            return self.churn, (low, high), 2
+        return self.update, (low, high), 0
+
+    async def connect(self, delay=0, connects=None):
+        """Connect after <delay> seconds (ramp-up), put (num, connect time or None if it failed) on connects (queue) if set"""
+        await asyncio.sleep(delay)
+        started, connect_tm = time.monotonic(), None
+        try:
+            self.conn  = await psycopg.AsyncConnection.connect(**connect_args(self.config), application_name=f'pgio_{self.num}')
+            connect_tm = time.monotonic() - started
+            self.pid   = self.conn.info.backend_pid
+        finally:
+            if connects is not None:
+                connects.put((self.num, connect_tm))
+
+    async def run(self, runtime, stop):
+        """Run the workload until runtime has passed or stop (asyncio.Event) is set,
+        return a record in the same layout as pgio_return. If the session fails,
+        log the error and return the counters of the completed operations"""
+        try:
+            await self.workload(runtime, stop)
+        except (psycopg.Error, OSError) as e:
+            logging.error('Session %s failed after %s operations: %s', self.num, self.loops, e)
+        finally:
+            await self.conn.close()
+        return self.record()
+
+    async def workload(self, runtime, stop):
+        pct       = self.config.update_pct
+        next_key  = KeyGenerator(self.config, self.key_low, self.key_high, self.config.work_unit)
+        units     = (self.config.work_unit, self.config.update_unit)
+        batch_writes = 0
+        commit_every = self.commit_every
+
+        self.ts = datetime.now()
+        end_time = time.monotonic() + runtime
+        next_time = time.monotonic()
+        async with self.conn.pipeline() as pipeline:
+            if commit_every:
+                await self.conn.execute('BEGIN')
+            while time.monotonic() < end_time and not stop.is_set():
+                batch = []  # per statement: None for a select, the write op type for a write
+                if self.rate > 0:
+                    # Open loop: start at the scheduled time and measure from there
+                    await asyncio.sleep(max(0, next_time - time.monotonic()))
+                    before = next_time
+                    next_time += self.depth / self.rate
+                else:
+                    before = time.monotonic()
+                for _ in range(self.depth):
+                    optype = 1 if random.random() * 100 < pct else 0
+                    mykey  = next_key()
+                    if optype:
+                        sql, params, writeop = self.write(mykey, mykey + units[1] - 1)
+                        batch.append(writeop)
+                        batch_writes += 1
+                    else:
+                        sql, params = self.select, (mykey, mykey + units[0] - 1)
+                        batch.append(None)
+                    await self.conn.execute(sql, params, prepare=True)
+                    # Commit batching: the commit is part of the latency of the batch that completes it
+                    if commit_every and batch_writes >= commit_every:
+                        await self.conn.execute('COMMIT')
+                        await self.conn.execute('BEGIN')
+                        self.commits += 1
+                        batch_writes = 0
+                await pipeline.sync()
+
+                # Client-visible latency: all statements in a batch complete at the sync
+                tm_delta = time.monotonic() - before
+                bucket   = latency_bucket(tm_delta)
+                # Counted after the sync, so the counters only include completed operations
+                for writeop in batch:
+                    optype = 0 if writeop is None else 1
+                    if optype:
+                        self.writeops[writeop] += 1
+                    self.count[optype]    += 1
+                    self.blocks[optype]   += units[optype]
+                    self.hist[optype][bucket] += 1
+                    self.max_tm[optype]    = max(self.max_tm[optype], tm_delta)
+                    self.total_tm[optype] += tm_delta
+                    if self.metrics:
+                        self.metrics.observe(('select', 'update')[optype], bucket, seconds=tm_delta)
+                self.loops += len(batch)
+
+            if commit_every:
+                await self.conn.execute('COMMIT')
+                self.commits += 1
+
+async def save_progress(conn, run_id, sessions, final=False):
+    """Save the counters of the sessions in pgio_progress, like the heartbeats of mypgio()"""
+    for s in sessions:
+        if s.pid is None:
+            continue
+        await conn.execute(
+            'SELECT pgio_save_progress(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s::bigint[], %s::bigint[], %s, %s, %s, %s, %s, %s)',
+            (run_id,) + s.record() + (final, s.total_tm[0], s.total_tm[1]))
+
+async def stop_watcher(config, run_id, stop, done, sessions, heartbeat=HEARTBEAT):
+    """Set stop when the run is stopped gracefully (pgio_runs.stop), checked every second.
+    Save the progress of the sessions every heartbeat, and once more (final) when done is set"""
+    async with await psycopg.AsyncConnection.connect(**connect_args(config), application_name='pgio_watcher') as conn:
+        next_beat = time.monotonic() + heartbeat
+        while not done.is_set():
+            if not stop.is_set():
+                cur = await conn.execute('SELECT stop FROM pgio_runs WHERE run_id = %s', (run_id,))
+                row = await cur.fetchone()
+                if row and row[0]:
+                    stop.set()
+            if time.monotonic() >= next_beat:
+                next_beat = time.monotonic() + heartbeat
+                await save_progress(conn, run_id, sessions)
+            try:
+                await asyncio.wait_for(done.wait(), 1)
+            except asyncio.TimeoutError:
+                pass
+        await save_progress(conn, run_id, sessions, final=True)
+
+async def run_sessions(config, workers, runtime, depth, rate, syncwait, metrics=None, timeout=3, run_id=None, connects=None, ramp_up=0, first=0):
+    """Connect all sessions (spread over ramp_up seconds), wait for the start signal, then run them concurrently.
+    workers is a list of (table_name, key_low, key_high), one per session, rate is ops/s per session (0=unlimited).
+    If run_id is set, the sessions stop early when the run is stopped gracefully.
+    If connects (queue) is set, the sessions put their connect times on it, first is the number of the first session.
+    Sessions that fail are logged and left out, or saved with the operations they completed.
+    Returns a list of (table_name, ts_start, pgio_return record)"""
+    sessions = [Session(config, n, *worker, depth, rate, metrics) for n, worker in enumerate(workers, first)]
+    errors = await asyncio.gather(*(s.connect(ramp_up * i / len(sessions), connects) for i, s in enumerate(sessions)), return_exceptions=True)
+    for s, error in zip(sessions, errors):
+        if error:
+            logging.error('Session %s: connect failed: %s', s.num, error)
+    sessions = [s for s, error in zip(sessions, errors) if not error]
+
+    loop = asyncio.get_running_loop()
+    if not await loop.run_in_executor(None, syncwait.wait, timeout):
+        for s in sessions:
+            await s.conn.close()
+        raise TimeoutError('Timeout')
+
+    stop, done = asyncio.Event(), asyncio.Event()
+    # The metrics exporter takes the operation counts from the progress, so save it every second
+    heartbeat = SLICE if metrics else HEARTBEAT
+    watcher = asyncio.create_task(stop_watcher(config, run_id, stop, done, sessions, heartbeat)) if run_id else None
+    results = await asyncio.gather(*(s.run(runtime, stop) for s in sessions), return_exceptions=True)
+    done.set()
+    if watcher:
+        # The results of the sessions are returned (and saved) even if the watcher failed
+        try:
+            await watcher
+        except Exception as e:
+            logging.error('Saving the progress of the sessions failed: %s', e)
+
+    saved = []
+    for s, result in zip(sessions, results):
+        if isinstance(result, Exception):
+            logging.error('Session %s failed: %s', s.num, result)
+            result = s.record()
+        if s.loops:
+            saved.append((s.table_name, s.ts, result))
+    return saved
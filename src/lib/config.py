@@ -5,6 +5,7 @@ License: GPLv3+
 """
 
 import os, json
+from lib.layout import Layout, get_layout, profiles
 
 versioninfo = {
     'author': "Bart Sjerps <info@dirty-cache.com>",
@@ -48,6 +49,57 @@ def _rows2scale(rows):
     else:
         return f'{tib:.2f}T'
 
+def key_range(rows, part, parts):
+    """Key range [low, high) of part <part> when splitting <rows> keys into <parts> parts"""
+    return 1 + rows * part // parts, 1 + rows * (part + 1) // parts
+
+def chunks(rows, min_rows=16384, max_chunks=1024):
+    """Split the keys 1..rows into key ranges [low, high) for parallel loading.
+    Depends on rows only, so the same table size always gives the same chunks"""
+    parts = max(1, min(max_chunks, rows // min_rows))
+    return [key_range(rows, part, parts) for part in range(parts)]
+
+def tablespace_weights(spec):
+    """Parse a tablespace list 'name[:weight],...' into [(name, weight)]"""
+    result = []
+    for item in (spec or '').split(','):
+        name, _, weight = item.strip().partition(':')
+        if not name:
+            continue
+        weight = int(weight) if weight else 1
+        if weight < 1:
+            raise ValueError(f'Bad weight for tablespace {name}: {weight}')
+        result.append((name, weight))
+    return result
+
+def place_tables(tables, spec):
+    """Tablespace for each of <tables> tables: smooth weighted round robin over the
+    tablespaces in spec, so the placement is spread evenly and always the same.
+    None (default tablespace) if spec is empty"""
+    weights = tablespace_weights(spec)
+    if not weights:
+        return [None] * tables
+    total   = sum(weight for _, weight in weights)
+    current = dict.fromkeys((name for name, _ in weights), 0)
+    result  = []
+    for _ in range(tables):
+        for name, weight in weights:
+            current[name] += weight
+        best = max(current, key=current.get)
+        current[best] -= total
+        result.append(best)
+    return result
+
+def table_schema(config, table_name):
+    """Schema of a data table: its own schema (same name as the table) or public"""
+    return table_name if config.table_schemas else 'public'
+
+# Connection settings, can be overridden per target
+db_parameters = ('dbhost', 'dbname', 'dbuser', 'dbpass', 'dbport')
+
+# Settings of a target profile: the connection and the OS stats source of its database host
+target_parameters = db_parameters + ('osstats',)
+
 class Config():
     parameters = {
         'dbhost': 'localhost',
@@ -60,7 +112,22 @@ class Config():
         'schemas': 4,
         'work_unit': 255,
         'update_unit': 8,
-        'tablespace': None
+        'tablespace': None,
+        'tablespaces': None,
+        'table_schemas': False,
+        'distribution': 'uniform',
+        'theta': 0.99,
+        'hot_pct': 10,
+        'hot_access': 90,
+        'indexed_pct': 0,
+        'churn_pct': 0,
+        'commit_every': 0,
+        'osstats': None,
+        'targets': {},
+        'layout': 'default',
+        'layouts': {},
+        'pool': False,
+        'ramp_up': 0
     }
 
     def __init__(self):
@@ -75,7 +142,8 @@ class Config():
 
     def __getattr__(self, name: str):
         if name == 'scale':
-            return self.info['rows']
+            # Rows per table: the blocks for the schema size times the rows per block of the layout profile
+            return self.info['rows'] * get_layout(self).rows_per_block
         elif name == 'size':
             return _rows2scale(self.info['rows'])
         elif name in self.parameters:
@@ -86,6 +154,23 @@ class Config():
     def set(self, name, value):
         if name == 'scale':
             self.info['rows'] = _scale2rows(value)
+        elif name in ('table_schemas', 'pool'):
+            self.dirty = True
+            self.info[name] = value in (True, 'yes')
+        elif name == 'ramp_up':
+            if value < 0:
+                raise ValueError('ramp_up must be 0 or more seconds')
+            self.dirty = True
+            self.info[name] = value
+        elif name == 'tablespaces':
+            tablespace_weights(value)
+            self.dirty = True
+            self.info[name] = value or None
+        elif name == 'layout':
+            if value not in profiles and value not in (self.layouts or {}):
+                raise ValueError(f'Layout {value} not found, available: {", ".join(sorted({**profiles, **(self.layouts or {})}))}')
+            self.dirty = True
+            self.info[name] = value
         elif name in self.parameters:
             self.dirty = True
             self.info[name] = value
@@ -93,14 +178,51 @@ class Config():
             raise KeyError(f'Invalid parameter {name}')
 
     def reset(self):
-        info = {k: self.parameters[k] for k in self.parameters if not k in ('dbhost','dbname','dbuser','dbpass')}
+        info = {k: self.parameters[k] for k in self.parameters if not k in ('dbhost','dbname','dbuser','dbpass','targets','layouts')}
         self.info.update(info)
         self.dirty=True
 
     def configure(self, args):
+        if args.target:
+            # The other settings are shared by all targets, refuse them instead of ignoring them
+            shared = [p for p in self.parameters if p in args and p not in target_parameters and getattr(args, p) is not None]
+            if args.scale:
+                shared.append('scale')
+            if shared:
+                raise ValueError(f'--target only takes {", ".join(target_parameters)}, set {", ".join(shared)} without --target')
+
         if args.defaults:
             self.reset()
 
+        if args.remove_target:
+            self.info['targets'] = {k: v for k, v in self.targets.items() if k != args.remove_target}
+            self.dirty = True
+
+        if args.remove_layout:
+            self.info['layouts'] = {k: v for k, v in self.layouts.items() if k != args.remove_layout}
+            self.dirty = True
+
+        if args.add_layout:
+            # "name key=value ...", validated by building the profile
+            name, _, spec = args.add_layout.strip().partition(' ')
+            if name in profiles:
+                raise ValueError(f'Layout {name} is a built-in profile')
+            Layout(name, spec)
+            self.info['layouts'] = {**self.layouts, name: spec}
+            self.dirty = True
+
+        if args.target:
+            # Connection and OS stats settings go to the target profile instead of the defaults
+            target = dict(self.targets.get(args.target, {}))
+            for parameter in target_parameters:
+                val = getattr(args, parameter)
+                if val is not None:
+                    target[parameter] = val
+            self.info['targets'] = {**self.targets, args.target: target}
+            self.dirty = True
+            self.show()
+            return
+
         for parameter in self.parameters:
             if not parameter in args:
                 continue
@@ -132,8 +254,34 @@ class Config():
         with open(self.path, 'w') as f:
             json.dump(self.info, f, indent=2, sort_keys=True)
 
+    def snapshot(self):
+        """Settings to record with a run (without the password and target profiles)"""
+        return {k: v for k, v in self.info.items() if k not in ('dbpass', 'targets')}
+
+    def for_target(self, name):
+        """Config with the connection settings of target profile <name> ('default' is the default connection)"""
+        if name != 'default' and name not in self.targets:
+            raise ValueError(f'Target {name} not found, add it with: pgio configure --target {name} --dbhost ...')
+        config = Config.__new__(Config)
+        config.path  = self.path
+        config.dirty = False
+        config.info  = {**self.info, **self.targets.get(name, {})}
+        if name != 'default':
+            # OS stats are of one database host: only from the target profile, never the default host
+            config.info['osstats'] = self.targets[name].get('osstats') or None
+        return config
+
     def show(self):
         for k, v in sorted(self.info.items()):
+            if k == 'layouts':
+                for name, spec in sorted(v.items()):
+                    print(f'{"layout " + name:20} {spec}')
+                continue
+            if k == 'targets':
+                for name, target in sorted(v.items()):
+                    settings = ' '.join(f'{p}={target[p]}' for p in target_parameters if target.get(p) and p != 'dbpass')
+                    print(f'{"target " + name:20} {settings}')
+                continue
             if v is None:
                 continue
             print(f'{k:20} {v}')
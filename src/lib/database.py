@@ -4,37 +4,118 @@ Copyright (c) 2024 - Bart Sjerps <bart@dirty-cache.com>
 License: GPLv3+
 """
 
-import logging
+import os, time, atexit, logging
 from pkgutil import get_data
+from threading import Lock
 
 import psycopg
 from psycopg.sql import SQL, Identifier, Literal
 from psycopg.rows import namedtuple_row
+from psycopg.types.json import Jsonb
+from lib.loader import table_rows, permutation_seed
+from lib.layout import get_layout
+
+try:
+    from psycopg_pool import ConnectionPool
+except ImportError:
+    ConnectionPool = None
+
+def connect_args(config):
+    """Connection parameters for psycopg (sync or async) from the config.
+    With a schema per table, the table schemas are in the search_path so the tables can be used by name"""
+    args = dict(host=config.dbhost, dbname=config.dbname, user=config.dbuser, password=config.dbpass, port=config.dbport, autocommit=True)
+    if config.table_schemas:
+        schemas = ['public'] + [f'pgio{n}' for n in range(config.schemas)]
+        args['options'] = '-c search_path=' + ','.join(schemas)
+    return args
+
+# Seconds between the progress saves of mypgio()
+HEARTBEAT = 10
+
+# Seconds per call of mypgio() while the run is sampled. PostgreSQL publishes the statistics
+# of a session only when it is idle, so a worker that runs as one long call would show its I/O
+# in pg_stat_database only at the end of the run
+SLICE = 1
+
+# Max connections per pool and seconds to wait for a pooled connection
+POOL_SIZE    = 1024
+POOL_TIMEOUT = 60
+
+# Connection pools (pool = yes) per connection target, shared by all Database objects of this process
+# so setup, run, report and the steps of a sweep reuse the sessions
+pools, pools_lock = {}, Lock()
+
+def get_pool(config):
+    """Connection pool for the connection target of config, created on first use"""
+    if ConnectionPool is None:
+        raise ValueError('Connection pooling requires psycopg_pool: pip install psycopg_pool')
+    args = connect_args(config)
+    key  = tuple(sorted((k, str(v)) for k, v in args.items()))
+    with pools_lock:
+        if key not in pools:
+            # New connections are opened by the pool workers, a few at a time
+            pools[key] = ConnectionPool(kwargs=args, min_size=1, max_size=POOL_SIZE, timeout=POOL_TIMEOUT,
+                reset=lambda conn: conn.execute('DISCARD ALL'), name=f'pgio_{len(pools)}', open=True)
+        return pools[key]
+
+@atexit.register
+def close_pools():
+    for pool in pools.values():
+        pool.close()
+
+def table_layout(layout, tablespace=None, schema='public'):
+    """Layout of a data table (Layout profile) including its placement (if not the defaults),
+    stored in pgio_tables to detect tables that need a rebuild"""
+    layout = str(layout)
+    if tablespace:
+        layout += f' tablespace={tablespace}'
+    if schema != 'public':
+        layout += f' schema={schema}'
+    return layout
 
 class Database():
+    """Database session: a new connection, or one from the connection pool if pool is set.
+    connect_tm is the time it took to get the connection (seconds)"""
     def __init__(self, config, name=None):
+        started   = time.monotonic()
+        self.pool = None
         try:
-            self.conn = psycopg.connect(host=config.dbhost, dbname=config.dbname, user=config.dbuser, password=config.dbpass, port=config.dbport, autocommit=True)
+            if config.pool:
+                self.pool = get_pool(config)
+                self.conn = self.pool.getconn()
+            else:
+                self.conn = psycopg.connect(**connect_args(config))
         except AttributeError as e:
             logging.error(e)
             raise ValueError(f'Bad database configuration {e}') from e
         except psycopg.OperationalError as e:
+            # Includes PoolTimeout (no pooled connection within POOL_TIMEOUT)
             raise ValueError(f'Connecting to database failed: {e}') from e
+        self.connect_tm = time.monotonic() - started
         if name:
             self.conn.execute(SQL("SET application_name TO {}").format(name))
 
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        """Return the connection to the pool. Without pool, the connection is closed when the object is deleted"""
+        pool, self.pool = getattr(self, 'pool', None), None
+        if pool and not pool.closed:
+            pool.putconn(self.conn)
+
     def getscript(self, name):
         return get_data('sql', name).decode()
 
     def schema(self):
-        for file in ('pgio_schema.sql', 'pgio.sql', 'pgio_get_rand.sql', 'pgio_fts.sql'):
+        for file in ('pgio_schema.sql', 'pgio.sql', 'pgio_get_rand.sql', 'pgio_fts.sql', 'pgio_permute.sql'):
             data = self.getscript(file)
             sql = SQL(data).format(table=Identifier('seed'))
             with self.conn.transaction(), self.conn.cursor() as cur:
                 cur.execute(sql)
 
-    def execute(self, sql):
-        return self.conn.execute(sql)
+    def execute(self, sql, *args):
+        return self.conn.execute(sql, *args)
 
     def fetchone(self, sql, *args):
         with self.conn.cursor(row_factory=namedtuple_row) as cur:
@@ -52,10 +133,10 @@ class Database():
             cur.execute(sql, *args)
             return cur.fetchall()
 
-    def report(self, name):
+    def report(self, name, params=None):
         sql = self.getscript(name)
         with self.conn.cursor() as cur:
-            cur.execute(sql)
+            cur.execute(sql, params)
             header = [x.name for x in cur.description]
             data   = cur.fetchall()
             return header, data
@@ -64,13 +145,137 @@ class Database():
         self.execute(SQL("SET default_tablespace = {}").format(SQL(tablespace)))
 
     def tables(self):
-        data = self.fetchall("SELECT table_name FROM information_schema.tables WHERE table_schema = 'public' AND table_type = 'BASE TABLE' AND table_name LIKE 'pgio%%' ORDER BY 1")
+        data = self.fetchall("SELECT table_name FROM information_schema.tables WHERE table_schema IN ('public', table_name) AND table_type = 'BASE TABLE' AND table_name LIKE 'pgio%%' ORDER BY 1")
         return [x.table_name for x in data]
 
-    def update_stats(self):
-        sql = self.getscript('pgio_update_stats.sql')
-        with self.conn.cursor() as cur:
-            cur.execute(sql, (self.conn.info.dbname,))
+    def update_stats(self, run_id, host=None):
+        """Snapshot the database, relation, WAL/checkpoint (PostgreSQL 14+) and pg_stat_io (PostgreSQL 16+)
+        counters, and the OS counters if host (HostStats) is set. All in one transaction so they get the same timestamp"""
+        scripts = ['pgio_update_stats.sql', 'pgio_update_relstats.sql']
+        if self.conn.info.server_version >= 170000:
+            scripts.append('pgio_update_walstats17.sql')
+        elif self.conn.info.server_version >= 140000:
+            scripts.append('pgio_update_walstats.sql')
+        if self.conn.info.server_version >= 160000:
+            scripts.append('pgio_update_iostats.sql')
+        snapshot = host.snapshot() if host else None
+        with self.conn.transaction(), self.conn.cursor() as cur:
+            for script in scripts:
+                cur.execute(self.getscript(script), {'run_id': run_id, 'dbname': self.conn.info.dbname})
+            if snapshot:
+                disks, counters = snapshot
+                cur.executemany(
+                    "INSERT INTO pgio_diskstats (run_id, device, reads, read_sectors, read_ms, writes, write_sectors, write_ms, io_ms)\n"
+                    "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)", [(run_id,) + disk for disk in disks])
+                cur.execute(self.getscript('pgio_update_hoststats.sql'), {'run_id': run_id, **counters})
+
+    def live_stats(self):
+        """Current database counters for the metrics exporter"""
+        stats = self.fetchone(self.getscript('pgio_live_stats.sql'), {'dbname': self.conn.info.dbname})._asdict()
+        if self.conn.info.server_version >= 160000:
+            stats['blks_written'] = self.fetchone("SELECT COALESCE(sum(writes), 0) writes FROM pg_stat_io").writes
+        return stats
+
+    def save_connects(self, run_id, connects, pooled, seconds=None):
+        """Store the connect times {worker: seconds} of the worker sessions, and the duration of the connect phase if set"""
+        with self.conn.transaction(), self.conn.cursor() as cur:
+            cur.executemany("INSERT INTO pgio_connects (run_id, worker, connect_ms, pooled) VALUES (%s, %s, %s, %s) ON CONFLICT DO NOTHING",
+                [(run_id, worker, round(tm * 1000, 3), pooled) for worker, tm in connects.items()])
+            if seconds is not None:
+                cur.execute("UPDATE pgio_runs SET connect_secs = %s WHERE run_id = %s", (round(seconds, 3), run_id))
+
+    def new_run(self, workers, runtime, config, options, tablespace, cached_pct=None):
+        """Register a new run with a snapshot of the configuration and the cache state, returns the run_id"""
+        params = dict(workers=workers, runtime=runtime, config=Jsonb(config), options=Jsonb(options), tablespace=tablespace, cached_pct=cached_pct)
+        return self.fetchone(self.getscript('pgio_new_run.sql'), params).run_id
+
+    def extension(self, name):
+        """Create extension <name> if needed, returns False if that is not possible"""
+        try:
+            self.execute(SQL("CREATE EXTENSION IF NOT EXISTS {}").format(Identifier(name)))
+            return True
+        except psycopg.DatabaseError as e:
+            logging.warning('Extension %s not available: %s', name, str(e).strip())
+            return False
+
+    def has_function(self, name):
+        return self.fetchone("SELECT count(*) n FROM pg_proc WHERE proname = %s", (name,)).n > 0
+
+    def prewarm(self, table_name, mode='buffer'):
+        blocks = self.fetchone(self.getscript('pgio_prewarm.sql'), {'table_name': table_name, 'mode': mode}).blocks
+        logging.info('Prewarmed %s: %s blocks', table_name, blocks)
+
+    def evict(self, table_name):
+        buffers = self.fetchone(self.getscript('pgio_evict.sql'), {'table_name': table_name}).buffers
+        logging.info('Evicted %s: %s buffers', table_name, buffers)
+
+    def cache_event(self, action):
+        self.execute("INSERT INTO pgio_cache_events (action) VALUES (%s)", (action,))
+
+    def cache_size(self, tables):
+        """Size in MiB of the tables + indexes, shared_buffers and effective_cache_size"""
+        return self.fetchone(self.getscript('pgio_cache_size.sql'), {'tables': tables})
+
+    def cached_pct(self, tables):
+        """Percentage of the blocks of the tables + indexes in shared_buffers, None without pg_buffercache"""
+        if not self.has_function('pg_buffercache_pages'):
+            return None
+        try:
+            return self.fetchone(self.getscript('pgio_cached.sql'), {'tables': tables}).pct
+        except psycopg.DatabaseError as e:
+            logging.debug(e)
+            return None
+
+    def register_agent(self, name):
+        sql = "INSERT INTO pgio_agents (name, host, pid) VALUES (%s, %s, %s) RETURNING agent_id"
+        return self.fetchone(sql, (name, os.uname().nodename, os.getpid())).agent_id
+
+    def unregister_agent(self, agent_id):
+        self.execute("DELETE FROM pgio_agents WHERE agent_id = %s", (agent_id,))
+
+    def poll_agent(self, agent_id):
+        """Heartbeat, returns the state and task of the agent with the seconds until the start (delay)"""
+        return self.fetchone(
+            "UPDATE pgio_agents SET last_seen = clock_timestamp() WHERE agent_id = %s\n"
+            "RETURNING state, run_id, task, extract(epoch FROM start_at - clock_timestamp())::float8 delay", (agent_id,))
+
+    def set_agent_state(self, agent_id, state):
+        self.execute("UPDATE pgio_agents SET state = %s WHERE agent_id = %s", (state, agent_id))
+
+    def idle_agents(self):
+        """Live agents that are not running a task"""
+        return self.fetchall(
+            "SELECT agent_id, name, host FROM pgio_agents\n"
+            "WHERE state IN ('idle', 'done', 'failed') AND last_seen > clock_timestamp() - interval '10 seconds'\n"
+            "ORDER BY agent_id")
+
+    def assign_agent(self, agent_id, run_id, task, start_at):
+        self.execute("UPDATE pgio_agents SET state = 'assigned', run_id = %s, task = %s, start_at = %s WHERE agent_id = %s",
+            (run_id, Jsonb(task), start_at, agent_id))
+
+    def agent_status(self, run_id):
+        """State of the agents of a run, stale if the agent stopped sending heartbeats"""
+        return self.fetchall(
+            "SELECT agent_id, name, state, last_seen < clock_timestamp() - interval '30 seconds' stale\n"
+            "FROM pgio_agents WHERE run_id = %s ORDER BY agent_id", (run_id,))
+
+    def start_time(self, delay):
+        """Database time <delay> seconds from now"""
+        return self.fetchone("SELECT clock_timestamp() + make_interval(secs => %s) start_at", (delay,)).start_at
+
+    def seconds_until(self, ts):
+        return self.fetchone("SELECT extract(epoch FROM %s - clock_timestamp())::float8 delay", (ts,)).delay
+
+    def last_run(self):
+        return self.fetchone("SELECT max(run_id) run_id FROM pgio_runs").run_id
+
+    def new_sweep(self):
+        """Id for the steps of a new sweep, the steps of earlier sweeps are kept"""
+        return self.fetchone("SELECT COALESCE(MAX(sweep_id), 0) + 1 sweep_id FROM pgio_sweep").sweep_id
+
+    def sweep_step(self, sweep_id, step, workers, run_id):
+        sql = self.getscript('pgio_sweep_step.sql')
+        self.execute(sql, {'sweep_id': sweep_id, 'step': step, 'workers': workers, 'run_id': run_id})
 
     def pgiostats(self):
         with self.conn.cursor() as cur:
@@ -81,72 +286,264 @@ class Database():
 
     @property
     def schemas(self):
-        data = self.fetchone("SELECT count(*) n FROM information_schema.tables WHERE table_schema = 'public' AND table_name ~ 'pgio\\d+' ")
+        data = self.fetchone("SELECT count(DISTINCT table_name) n FROM information_schema.tables WHERE table_schema IN ('public', table_name) AND table_name ~ '^pgio\\d+$' ")
         return data.n
 
-    def create_seed(self, rowcount):
-        sql = self.getscript('pgio_seed.sql')
+    def table_status(self):
+        """Setup state of the existing tables: {table_name: row}"""
+        return {x.table_name: x for x in self.fetchall(self.getscript('pgio_table_status.sql'))}
+
+    def register_table(self, cur, table_name, rows, layout):
+        cur.execute("INSERT INTO pgio_tables (table_name, rows, layout) VALUES (%s, %s, %s)", (table_name, rows, layout))
+
+    def chunk_done(self, cur, table_name, part, rows):
+        """Record chunk <part> as loaded, raises ValueError (and the load is rolled back) if it loaded no rows"""
+        if rows <= 0:
+            raise ValueError(f'Chunk {part} of {table_name}: no rows loaded')
+        cur.execute("INSERT INTO pgio_table_chunks (table_name, part) VALUES (%s, %s)", (table_name, part))
+
+    @staticmethod
+    def seed_layout(layout):
+        """Layout of the seed table: the row contents of the layout profile"""
+        return f'seed filler=char({layout.filler}) compress={layout.compress} order={layout.order} keys=permutation'
+
+    def create_seed(self, parts, rows, layout):
+        """Create the empty seed table with one partition per chunk, so the chunks can be loaded in parallel"""
+        self.drop_table('pgio_seed')
+        with self.conn.transaction(), self.conn.cursor() as cur:
+            cur.execute(SQL('CREATE TABLE pgio_seed (part INT, mykey BIGINT, scratch BIGINT, filler CHAR({})) PARTITION BY LIST (part)').format(Literal(layout.filler)))
+            for part in range(len(parts)):
+                cur.execute(SQL('CREATE TABLE {partition} PARTITION OF pgio_seed FOR VALUES IN ({part})').format(
+                    partition=Identifier(f'pgio_seed_{part}'), part=Literal(part)))
+            self.register_table(cur, 'pgio_seed', rows, self.seed_layout(layout))
+
+    def load_seed(self, layout, rows, part, low, high):
+        """Load chunk <part>: the keys at positions [low, high) of a permutation of all <rows> keys (shuffled),
+        or the keys low..high-1 (clustered), so the physical order is random over the whole table"""
+        # Filler: a repeated character + random hex characters. The random part refers to mykey
+        # so it is evaluated for each row instead of once
+        fixed, random = layout.filler - layout.random_chars, layout.random_chars
+        filler = SQL("repeat('X', {})").format(Literal(fixed))
+        if random:
+            filler = SQL("{} || left((SELECT string_agg(md5(random()::text || mykey), '') FROM generate_series(1, {})), {})").format(
+                filler, Literal(random // 32 + 1), Literal(random))
+        sql = SQL(self.getscript('pgio_seed.sql')).format(seed=Identifier(f'pgio_seed_{part}'),
+            filler=SQL('({})::char({})').format(filler, Literal(layout.filler)),
+            key=SQL('pos') if layout.order != 'shuffled' else
+                SQL('1 + pgio_permute(pos - 1, {}::bigint, {}::bigint)').format(Literal(rows), Literal(permutation_seed('pgio_seed'))))
+        with self.conn.transaction(), self.conn.cursor() as cur:
+            cur.execute(sql, {'part': part, 'low': low, 'high': high - 1})
+            self.chunk_done(cur, 'pgio_seed', part, cur.rowcount)
+
+    def drop_table(self, table_name, schema=None):
+        table = Identifier(schema, table_name) if schema else Identifier(table_name)
+        with self.conn.transaction(), self.conn.cursor() as cur:
+            cur.execute(SQL('DROP TABLE IF EXISTS {}').format(table))
+            cur.execute("DELETE FROM pgio_tables WHERE table_name = %s", (table_name,))
+
+    def create_table(self, table_name, rows, layout, unlogged=False, tablespace=None, schema='public'):
+        """Create an empty data table with the layout profile in <schema>, in <tablespace> if set (else the default tablespace)"""
+        self.drop_table(table_name, schema)
+        sql = SQL('CREATE {unlogged} TABLE {table} (mykey BIGINT, scratch BIGINT, filler CHAR({filler})) WITH (fillfactor={fillfactor}) {tablespace}')
         with self.conn.transaction(), self.conn.cursor() as cur:
-            cur.execute('DROP TABLE IF EXISTS pgio_seed')
-            cur.execute(sql, (rowcount,))
+            if schema != 'public':
+                cur.execute(SQL('CREATE SCHEMA IF NOT EXISTS {}').format(Identifier(schema)))
+            cur.execute(sql.format(table=Identifier(schema, table_name), unlogged=SQL('UNLOGGED' if unlogged else ''),
+                filler=Literal(layout.filler), fillfactor=Literal(layout.fillfactor),
+                tablespace=SQL('TABLESPACE {}').format(Identifier(tablespace)) if tablespace else SQL('')))
+            self.register_table(cur, table_name, rows, table_layout(layout, tablespace, schema))
 
-    def drop_table(self, table_name):
+    def load_table(self, table_name, part):
+        """Copy one chunk (seed partition) into the table"""
         with self.conn.transaction(), self.conn.cursor() as cur:
-            cur.execute(SQL('DROP TABLE IF EXISTS {}').format(Identifier(table_name)))
+            cur.execute(SQL('INSERT INTO {table} (mykey, scratch, filler) SELECT mykey, scratch, filler FROM {seed}').format(table=Identifier(table_name), seed=Identifier(f'pgio_seed_{part}')))
+            self.chunk_done(cur, table_name, part, cur.rowcount)
 
-    def create_table(self, table_name):
-        self.drop_table(table_name)
+    def copy_table(self, table_name, layout, rows, part, low, high):
+        """Stream one chunk of client generated rows (layout profile) into the table using binary COPY.
+        Shuffled: the keys at positions [low, high) of a permutation of all <rows> keys"""
+        sql = SQL('COPY {table} (mykey, scratch, filler) FROM STDIN (FORMAT BINARY)').format(table=Identifier(table_name))
+        count = 0
         with self.conn.transaction(), self.conn.cursor() as cur:
-            table = Identifier(table_name)
-            index = Identifier(f'{table_name}_idx')
-            cur.execute(SQL('CREATE TABLE {table} with (fillfactor=10) AS SELECT * FROM pgio_seed LIMIT 1').format(table=table))
-            cur.execute(SQL('TRUNCATE TABLE {table}').format(table=table))
-            cur.execute(SQL('CREATE INDEX IF NOT EXISTS {index} ON {table}(mykey)').format(table=table, index=index))
-            cur.execute(SQL('INSERT INTO {table} SELECT * FROM pgio_seed').format(table=table))
-        self.conn.execute(SQL('VACUUM ANALYZE {table}').format(table=table))
+            with cur.copy(sql) as copy:
+                # psycopg has no binary dumper for bpchar, the server converts text to char(n)
+                copy.set_types(['int8', 'int8', 'text'])
+                for row in table_rows(low, high, layout, rows, permutation_seed(table_name)):
+                    copy.write_row(row)
+                    count += 1
+            self.chunk_done(cur, table_name, part, count)
+
+    def index_table(self, table_name, chunks, set_logged=False, tablespace=None, method='btree'):
+        """Build the index (btree, brin or none, in the tablespace of the table) once after all key ranges are loaded,
+        then mark the table ready. Raises ValueError if fewer than <chunks> chunks are recorded as loaded"""
+        loaded = self.fetchone("SELECT count(*) n FROM pgio_table_chunks WHERE table_name = %s", (table_name,)).n
+        if loaded != chunks:
+            raise ValueError(f'Table {table_name}: {loaded} of {chunks} chunks loaded, run setup again to resume')
+        table = Identifier(table_name)
+        index = Identifier(f'{table_name}_idx')
+        space = SQL('TABLESPACE {}').format(Identifier(tablespace)) if tablespace else SQL('')
+        if set_logged:
+            logging.info("Setting table %s to LOGGED", table_name)
+            self.execute(SQL('ALTER TABLE {table} SET LOGGED').format(table=table))
+        if method != 'none':
+            logging.info("Indexing table %s", table_name)
+            self.execute(SQL('CREATE INDEX IF NOT EXISTS {index} ON {table} USING {method} (mykey) {space}').format(
+                table=table, index=index, method=SQL(method), space=space))
+        self.execute(SQL('VACUUM ANALYZE {table}').format(table=table))
+        self.execute("UPDATE pgio_tables SET ready = TRUE, ts = CURRENT_TIMESTAMP WHERE table_name = %s", (table_name,))
 
     def destroy(self):
         with self.conn.transaction(), self.conn.cursor() as cur:
-            cur.execute("SELECT table_name FROM information_schema.tables WHERE table_schema = 'public' AND table_name ~ 'pgio\\d+' ORDER BY 1")
-            tables = [x[0] for x in cur.fetchall()]
-            for table_name in tables:
+            cur.execute("SELECT table_schema, table_name FROM information_schema.tables WHERE table_schema IN ('public', table_name) AND table_name ~ '^pgio\\d+$' ORDER BY 2")
+            tables = cur.fetchall()
+            for schema, table_name in tables:
                 logging.info('Dropping %s', table_name)
-                table = Identifier(table_name)
+                table = Identifier(schema, table_name)
                 cur.execute(SQL('DROP TABLE IF EXISTS {table}').format(table=table))
 
+            cur.execute("SELECT nspname FROM pg_namespace WHERE nspname ~ '^pgio\\d+$'")
+            for (schema,) in cur.fetchall():
+                logging.info('Dropping schema %s', schema)
+                cur.execute(SQL('DROP SCHEMA IF EXISTS {} CASCADE').format(Identifier(schema)))
+
             logging.info('Dropping master data')
             sql = self.getscript('pgio_destroy.sql')
             cur.execute(sql)
 
-    def run_task(self, table_name, pct, run_tm, scale, work_unit, update_work_unit, ts):
-        sql = SQL("SELECT * FROM mypgio({table_name}, {pct}, {run_tm}, {scale}, {work_unit}, {update_work_unit})").format(
-            table_name       = Literal(table_name),
-            pct              = Literal(pct),
-            run_tm           = Literal(run_tm),
-            scale            = Literal(scale),
-            work_unit        = Literal(work_unit),
-            update_work_unit = Literal(update_work_unit)
-        )
-        with self.conn.cursor() as cur:
-            cur.execute(sql)
-            data = cur.fetchone()
+    @staticmethod
+    def mypgio_params(run_id, table_name, config, run_tm, key_low, key_high, rate, prepared=True):
+        """Parameters for pgio_run.sql"""
+        return {
+            'run_id':       run_id,
+            'heartbeat':    HEARTBEAT,
+            'table_name':   table_name,
+            'update_pct':   config.update_pct,
+            'runtime':      run_tm,
+            'scale':        config.scale,
+            'work_unit':    config.work_unit,
+            'update_unit':  config.update_unit,
+            'key_low':      key_low,
+            'key_high':     key_high,
+            'rate':         rate,
+            'distribution': config.distribution or 'uniform',
+            'theta':        config.theta,
+            'hot_pct':      config.hot_pct,
+            'hot_access':   config.hot_access,
+            'prepared':     prepared,
+            'indexed_pct':  config.indexed_pct or 0,
+            'churn_pct':    config.churn_pct or 0,
+            'commit_every': config.commit_every or 0,
+            'resume':       False,
+            'final':        True
+        }
 
-        with self.conn.transaction(), self.conn.cursor() as cur:
-            sql = SQL(
-                "INSERT INTO pgio_table_stats (mypid, loop_iterations, sql_selects, sql_updates, sql_select_max_tm, sql_update_max_tm, select_blk_touch_cnt, update_blk_touch_cnt, table_name, work_unit, update_unit, ts_start)\n"
-                "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)").format(table_name = Literal(table_name))
+    def mypgio(self, params, script='pgio_run.sql', slice_tm=0):
+        """Run mypgio() (or pgio_fts() with pgio_run_fts.sql) and return its counters (pgio_return layout) from pgio_progress.
+        With slice_tm > 0 the worker runs as a series of calls of slice_tm seconds, each continuing the counters
+        of the previous one, until the runtime is over or the run is stopped.
+        If the worker was canceled, return the counters of its last heartbeat"""
+        try:
+            # Client side binding (simple query protocol) so the procedure can COMMIT
+            with psycopg.ClientCursor(self.conn) as cur:
+                if not slice_tm:
+                    cur.execute(self.getscript(script), params)
+                end = time.monotonic() + params['runtime']
+                while slice_tm:
+                    remaining = end - time.monotonic()
+                    final = remaining < slice_tm + 0.5
+                    runtime = max(1, round(remaining)) if final else slice_tm
+                    cur.execute(self.getscript(script), dict(params, runtime=runtime, resume=True, final=final))
+                    if final:
+                        break
+                    cur.execute("SELECT stop FROM pgio_runs WHERE run_id = %s", (params['run_id'],))
+                    row = cur.fetchone()
+                    if row and row[0]:
+                        cur.execute("UPDATE pgio_progress SET final = TRUE WHERE run_id = %s AND mypid = pg_backend_pid()", (params['run_id'],))
+                        break
+        except psycopg.errors.QueryCanceled:
+            logging.warning('Worker %s canceled, using the counters of the last heartbeat', self.conn.info.backend_pid)
+        return self.fetchone(self.getscript('pgio_progress.sql'), params)
 
-            cur.execute(sql, data + (table_name,work_unit, update_work_unit, ts))
+    def run_task(self, run_id, table_name, config, run_tm, key_low, key_high, rate, ts, slice_tm=0):
+        data = self.mypgio(self.mypgio_params(run_id, table_name, config, run_tm, key_low, key_high, rate), slice_tm=slice_tm)
+        if data is None:
+            logging.error('No results for worker %s', self.conn.info.backend_pid)
+            return None
+        self.save_results(run_id, data, table_name, config.work_unit, config.update_unit, ts, rate, get_layout(config), config.scale)
+        return data
 
-    def run_fts(self, table_name, run_tm, ts):
-        sql = SQL("SELECT * FROM pgio_fts({table_name}, {run_tm})").format(table_name = Literal(table_name), run_tm=Literal(run_tm))
-        with self.conn.cursor() as cur:
-            cur.execute(sql)
-            data = cur.fetchone()
+    def stop_run(self, run_id=None):
+        """Ask the workers of run <run_id> (default: all active runs) to stop, returns the stopped run_ids"""
+        return [x.run_id for x in self.fetchall(self.getscript('pgio_stop.sql'), {'run_id': run_id})]
+
+    def progress(self, run_id):
+        """Latency histograms and total latency of the workers so far: {optype: ([count per bucket], seconds)}"""
+        hist = {}
+        for row in self.fetchall(self.getscript('pgio_progress_hist.sql'), {'run_id': run_id}):
+            hist.setdefault(row.optype, [0] * 32)[row.bucket] = row.cnt
+        tm = self.fetchone("SELECT COALESCE(sum(select_tm), 0) select_tm, COALESCE(sum(update_tm), 0) update_tm FROM pgio_progress WHERE run_id = %s", (run_id,))
+        return {optype: (buckets, float(getattr(tm, f'{optype}_tm'))) for optype, buckets in hist.items()}
+
+    def progress_counts(self, run_id):
+        """Operations and rows touched by the workers so far"""
+        return self.fetchone("SELECT COALESCE(sum(sql_selects), 0)::bigint selects, COALESCE(sum(sql_updates), 0)::bigint updates\n"
+            ", COALESCE(sum(select_blk_touch_cnt), 0)::bigint select_rows, COALESCE(sum(update_blk_touch_cnt), 0)::bigint update_rows\n"
+            "FROM pgio_progress WHERE run_id = %s", (run_id,))
+
+    def backend_cpu(self):
+        """CPU seconds used by our backend process, None if the database is not on this host"""
+        pid = self.conn.info.backend_pid
+        try:
+            with open(f'/proc/{pid}/cmdline', 'rb') as f:
+                if not f.read().startswith(b'postgres'):
+                    return None
+            with open(f'/proc/{pid}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            return None
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+    def cache_range(self, table_name, key_low, key_high):
+        """Read the key range [key_low, key_high) so it is cached in shared_buffers"""
+        sql = SQL("SELECT sum(scratch) FROM {} WHERE mykey >= %s AND mykey < %s").format(Identifier(table_name))
+        self.execute(sql, (key_low, key_high))
+
+    def calibrate(self, table_name, config, run_tm, key_low, key_high, prepared):
+        """Run a select-only uniform mypgio() and return the pgio_return record and backend CPU seconds"""
+        params = self.mypgio_params(0, table_name, config, run_tm, key_low, key_high, 0, prepared)
+        params.update(update_pct=0, distribution='uniform')
+        cpu_start = self.backend_cpu()
+        data = self.mypgio(params)
+        cpu_end = self.backend_cpu()
+        self.execute("DELETE FROM pgio_progress WHERE run_id = 0")
+        if cpu_start is None or cpu_end is None:
+            return data, None
+        return data, cpu_end - cpu_start
+
+    def run_fts(self, run_id, table_name, run_tm, ts, layout=None, slice_tm=0):
+        params = {'run_id': run_id, 'table_name': table_name, 'runtime': run_tm, 'heartbeat': HEARTBEAT, 'resume': False, 'final': True}
+        data = self.mypgio(params, 'pgio_run_fts.sql', slice_tm)
+        if data is None:
+            logging.error('No results for worker %s', self.conn.info.backend_pid)
+            return None
+        self.save_results(run_id, data, table_name, 0, 0, ts, layout=layout)
+        return data
 
+    def save_results(self, run_id, data, table_name, work_unit, update_unit, ts, rate=0, layout=None, rows=0):
+        """Store a pgio_return record in pgio_table_stats and the latency histograms in pgio_latency_hist.
+        The write counters (indexed, churn, commits) follow the histograms if present.
+        The rows touched are converted to heap blocks touched for the layout profile (if set)"""
+        counters, select_hist, update_hist = tuple(data[:8]), data[8], data[9]
+        if layout:
+            counters = counters[:6] + (layout.blocks(counters[6], work_unit, rows), layout.blocks(counters[7], update_unit, rows))
+        writes = tuple(x or 0 for x in data[10:13]) + (0, 0, 0)[len(data[10:13]):]
         with self.conn.transaction(), self.conn.cursor() as cur:
-            sql = SQL(
-                "INSERT INTO pgio_table_stats (mypid, loop_iterations, sql_selects, sql_updates, sql_select_max_tm, sql_update_max_tm, select_blk_touch_cnt, update_blk_touch_cnt, table_name, work_unit, update_unit, ts_start)\n"
-                "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)").format(table_name = Literal(table_name))
+            cur.execute(
+                "INSERT INTO pgio_table_stats (mypid, loop_iterations, sql_selects, sql_updates, sql_select_max_tm, sql_update_max_tm, select_blk_touch_cnt, update_blk_touch_cnt, sql_indexed, sql_churn, commits, table_name, work_unit, update_unit, ts_start, target_rate, run_id)\n"
+                "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)", counters + writes + (table_name, work_unit, update_unit, ts, rate, run_id))
 
-            cur.execute(sql, data + (table_name,0, 0, ts))
\ No newline at end of file
+            for optype, hist in (('select', select_hist), ('update', update_hist)):
+                cur.execute(
+                    "INSERT INTO pgio_latency_hist (run_id, mypid, optype, bucket, cnt)\n"
+                    "SELECT %s, %s, %s, bucket - 1, cnt FROM unnest(%s::bigint[]) WITH ORDINALITY AS h(cnt, bucket) WHERE cnt > 0",
+                    (run_id, counters[0], optype, hist or []))
@@ -0,0 +1,113 @@
+"""
+hoststats.py - Host OS statistics collector for pypgio
+Copyright (c) 2024 - Bart Sjerps <bart@dirty-cache.com>
+License: GPLv3+
+
+Reads /proc/diskstats, /proc/stat and /proc/vmstat of the database host,
+locally or over ssh. The raw counters are stored with the database samples
+so the report can show device I/O next to database I/O.
+"""
+
+import re, logging, subprocess
+
+PROCFILES = ('/proc/diskstats', '/proc/stat', '/proc/vmstat')
+SEPARATOR = '--pgio--'
+
+class LocalReader():
+    """Read the files on this host"""
+    def read(self, paths):
+        result = []
+        for path in paths:
+            with open(path) as f:
+                result.append(f.read())
+        return result
+
+    def run(self, command):
+        subprocess.run(['sh', '-c', command], capture_output=True, text=True, timeout=60, check=True)
+
+class SSHReader():
+    """Read the files on a remote host with ssh (requires key based login)"""
+    def __init__(self, target):
+        self.target = target
+
+    def read(self, paths):
+        command = '; '.join(f'cat {path}; echo {SEPARATOR}' for path in paths)
+        proc = subprocess.run(['ssh', '-T', '-o', 'BatchMode=yes', self.target, command],
+            capture_output=True, text=True, timeout=10, check=True)
+        return proc.stdout.split(SEPARATOR + '\n')[:len(paths)]
+
+    def run(self, command):
+        subprocess.run(['ssh', '-T', '-o', 'BatchMode=yes', self.target, command],
+            capture_output=True, text=True, timeout=60, check=True)
+
+def reader(source):
+    """Reader for <source>: 'local' or [ssh://]user@host"""
+    if source == 'local':
+        return LocalReader()
+    return SSHReader(source.removeprefix('ssh://'))
+
+def parse_diskstats(text):
+    """Per device: (device, reads, read_sectors, read_ms, writes, write_sectors, write_ms, io_ms).
+    Skips loop/ram devices and partitions of devices that are also listed"""
+    devices = {}
+    for line in text.splitlines():
+        fields = line.split()
+        if len(fields) < 14 or re.match(r'(loop|ram|zram)\d', fields[2]):
+            continue
+        name = fields[2]
+        reads, _, read_sectors, read_ms, writes, _, write_sectors, write_ms, _, io_ms = map(int, fields[3:13])
+        devices[name] = (name, reads, read_sectors, read_ms, writes, write_sectors, write_ms, io_ms)
+
+    def partition(name):
+        parent = re.sub(r'p?\d+$', '', name)
+        return parent != name and parent in devices
+    return [v for k, v in devices.items() if not partition(k)]
+
+def parse_stat(text):
+    """CPU ticks (user, nice, system, idle, iowait, irq, softirq, steal) and context switches"""
+    result = {}
+    for line in text.splitlines():
+        fields = line.split()
+        if fields and fields[0] == 'cpu':
+            names = ('cpu_user', 'cpu_nice', 'cpu_system', 'cpu_idle', 'cpu_iowait', 'cpu_irq', 'cpu_softirq', 'cpu_steal')
+            result.update(zip(names, map(int, fields[1:9])))
+        elif fields and fields[0] == 'ctxt':
+            result['ctxt'] = int(fields[1])
+    return result
+
+def parse_vmstat(text):
+    """Paging and swapping counters"""
+    wanted = ('pgpgin', 'pgpgout', 'pswpin', 'pswpout')
+    result = dict.fromkeys(wanted, 0)
+    for line in text.splitlines():
+        fields = line.split()
+        if len(fields) == 2 and fields[0] in wanted:
+            result[fields[0]] = int(fields[1])
+    return result
+
+class HostStats():
+    """Snapshots of the OS counters of the database host"""
+    def __init__(self, source):
+        self.source = source
+        self.reader = reader(source)
+        self.failed = False
+
+    def snapshot(self):
+        """Returns (list of disk tuples, dict of cpu/vm counters), None if reading failed"""
+        try:
+            diskstats, stat, vmstat = self.reader.read(PROCFILES)
+        except (OSError, ValueError, subprocess.SubprocessError) as e:
+            if not self.failed:
+                logging.warning('Reading OS stats from %s failed: %s', self.source, e)
+            self.failed = True
+            return None
+        return parse_diskstats(diskstats), {**parse_stat(stat), **parse_vmstat(vmstat)}
+
+    def drop_caches(self):
+        """Flush and drop the OS page cache of the database host (requires root), returns False if that failed"""
+        try:
+            self.reader.run('sync && echo 1 > /proc/sys/vm/drop_caches')
+            return True
+        except (OSError, subprocess.SubprocessError) as e:
+            logging.warning('Dropping the OS page cache on %s failed (requires root): %s', self.source, e)
+            return False
@@ -0,0 +1,50 @@
+"""
+keys.py - Key distributions for pypgio
+Copyright (c) 2024 - Bart Sjerps <bart@dirty-cache.com>
+License: GPLv3+
+
+Client-side version of the key selection in mypgio(), used by the async engine.
+"""
+
+import math, random
+
+distributions = ('uniform', 'zipf', 'hotspot', 'sequential')
+
+class KeyGenerator():
+    """Start keys in [low, high - work_unit) following the configured distribution"""
+    def __init__(self, config, low, high, work_unit):
+        self.dist  = config.distribution or 'uniform'
+        self.theta = float(config.theta)
+        self.low   = low
+        self.step  = work_unit
+        self.range = high - work_unit - low
+        if self.range < 1:
+            raise ValueError(f'Key range too small for work_unit {work_unit}')
+        if self.dist not in distributions:
+            raise ValueError(f'Unknown distribution {self.dist}')
+
+        self.hot_keys = max(1, int(self.range * config.hot_pct / 100))
+        self.hot_access = config.hot_access
+        self.seq = random.randrange(self.range)
+        if self.theta == 1:
+            self.zipf_base = math.log(self.range + 1)
+        else:
+            self.zipf_base = (self.range + 1) ** (1 - self.theta) - 1
+            self.zipf_exp  = 1 / (1 - self.theta)
+
+    def __call__(self):
+        if self.dist == 'uniform':
+            return self.low + int(random.random() * self.range)
+        elif self.dist == 'zipf':
+            if self.theta == 1:
+                rank = int(math.exp(random.random() * self.zipf_base))
+            else:
+                rank = int((random.random() * self.zipf_base + 1) ** self.zipf_exp)
+            return self.low + min(self.range, rank) - 1
+        elif self.dist == 'hotspot':
+            if random.random() * 100 < self.hot_access or self.hot_keys >= self.range:
+                return self.low + int(random.random() * self.hot_keys)
+            return self.low + self.hot_keys + int(random.random() * (self.range - self.hot_keys))
+        key = self.low + self.seq
+        self.seq = (self.seq + self.step) % self.range
+        return key
@@ -0,0 +1,152 @@
+"""
+layout.py - Physical layout profiles for the pypgio data tables
+Copyright (c) 2024 - Bart Sjerps <bart@dirty-cache.com>
+License: GPLv3+
+
+A layout profile sets the rows per 8 KiB block, the filler width and how
+compressible it is, the index type and whether the keys are stored in key
+order (clustered) or shuffled. The fillfactor (or the filler width) that
+gives the requested rows per block is derived from the heap page format.
+"""
+
+import os
+
+BLOCK_SIZE     = 8192
+PAGE_HEADER    = 24
+LINE_POINTER   = 4
+TUPLE_HEADER   = 24
+MAX_FILLER     = 2000  # larger rows get compressed by TOAST, which breaks the layout
+BRIN_RANGE     = 128   # pages_per_range of the BRIN index (the PostgreSQL default)
+
+indexes = ('btree', 'brin', 'none')
+orders  = ('shuffled', 'clustered')
+
+# Built-in profiles, custom profiles are added with pgio configure --add_layout
+profiles = {
+    'default':   'rows_per_block=1 filler=1024 fillfactor=10',
+    'random':    'rows_per_block=1 filler=1024 fillfactor=10 compress=0',
+    'dense':     'rows_per_block=32',
+    'clustered': 'rows_per_block=32 order=clustered',
+    'brin':      'rows_per_block=32 order=clustered index=brin',
+}
+
+def tuple_size(filler):
+    """Aligned size of a heap tuple (mykey, scratch, filler char(n)) without its line pointer"""
+    varlena = 1 if filler + 1 <= 127 else 4  # short varlena header for small values
+    return (TUPLE_HEADER + 16 + varlena + filler + 7) // 8 * 8
+
+def rows_per_block(filler, fillfactor):
+    """Rows that are inserted in one block before a new block is used"""
+    size = tuple_size(filler)
+    save = BLOCK_SIZE * (100 - fillfactor) // 100
+    free = BLOCK_SIZE - PAGE_HEADER - LINE_POINTER - size  # first row always fits
+    rows = 1
+    while free - LINE_POINTER >= size + save and rows < 291:
+        free -= size + LINE_POINTER
+        rows += 1
+    return rows
+
+class Layout():
+    """Layout profile, from a spec 'key=value ...' (keys: rows_per_block, filler,
+    fillfactor, compress, index, order). Raises ValueError for impossible layouts"""
+    def __init__(self, name, spec):
+        self.name = name
+        values = dict(item.partition('=')[::2] for item in spec.split())
+        unknown = set(values) - {'rows_per_block', 'filler', 'fillfactor', 'compress', 'index', 'order'}
+        if unknown:
+            raise ValueError(f'Layout {name}: unknown setting(s) {", ".join(sorted(unknown))}')
+        try:
+            self.rows_per_block = int(values.get('rows_per_block', 1))
+            self.compress       = int(values.get('compress', 100))
+            filler              = int(values['filler']) if 'filler' in values else None
+            fillfactor          = int(values['fillfactor']) if 'fillfactor' in values else None
+        except ValueError as e:
+            raise ValueError(f'Layout {name}: {e}') from e
+        self.index = values.get('index', 'btree')
+        self.order = values.get('order', 'shuffled')
+        if self.index not in indexes:
+            raise ValueError(f'Layout {name}: index must be one of {", ".join(indexes)}')
+        if self.order not in orders:
+            raise ValueError(f'Layout {name}: order must be one of {", ".join(orders)}')
+        if not 0 <= self.compress <= 100:
+            raise ValueError(f'Layout {name}: compress must be between 0 and 100')
+
+        # Widest filler (if not set) with a fillfactor (the highest, if not set) that gives exactly rows_per_block
+        fillers     = [filler] if filler else range(MAX_FILLER, 0, -1)
+        fillfactors = [fillfactor] if fillfactor else range(100, 9, -1)
+        self.filler, self.fillfactor = None, None
+        for width in fillers:
+            if not 1 <= width <= MAX_FILLER or rows_per_block(width, fillfactors[0]) < self.rows_per_block:
+                continue
+            ff = next((ff for ff in fillfactors if rows_per_block(width, ff) == self.rows_per_block), None)
+            if ff:
+                self.filler, self.fillfactor = width, ff
+                break
+        if self.filler is None:
+            raise ValueError(f'Layout {name}: {self.rows_per_block} rows per block is not possible'
+                + (f' with filler {filler}' if filler else '') + (f' and fillfactor {fillfactor}' if fillfactor else ''))
+
+    def __str__(self):
+        """Layout as stored in pgio_tables (the default profile gives the original layout string)"""
+        index  = 'none' if self.index == 'none' else f'{self.index}(mykey)'
+        layout = f'fillfactor={self.fillfactor} filler=char({self.filler}) index={index}'
+        if self.compress != 100:
+            layout += f' compress={self.compress}'
+        if self.order != 'shuffled':
+            layout += f' order={self.order}'
+        return layout
+
+    def describe(self):
+        return f'{self.name} ({self.rows_per_block} rows/block, filler {self.filler}, {self.compress}% compressible, {self.index} index, {self.order})'
+
+    @property
+    def random_chars(self):
+        """Number of random (incompressible) characters in the filler, the rest is a repeated character"""
+        return self.filler - self.filler * self.compress // 100
+
+    def make_filler(self):
+        """Filler for one row (client side loader)"""
+        return 'X' * (self.filler - self.random_chars) + os.urandom(self.random_chars // 2 + 1).hex()[:self.random_chars]
+
+    def range_blocks(self, unit, rows):
+        """Expected heap blocks touched by a range of <unit> consecutive keys in a table of <rows> rows.
+        Clustered: the keys are loaded in key order, so the range covers consecutive blocks.
+        Shuffled: the loaders store the keys in the order of a pseudo-random permutation of all keys
+        (lib/loader.py, pgio_permute.sql), so the range is a random sample of the rows of all blocks"""
+        if self.rows_per_block == 1:
+            return unit
+        if self.order == 'clustered':
+            return (unit - 1) / self.rows_per_block + 1
+        # Probability that a block holds none of the selected rows (sampling without replacement)
+        untouched = 1.0
+        for i in range(min(unit, rows - self.rows_per_block)):
+            untouched *= (rows - self.rows_per_block - i) / (rows - i)
+        return rows / self.rows_per_block * (1 - untouched)
+
+    def scan_blocks(self, unit, rows):
+        """Expected heap blocks read by a select or update of a range of <unit> keys.
+        BRIN: the bitmap heap scan is lossy, it reads every block of each block range (BRIN_RANGE
+        blocks) that overlaps the key range, on average (blocks - 1) / BRIN_RANGE + 1 ranges.
+        No index, or BRIN on shuffled keys (every block range holds all key values): full table scan"""
+        table_blocks = rows / self.rows_per_block
+        if self.index == 'none' or (self.index == 'brin' and self.order == 'shuffled'):
+            return table_blocks
+        if self.index == 'brin':
+            return min(table_blocks, self.range_blocks(unit, rows) - 1 + BRIN_RANGE)
+        return self.range_blocks(unit, rows)
+
+    def blocks(self, count, unit, rows):
+        """Heap blocks touched by <count> rows, accessed in ranges of <unit> keys (0: full table scan)"""
+        if not unit:
+            return round(count / self.rows_per_block)
+        if self.rows_per_block == 1 and self.index == 'btree':
+            return count
+        return round(count / unit * self.scan_blocks(unit, rows))
+
+def get_layout(config):
+    """Layout profile selected in the config (built-in or custom)"""
+    name  = config.layout or 'default'
+    specs = {**profiles, **(config.layouts or {})}
+    if name not in specs:
+        raise ValueError(f'Layout {name} not found, available: {", ".join(sorted(specs))}')
+    return Layout(name, specs[name])
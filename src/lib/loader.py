@@ -0,0 +1,63 @@
+"""
+loader.py - Client-side row generator for loading pgio tables with COPY
+Copyright (c) 2024 - Bart Sjerps <bart@dirty-cache.com>
+License: GPLv3+
+
+Shuffled tables get their keys from a seeded pseudo-random permutation of
+the full key space (a Feistel network with cycle walking). Chunk [low, high)
+holds the keys at permutation positions low..high-1, so every chunk has keys
+from the whole table while the chunks are loaded in parallel. The permutation
+is computed per key and needs no memory. pgio_permute() in pgio_permute.sql
+is the same permutation for the seed table.
+"""
+
+import random, zlib
+
+ROUNDS = 4
+MULTIPLIER = 0x5bd1e995  # < 2^31, so the round function fits in a signed bigint in SQL
+MODULUS = 2147483647
+
+def permutation_seed(name):
+    """Permutation seed for a table: fixed per table name, so resumed loads use the same permutation"""
+    return zlib.crc32(name.encode())
+
+class Permutation():
+    """Bijection of [0, n) to [0, n) for seed <seed>. Feistel network on the smallest
+    even number of bits that covers n, values >= n are mapped again (cycle walking)"""
+    def __init__(self, n, seed):
+        self.n    = n
+        self.half = 1
+        while 1 << (2 * self.half) < n:
+            self.half += 1
+        self.mask = (1 << self.half) - 1
+        self.keys = [(seed % MODULUS) * (i + 1) * 16807 % MODULUS & self.mask for i in range(ROUNDS)]
+
+    def feistel(self, x):
+        left, right = x >> self.half, x & self.mask
+        for key in self.keys:
+            left, right = right, left ^ (((right ^ key) * MULTIPLIER + (right >> 5)) & self.mask)
+        return (left << self.half) | right
+
+    def __call__(self, pos):
+        x = self.feistel(pos)
+        while x >= self.n:
+            x = self.feistel(x)
+        return x
+
+def shuffled_keys(low, high, rows, seed):
+    """Keys 1..rows at the permutation positions [low, high) (1 based, as the key ranges of chunks())"""
+    permute = Permutation(rows, seed)
+    for pos in range(low - 1, high - 1):
+        yield 1 + permute(pos)
+
+def table_rows(low, high, layout, rows, seed):
+    """Generate (mykey, scratch, filler) rows for chunk [low, high) of a table with <rows> rows:
+    shuffled keys (permutation <seed>) or keys in key order (clustered), with the filler of the layout profile"""
+    keys = shuffled_keys(low, high, rows, seed) if layout.order == 'shuffled' else range(low, high)
+    if layout.random_chars == 0:
+        filler = layout.make_filler()
+        for key in keys:
+            yield key, random.randrange(1000000000), filler
+    else:
+        for key in keys:
+            yield key, random.randrange(1000000000), layout.make_filler()
@@ -0,0 +1,116 @@
+"""
+metrics.py - OpenMetrics exporter for pypgio
+Copyright (c) 2024 - Bart Sjerps <bart@dirty-cache.com>
+License: GPLv3+
+
+Serves the live state of a run on http://<host>:<port>/metrics so Prometheus
+can scrape it. Database counters come from the sampler snapshots, operation
+counts and latency histograms from the worker progress (pgio_progress) or
+directly from the async sessions.
+"""
+
+import logging
+from threading import Thread, Lock
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+# name: (type, help)
+metric_info = {
+    'pgio_run':             ('gauge',   'Run ID of the current run'),
+    'pgio_workers_active':  ('gauge',   'Number of pgio worker sessions executing a query'),
+    'pgio_ops_per_second':  ('gauge',   'Operations/s in the last interval, from the worker progress'),
+    'pgio_blocks_touched':  ('counter', 'Heap blocks touched by the pgio operations since the start of the run (worker progress)'),
+    'pgio_blocks_read':     ('counter', 'Blocks read from storage in the pgio database since the start of the run'),
+    'pgio_blocks_hit':      ('counter', 'Blocks found in shared buffers in the pgio database since the start of the run'),
+    'pgio_blocks_written':  ('counter', 'Blocks written by all backends since the start of the run (pg_stat_io, PostgreSQL 16+)'),
+    'pgio_tuples_fetched':  ('counter', 'Tuples fetched in the pgio database since the start of the run'),
+    'pgio_tuples_updated':  ('counter', 'Tuples updated in the pgio database since the start of the run'),
+}
+
+def latency_bounds():
+    """Upper bounds in seconds of the log2 latency buckets (bucket b: [2^b, 2^(b+1)) microseconds)"""
+    return [2 ** (b + 1) / 1000000 for b in range(31)]
+
+class Metrics():
+    """Thread safe store of the current values, rendered in OpenMetrics text format"""
+    def __init__(self):
+        self.lock   = Lock()
+        self.values = {}
+        self.hist   = {'select': [0] * 32, 'update': [0] * 32}
+        self.sums   = {'select': 0.0, 'update': 0.0}
+
+    def update(self, **values):
+        with self.lock:
+            self.values.update(values)
+
+    def observe(self, optype, bucket, count=1, seconds=0.0):
+        """Add <count> operations of optype ('select' or 'update') to a latency bucket, with a total latency of <seconds>"""
+        with self.lock:
+            self.hist[optype][bucket] += count
+            self.sums[optype] += seconds
+
+    def set_histogram(self, optype, hist, seconds=0.0):
+        """Replace the histogram and latency sum of optype with the totals of the worker heartbeats"""
+        with self.lock:
+            self.hist[optype] = list(hist)
+            self.sums[optype] = seconds
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for name, (mtype, text) in metric_info.items():
+                if self.values.get(name) is None:
+                    continue
+                lines.append(f'# TYPE {name} {mtype}')
+                lines.append(f'# HELP {name} {text}')
+                suffix = '_total' if mtype == 'counter' else ''
+                lines.append(f'{name}{suffix} {self.values[name]}')
+
+            lines.append('# TYPE pgio_ops counter')
+            lines.append('# HELP pgio_ops Operations completed')
+            for optype, hist in self.hist.items():
+                lines.append(f'pgio_ops_total{{optype="{optype}"}} {sum(hist)}')
+
+            lines.append('# TYPE pgio_latency_seconds histogram')
+            lines.append('# HELP pgio_latency_seconds Operation latency (log2 buckets)')
+            for optype, hist in self.hist.items():
+                total = 0
+                for bound, cnt in zip(latency_bounds(), hist):
+                    total += cnt
+                    lines.append(f'pgio_latency_seconds_bucket{{optype="{optype}",le="{bound:g}"}} {total}')
+                lines.append(f'pgio_latency_seconds_bucket{{optype="{optype}",le="+Inf"}} {sum(hist)}')
+                lines.append(f'pgio_latency_seconds_count{{optype="{optype}"}} {sum(hist)}')
+                lines.append(f'pgio_latency_seconds_sum{{optype="{optype}"}} {self.sums[optype]:g}')
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+class MetricsServer(Thread):
+    """HTTP server for the metrics endpoint, running in a daemon thread"""
+    def __init__(self, port, metrics):
+        super().__init__(name='metrics', daemon=True)
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logging.debug('metrics: ' + format, *args)
+
+        self.server = ThreadingHTTPServer(('', port), Handler)
+
+    def run(self):
+        self.server.serve_forever()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.join()
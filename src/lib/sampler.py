@@ -0,0 +1,80 @@
+"""
+sampler.py - Background statistics sampler for pypgio
+Copyright (c) 2024 - Bart Sjerps <bart@dirty-cache.com>
+License: GPLv3+
+"""
+
+import logging, time
+from threading import Thread, Event
+
+from psycopg import DatabaseError
+from lib.database import Database
+from lib.layout import get_layout
+
+class Sampler(Thread):
+    """Snapshot the database I/O stats every <interval> seconds using a separate connection.
+    If metrics is set, also publish the live counters for the metrics exporter.
+    If host (HostStats) is set, also snapshot the OS counters of the database host.
+    Set fts for full table scan runs (the blocks touched are converted with unit 0)"""
+    def __init__(self, config, interval, run_id, metrics=None, host=None, fts=False):
+        super().__init__(name='sampler', daemon=True)
+        self.db       = Database(config, name='pgio_sampler')
+        self.config   = config
+        self.interval = interval
+        self.run_id   = run_id
+        self.metrics  = metrics
+        self.host     = host
+        self.fts      = fts
+        self.layout   = get_layout(config)
+        self.stopped  = Event()
+
+    def snapshot(self):
+        """Database counters and the operation counters of the workers (pgio_progress)"""
+        stats = self.db.live_stats()
+        stats.update(self.db.progress_counts(self.run_id)._asdict())
+        stats['ts'] = time.monotonic()
+        return stats
+
+    def publish(self, start, prev):
+        """Publish the counters since <start> and the rate since <prev>, returns the current snapshot.
+        Operations and blocks touched come from the worker progress: the tuples fetched also count
+        the rows of the other sessions, and a row is only a block if there is one row per block"""
+        stats    = self.snapshot()
+        elapsed  = stats['ts'] - prev['ts']
+        ops      = stats['selects'] + stats['updates'] - prev['selects'] - prev['updates']
+        written  = stats.get('blks_written')
+        select_unit, update_unit = (0, 0) if self.fts else (self.config.work_unit, self.config.update_unit)
+        touched  = self.layout.blocks(stats['select_rows'] - start['select_rows'], select_unit, self.config.scale) \
+                 + self.layout.blocks(stats['update_rows'] - start['update_rows'], update_unit, self.config.scale)
+        self.metrics.update(
+            pgio_run            = self.run_id,
+            pgio_workers_active = stats['workers'],
+            pgio_ops_per_second = round(ops / elapsed, 2) if elapsed > 0 else 0,
+            pgio_blocks_touched = touched,
+            pgio_blocks_read    = stats['blks_read'] - start['blks_read'],
+            pgio_blocks_hit     = stats['blks_hit'] - start['blks_hit'],
+            pgio_blocks_written = None if written is None else written - start['blks_written'],
+            pgio_tuples_fetched = stats['tup_fetched'] - start['tup_fetched'],
+            pgio_tuples_updated = stats['tup_updated'] - start['tup_updated'])
+        for optype, (hist, seconds) in self.db.progress(self.run_id).items():
+            self.metrics.set_histogram(optype, hist, seconds)
+        return stats
+
+    def run(self):
+        try:
+            if self.metrics:
+                start = prev = self.snapshot()
+            while not self.stopped.wait(self.interval):
+                self.db.update_stats(self.run_id, self.host)
+                if self.metrics:
+                    prev = self.publish(start, prev)
+            if self.metrics:
+                self.publish(start, prev)
+
+        except DatabaseError as e:
+            logging.error(e)
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        self.db.close()
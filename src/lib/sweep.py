@@ -0,0 +1,36 @@
+"""
+sweep.py - Concurrency sweep helpers for pypgio
+Copyright (c) 2024 - Bart Sjerps <bart@dirty-cache.com>
+License: GPLv3+
+"""
+
+def doubling(maximum):
+    """Worker counts 1, 2, 4, ... up to and including maximum"""
+    steps = []
+    n = 1
+    while n < maximum:
+        steps.append(n)
+        n *= 2
+    steps.append(maximum)
+    return steps
+
+def scaling(points):
+    """Scaling efficiency (%) per step: relative throughput gain divided by relative worker increase.
+    100% is linear scaling, 0% means the extra workers added nothing. points is a list of (workers, throughput),
+    throughput may be Decimal (NUMERIC from the database)"""
+    result = [None]
+    points = [(workers, float(throughput)) for workers, throughput in points]
+    for (w0, t0), (w1, t1) in zip(points, points[1:]):
+        if w1 <= w0 or not t0:
+            result.append(None)
+        else:
+            result.append(100 * (t1 / t0 - 1) / (w1 / w0 - 1))
+    return result
+
+def find_knee(points, threshold=10):
+    """Index of the saturation knee: the last step before adding workers adds less than
+    <threshold>% scaling efficiency. Returns None if throughput keeps scaling"""
+    for i, efficiency in enumerate(scaling(points)):
+        if efficiency is not None and efficiency < threshold:
+            return i - 1
+    return None
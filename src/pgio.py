@@ -5,10 +5,10 @@ Based on the original PGIO by Kevin Closson - see https://github.com/therealkevi
 License: GPLv3+
 """
 
-import os, sys, argparse, logging
+import os, sys, time, argparse, logging, asyncio
 from datetime import datetime
-from threading import Thread, Event
-from queue import Queue
+from threading import Thread, Event, Barrier, BrokenBarrierError
+from queue import Queue, Empty
 from pkgutil import get_data
 
 sys.dont_write_bytecode = True
@@ -20,8 +20,15 @@ logging.basicConfig(level=logging.INFO,
 try:
     from psycopg import OperationalError, DatabaseError
     from lib.pretty import Pretty
-    from lib.database import Database
-    from lib.config import Config, printversion, versioninfo
+    from lib.database import Database, table_layout, SLICE
+    from lib.sampler import Sampler
+    from lib.aio import run_sessions
+    from lib.metrics import Metrics, MetricsServer
+    from lib.hoststats import HostStats
+    from lib.sweep import doubling, scaling, find_knee
+    from lib.keys import distributions
+    from lib.layout import get_layout, profiles
+    from lib.config import Config, printversion, versioninfo, key_range, chunks, place_tables, table_schema
 
 except ImportError as e:
     if sys.stdout.isatty():
@@ -45,6 +52,11 @@ except ImportError as e:
 
     sys.exit(10)
 
+AGENT_WAIT        = 30  # seconds to wait for agents to register
+AGENT_START_DELAY = 5   # seconds between assigning the work and the shared start
+TARGET_WAIT       = 60  # seconds to wait for all targets to be ready to start
+CONNECT_WAIT      = 60  # seconds to wait for the worker sessions to connect (after the ramp-up)
+
 def complete(args, config):
     """Dump the bash_completions on stdout"""
     txt = get_data('install', 'complete_pgio')
@@ -55,13 +67,83 @@ def destroy(args, config):
     db = Database(config)
     db.destroy()
 
+def each_target(args, config):
+    """Run a setup or maintenance command on each target profile of --targets in turn"""
+    for target in args.targets:
+        config.for_target(target)
+    for target in args.targets:
+        logging.info('Target %s', target)
+        args.func(args, config.for_target(target))
+
 def abort(args, config):
     db = Database(config)
-    db.script('pgio_abort.sql')
+    if args.graceful:
+        stopped = db.stop_run()
+        logging.info("Stopping run(s): %s", ', '.join(map(str, stopped)) or 'none active')
+    else:
+        db.script('pgio_abort.sql')
 
 def configure(args, config):
     config.configure(args)
 
+def pgio_tables(db, config):
+    """Names of the tables used by the workload"""
+    return [f'pgio{n}' for n in range(min(config.schemas, db.schemas))]
+
+def cache_check(db, tables):
+    """Warn if the tables fit in the cache, so the workload would not reach storage"""
+    size = db.cache_size(tables)
+    if size.working_set <= size.shared_buffers:
+        logging.warning("Working set (%s MiB) fits in shared_buffers (%s MiB), the workload will not reach storage",
+            size.working_set, size.shared_buffers)
+    elif size.working_set <= size.effective_cache_size:
+        logging.warning("Working set (%s MiB) may fit in the OS page cache (effective_cache_size %s MiB)",
+            size.working_set, size.effective_cache_size)
+    return size
+
+def prewarm(args, config):
+    """Load the pgio tables and indexes into the cache with pg_prewarm"""
+    db = Database(config)
+    if not db.extension('pg_prewarm'):
+        raise ValueError('Prewarm requires the pg_prewarm extension')
+    tables = pgio_tables(db, config)
+    size = db.cache_size(tables)
+    if args.mode == 'buffer' and size.working_set > size.shared_buffers:
+        logging.warning("Working set (%s MiB) is larger than shared_buffers (%s MiB), only part of it stays cached",
+            size.working_set, size.shared_buffers)
+    if not run_tasks(args, config, 'Prewarm', [('prewarm', table_name, args.mode) for table_name in tables]):
+        raise ValueError('Prewarm failed, the cache state is not recorded')
+    db.cache_event('prewarm' if args.mode == 'buffer' else f'prewarm {args.mode}')
+
+def coldstart(args, config):
+    """Evict the pgio tables and indexes from shared_buffers and drop the OS page cache"""
+    db = Database(config)
+    tables = pgio_tables(db, config)
+    skipped = []
+    try:
+        db.execute('CHECKPOINT')
+    except DatabaseError as e:
+        logging.warning('Checkpoint failed: %s', str(e).strip())
+        skipped.append('no checkpoint')
+
+    if db.extension('pg_buffercache') and db.has_function('pg_buffercache_evict'):
+        if not run_tasks(args, config, 'Evict', [('evict', table_name) for table_name in tables]):
+            skipped.append('not evicted')
+    else:
+        logging.warning('Evicting from shared_buffers requires pg_buffercache on PostgreSQL 17+, restart PostgreSQL for a cold start')
+        skipped.append('not evicted')
+
+    if not config.osstats:
+        logging.warning('OS page cache not dropped, configure --osstats to access the database host')
+        skipped.append('page cache not dropped')
+    elif not HostStats(config.osstats).drop_caches():
+        skipped.append('page cache not dropped')
+
+    # The cache state of the next run tells which steps were skipped, nothing is recorded if no cache was emptied
+    if 'not evicted' in skipped and 'page cache not dropped' in skipped:
+        raise ValueError('Cold start failed, no cache was emptied, the cache state is not recorded')
+    db.cache_event('coldstart' + (f' ({", ".join(skipped)})' if skipped else ''))
+
 def tablesizes(args, config):
     db = Database(config)
     head, data = db.report('pgio_tablesize.sql')
@@ -69,144 +151,784 @@ def tablesizes(args, config):
     pretty.rows(data)
     pretty.print(args)
 
-def create_thread(n, args, config, queue):
-    """Thread for creating and loading a data table"""
+    head, data = db.report('pgio_tablespace_size.sql')
+    if len(data) > 1:
+        pretty = Pretty(head, 'Per tablespace')
+        pretty.rows(data)
+        pretty.print(args)
+
+def create_thread(n, args, config, queue, errors):
+    """Thread for running setup tasks (Database method name + arguments) from the queue, errors are added to <errors>"""
     try:
         db = Database(config, name=f'create_{n}')
         if config.tablespace:
             db.default_tablespace(config.tablespace)
 
         while True:
-            if queue.empty():
+            try:
+                task, *params = queue.get_nowait()
+            except Empty:
                 break
-            table_name = queue.get(timeout=10)
-            logging.info("Worker %s - Creating table %s", n, table_name)
-            db.create_table(table_name)
+            logging.debug("Worker %s - %s %s", n, task, params)
+            getattr(db, task)(*params)
+        db.close()
 
-    except DatabaseError as e:
+    # Connect errors are ValueErrors; setup() stops if any task failed
+    except (DatabaseError, ValueError) as e:
         logging.error(e)
+        errors.append(e)
 
-def worker_thread(schema_num, args, config, syncwait):
-    """Thread for running one task against one tabletable"""
+def run_tasks(args, config, title, tasks):
+    """Run setup tasks on a pool of <args.threads> create threads, returns True if all tasks completed"""
+    queue, errors = Queue(), []
+    for task in tasks:
+        queue.put(task)
+
+    threads = []
+    t_start = datetime.now()
+    for j in range(min(args.threads, len(tasks))):
+        proc = Thread(target=create_thread, name='creator', args=(j, args, config, queue, errors))
+        proc.start()
+        threads.append(proc)
+
+    logging.info("%s: %s tasks on %s threads...", title, len(tasks), len(threads))
+
+    # Wait for all threads to finish
+    for thread in threads:
+        thread.join()
+    t_end   = datetime.now()
+    runtime = (t_end - t_start).total_seconds()
+    logging.info('%s finished in %s seconds', title, round(runtime, 2))
+    return not errors and queue.empty()
+
+def worker_thread(num, worker, run_id, args, config, syncwait, connects, timeout=3, delay=0):
+    """Thread for running one task against one table (key range). Connects after <delay> seconds (ramp-up)
+    and puts (num, connect time or None if connecting failed) on the connects queue"""
+    db = None
     try:
-        db = Database(config, name=f'pgio_{schema_num}')
-        table_name = f'pgio{schema_num}'
+        time.sleep(delay)
+        try:
+            db = Database(config, name=f'pgio_{num}')
+        finally:
+            connects.put((num, db.connect_tm if db else None))
+        table_name, key_low, key_high = worker
 
-        if not syncwait.wait(timeout=3):
+        if not syncwait.wait(timeout=timeout):
             logging.error("Timeout")
             sys.exit(1)
 
+        # Short calls while sampling, so the database statistics move during the run
+        slice_tm = SLICE if args.interval > 0 else 0
         if args.fts:
-            db.run_fts(table_name, args.runtime, datetime.now())
+            db.run_fts(run_id, table_name, args.runtime, datetime.now(), get_layout(config), slice_tm)
 
         else:
-            db.run_task(table_name, config.update_pct, args.runtime, config.scale, config.work_unit, config.update_unit, datetime.now())
+            db.run_task(run_id, table_name, config, args.runtime, key_low, key_high, args.rate / args.threads, datetime.now(), slice_tm)
+
+    except (DatabaseError, ValueError) as e:
+        logging.error(e)
+
+    finally:
+        if db:
+            db.close()
+
+def async_thread(workers, run_id, args, config, syncwait, connects, metrics=None, timeout=3, first=0):
+    """Thread running all sessions of the asyncio engine in one event loop"""
+    try:
+        rate = args.rate / args.threads
+        results = asyncio.run(run_sessions(config, workers, args.runtime, args.depth, rate, syncwait, metrics, timeout, run_id,
+            connects, config.ramp_up or 0, first))
+
+        db, layout = Database(config, name='pgio_async'), get_layout(config)
+        for table_name, ts, data in results:
+            db.save_results(run_id, data, table_name, config.work_unit, config.update_unit, ts, rate, layout, config.scale)
+        db.close()
+
+    except TimeoutError:
+        logging.error("Timeout")
 
     except DatabaseError as e:
         logging.error(e)
 
+    except Exception as e:
+        # Not expected, run_sessions() already handles failing sessions and watcher: log with the traceback
+        logging.exception("Async engine failed: %s", e)
+
+def start_workers(workers, run_id, args, config, syncwait, connects, metrics=None, timeout=3, first=0):
+    """Start the worker threads, they connect (spread over config.ramp_up seconds), report the connect time
+    on the connects queue and start the workload when syncwait is set.
+    first is the number of the first worker (for agents running part of the workers)"""
+    threads = []
+    ramp_up = config.ramp_up or 0
+    timeout = timeout + ramp_up + CONNECT_WAIT
+    if args.engine == 'async':
+        proc = Thread(target=async_thread, args=(workers, run_id, args, config, syncwait, connects, metrics, timeout, first))
+        proc.start()
+        threads.append(proc)
+
+    else:
+        for i, worker in enumerate(workers):
+            delay = ramp_up * i / len(workers)
+            proc = Thread(target=worker_thread, args=(first + i, worker, run_id, args, config, syncwait, connects, timeout, delay))
+            proc.start()
+            threads.append(proc)
+    return threads
+
+def wait_connects(connects, count, timeout, beat=None):
+    """Collect the connect times of <count> worker sessions from the connects queue.
+    Returns {worker: seconds} of the sessions that connected within <timeout> seconds.
+    beat() (if set) is called every second while waiting"""
+    connected = {}
+    deadline  = time.monotonic() + timeout
+    while len(connected) < count:
+        try:
+            num, connect_tm = connects.get(timeout=max(0, min(1, deadline - time.monotonic())))
+        except Empty:
+            if time.monotonic() >= deadline:
+                logging.warning("%s of %s sessions connected, starting without the others", len(connected), count)
+                break
+            if beat:
+                beat()
+            continue
+        connected[num] = connect_tm
+    return {num: connect_tm for num, connect_tm in connected.items() if connect_tm is not None}
+
+def dispatch(db, run_id, workers, args, config):
+    """Divide the workers over <args.agents> idle agents with a shared start time.
+    Returns the start time (database clock)"""
+    deadline = time.monotonic() + AGENT_WAIT
+    agents = db.idle_agents()
+    while len(agents) < args.agents:
+        if time.monotonic() > deadline:
+            raise ValueError(f"Found {len(agents)} of {args.agents} agents, start them with: pgio agent")
+        time.sleep(1)
+        agents = db.idle_agents()
+
+    agents = agents[:args.agents]
+    options = {k: getattr(args, k) for k in ('runtime', 'threads', 'engine', 'depth', 'rate', 'fts')}
+    start_at = db.start_time(AGENT_START_DELAY + (config.ramp_up or 0))
+    for i, agent in enumerate(agents):
+        first, last = len(workers) * i // len(agents), len(workers) * (i + 1) // len(agents)
+        task = {'config': config.snapshot(), 'options': options, 'first': first, 'workers': workers[first:last]}
+        db.assign_agent(agent.agent_id, run_id, task, start_at)
+        logging.info("Agent %s (%s on %s): workers %s-%s", agent.agent_id, agent.name, agent.host, first, last - 1)
+    return start_at
+
+def wait_agents(db, run_id):
+    """Wait until the agents of run <run_id> have finished"""
+    while True:
+        status = db.agent_status(run_id)
+        if not any(a.state in ('assigned', 'running') and not a.stale for a in status):
+            break
+        time.sleep(1)
+    for a in status:
+        if a.state == 'failed' or (a.stale and a.state != 'done'):
+            logging.error("Agent %s (%s) failed", a.agent_id, a.name)
+
+def agent(args, config):
+    """Register as agent and run the workers assigned by a coordinator (pgio run --agents)"""
+    db = Database(config, name='pgio_agent')
+    name = args.name or os.uname().nodename
+    agent_id = db.register_agent(name)
+    logging.info("Agent %s registered as %s, waiting for work...", agent_id, name)
+    try:
+        while True:
+            task = db.poll_agent(agent_id)
+            if task is None:
+                raise ValueError(f"Agent {agent_id} was removed")
+            if task.state != 'assigned':
+                time.sleep(1)
+                continue
+
+            polled = time.monotonic()
+            db.set_agent_state(agent_id, 'running')
+            state = 'done'
+            try:
+                run_agent_task(db, agent_id, task, config, polled)
+            except (DatabaseError, TimeoutError) as e:
+                logging.error(e)
+                state = 'failed'
+            db.set_agent_state(agent_id, state)
+            logging.info("Run %s %s, waiting for work...", task.run_id, state)
+    finally:
+        db.unregister_agent(agent_id)
+
+def run_agent_task(db, agent_id, task, config, polled):
+    """Run the assigned workers of a run, starting at the shared start time"""
+    work = task.task
+    # Use the workload settings of the coordinator, but our own connection settings
+    config.info.update({k: v for k, v in work['config'].items() if not k.startswith('db')})
+    args = argparse.Namespace(**work['options'])
+    workers = [tuple(w) for w in work['workers']]
+    logging.info("Run %s: %s workers, starting in %s seconds", task.run_id, len(workers), round(task.delay, 2))
+
+    syncwait, connects = Event(), Queue()
+    threads = start_workers(workers, task.run_id, args, config, syncwait, connects, timeout=max(0, task.delay) + 3, first=work['first'])
+    # The delay (start delay + ramp-up) can be longer than the agent timeout, keep sending heartbeats
+    beat = lambda: db.poll_agent(agent_id)
+    connected = wait_connects(connects, len(workers), max(0, task.delay - (time.monotonic() - polled)), beat)
+    remaining = task.delay - (time.monotonic() - polled)
+    while remaining > 0:
+        time.sleep(min(1, remaining))
+        beat()
+        remaining = task.delay - (time.monotonic() - polled)
+    syncwait.set()
+    db.save_connects(task.run_id, connected, bool(config.pool) and args.engine != 'async')
+
+    # Keep sending heartbeats while the workers run
+    for thread in threads:
+        while thread.is_alive():
+            thread.join(1)
+            db.poll_agent(agent_id)
+
+def assign_workers(threads, schemas, rows):
+    """Distribute workers round-robin over the tables. Workers sharing a table
+    each get a disjoint part of the key range. Returns (table_name, key_low, key_high) per worker"""
+    workers = []
+    for i in range(threads):
+        schema_num = i % schemas
+        parts = len(range(schema_num, threads, schemas))
+        workers.append((f'pgio{schema_num}',) + key_range(rows, i // schemas, parts))
+    return workers
+
+def table_placement(config):
+    """(table_name, tablespace, schema) of the data tables"""
+    tables = [f'pgio{i}' for i in range(config.schemas)]
+    spaces = place_tables(len(tables), config.tablespaces)
+    return [(table_name, tablespace, table_schema(config, table_name)) for table_name, tablespace in zip(tables, spaces)]
+
 def setup(args, config):
+    layout = get_layout(config)
+    logging.info('Layout: %s', layout.describe())
+    if layout.index == 'brin' and layout.order == 'shuffled':
+        logging.warning('A BRIN index on shuffled keys cannot skip any blocks, use order=clustered')
+    if layout.index == 'none':
+        logging.warning('No index: every select will scan the whole table')
+
     db = Database(config)
     db.schema()
     if config.tablespace:
         db.default_tablespace(config.tablespace)
 
-    # Drop extra tables
+    # Drop extra tables, and tables in the wrong schema
     logging.info('Purging excess tables...')
-    for t in db.script('pgio_purgelist.sql', (config.schemas,)):
-        db.drop_table(t[0])
+    for table_name, schema in db.script('pgio_purgelist.sql', {'schemas': config.schemas, 'table_schemas': bool(config.table_schemas)}):
+        db.drop_table(table_name, schema)
 
-    logging.info('Creating seed table with %s rows', config.scale)
-    t_start = datetime.now()
-    db.create_seed(config.scale)
-    t_end   = datetime.now()
-    runtime = (t_end - t_start).total_seconds()
-    logging.info('Seed table created in %s seconds', round(runtime,2))
+    # Split the key range in chunks that are loaded in parallel
+    parts  = chunks(config.scale)
+    status = db.table_status()
 
-    # Queue with table names for distributing tasks to the create threads
-    queue = Queue()
-    for i in range(config.schemas):
-        table_name = f'pgio{i}'
-        queue.put(table_name)
+    # Reuse tables that are complete, resume partially loaded tables, (re)create the others
+    todo, indexes = {}, []
+    for table_name, tablespace, schema in table_placement(config):
+        st = status.get(table_name)
+        if st and not args.force and st.rows == config.scale and st.layout == table_layout(layout, tablespace, schema) and not (st.unlogged and not st.ready):
+            if st.ready:
+                logging.info("Table %s is up to date, skipping", table_name)
+                continue
+            logging.info("Resuming table %s (%s of %s chunks loaded)", table_name, len(st.parts), len(parts))
+            todo[table_name] = set(range(len(parts))) - set(st.parts)
+            indexes.append(('index_table', table_name, len(parts), False, tablespace, layout.index))
 
-    # Create and start the create threads
-    threads = []
-    t_start = datetime.now()
-    for j in range(args.threads):
-        proc = Thread(target=create_thread, name='creator', args=(j, args, config, queue))
-        proc.start()
-        threads.append(proc)
+        else:
+            logging.info("Creating table %s.%s%s", schema, table_name, f' in tablespace {tablespace}' if tablespace else '')
+            db.create_table(table_name, config.scale, layout, args.unlogged, tablespace, schema)
+            todo[table_name] = set(range(len(parts)))
+            indexes.append(('index_table', table_name, len(parts), args.unlogged, tablespace, layout.index))
 
-    logging.info("Started %s threads...", len(threads))
+    if not indexes:
+        logging.info('All tables are up to date')
+        return
 
-    # Wait for all threads to finish
-    for thread in threads:
-        thread.join()
+    if args.loader == 'copy':
+        logging.info('Loading %s rows per table in %s chunks using COPY', config.scale, len(parts))
+        loads = [('copy_table', table_name, layout, config.scale, part) + parts[part] for part in range(len(parts)) for table_name in todo if part in todo[table_name]]
+
+    else:
+        st = status.get('pgio_seed')
+        if st and not args.force and st.rows == config.scale and st.layout == db.seed_layout(layout):
+            seed_todo = [part for part in range(len(parts)) if part not in st.parts]
+        else:
+            logging.info('Creating seed table with %s rows in %s chunks', config.scale, len(parts))
+            db.create_seed(parts, config.scale, layout)
+            seed_todo = list(range(len(parts)))
+
+        if seed_todo and not run_tasks(args, config, 'Seed table', [('load_seed', layout, config.scale, part) + parts[part] for part in seed_todo]):
+            raise ValueError('Loading the seed table failed, run setup again to resume')
+        loads = [('load_table', table_name, part) for part in range(len(parts)) for table_name in todo if part in todo[table_name]]
+
+    # Tables are only indexed (and marked ready) if all chunks loaded
+    t_start = datetime.now()
+    if not run_tasks(args, config, 'Loading tables', loads):
+        raise ValueError('Loading the tables failed, run setup again to resume')
+    if not run_tasks(args, config, 'Indexing tables', indexes):
+        raise ValueError('Indexing the tables failed, run setup again to resume')
     t_end   = datetime.now()
     runtime = (t_end - t_start).total_seconds()
     logging.info('Data tables created in %s seconds', round(runtime, 2))
 
-def report(args, config):
+def report(args, config, run_id=None):
+    if getattr(args, 'targets', None):
+        runs = {target: Database(config.for_target(target)).last_run() for target in args.targets}
+        report_targets(args, config, {k: v for k, v in runs.items() if v is not None})
+        return
     db = Database(config)
+    run_id = run_id or getattr(args, 'run', None) or db.last_run()
+    if run_id is None:
+        raise ValueError("No runs found")
+    params = {'run_id': run_id}
+
     if args.verbose:
-        head, data = db.report('pgio_results.sql')
+        head, data = db.report('pgio_results.sql', params)
         t = Pretty(head, 'Results')
         t.rows(data)
         t.linebreak()
 
-        head, data = db.report('pgio_summary.sql')
+        head, data = db.report('pgio_summary.sql', params)
         t.data.append(data[-1])
         t.print(args)
 
-    head, data = db.report('pgio_dbstats.sql')
-    t = Pretty(head, 'Database I/O stats')
+        head, data = db.report('pgio_latency.sql', params)
+        t = Pretty(head, 'Latency percentiles')
+        t.rows(data)
+        t.print(args)
+
+        head, data = db.report('pgio_relstats.sql', params)
+        t = Pretty(head, 'Blocks read vs hit per table')
+        t.rows(data)
+        t.print(args)
+
+    head, data = db.report('pgio_dbstats.sql', params)
+    t = Pretty(head, f'Database I/O stats (run {run_id})')
     t.rows(data)
     t.print(args)
 
-def runit(args, config):
+    head, data = db.report('pgio_writes.sql', params)
+    if data:
+        t = Pretty(head, 'Write volume per write operation')
+        t.rows(data)
+        t.print(args)
+
+    head, data = db.report('pgio_tupstats.sql', params)
+    if data:
+        t = Pretty(head, 'Tuples written (pg_stat_user_tables)')
+        t.rows(data)
+        t.print(args)
+
+    head, data = db.report('pgio_connects.sql', params)
+    if data:
+        t = Pretty(head, 'Connect phase (before the measured window)')
+        t.rows(data)
+        t.print(args)
+
+    head, data = db.report('pgio_tablespace_stats.sql', params)
+    if data:
+        t = Pretty(head, 'Blocks read vs hit per tablespace')
+        t.rows(data)
+        t.print(args)
+
+    head, data = db.report('pgio_tablespace_load.sql', params)
+    if len(data) > 1:
+        t = Pretty(head, 'Throughput per tablespace')
+        t.rows(data)
+        t.print(args)
+
+    head, data = db.report('pgio_iostats.sql', params)
+    if data:
+        t = Pretty(head, 'I/O per backend type (pg_stat_io)')
+        t.rows(data)
+        t.print(args)
+
+    head, data = db.report('pgio_walstats.sql', params)
+    if data:
+        t = Pretty(head, 'WAL, checkpoints and buffer writes')
+        t.rows(data)
+        t.print(args)
+
+    head, data = db.report('pgio_devstats.sql', params)
+    if data:
+        t = Pretty(head, 'Host device I/O')
+        t.rows(data)
+        t.print(args)
+
+        head, data = db.report('pgio_cpustats.sql', params)
+        t = Pretty(head, 'Host CPU')
+        t.rows(data)
+        t.print(args)
+
+    head, data = db.report('pgio_intervals.sql', params)
+    if len(data) > 1:
+        t = Pretty(head, 'Database I/O per interval')
+        t.rows(data)
+        t.print(args)
+
+        head, data = db.report('pgio_interval_summary.sql', params)
+        t = Pretty(head, 'Interval statistics')
+        t.rows(data)
+        t.print(args)
+
+        head, data = db.report('pgio_wal_intervals.sql', params)
+        if data:
+            t = Pretty(head, 'WAL and checkpoints per interval')
+            t.rows(data)
+            t.print(args)
+
+        head, data = db.report('pgio_host_intervals.sql', params)
+        if data:
+            t = Pretty(head, 'Database vs host I/O per interval')
+            t.rows(data)
+            t.print(args)
+
+def run_workload(args, config, barrier=None, started=None):
+    """Run the workload with args.threads workers and collect the stats, returns the run_id.
+    With a barrier (multiple targets), wait for the other targets before starting.
+    started(run_id) is called as soon as the run is registered"""
     db = Database(config, name='pgio_runner')
-    db.execute('TRUNCATE TABLE pgio_table_stats')
-    db.execute('TRUNCATE TABLE pgio_dbstats')
 
     buffers = db.fetchone("SELECT setting buffers, unit, setting::int/128 size_mb FROM pg_settings WHERE name = 'shared_buffers'")
     t_start = datetime.now()
 
     # Do not use more schemas than available
     schemas = min(config.schemas, db.schemas)
-    if args.threads > schemas:
-        raise ValueError("Cannot use more threads than schemas (unsupported)")
+    if schemas == 0:
+        raise ValueError("No pgio tables found, run setup first")
+    workers = assign_workers(args.threads, schemas, config.scale)
+    shard_rows = min(high - low for _, low, high in workers)
+    if shard_rows <= max(config.work_unit, config.update_unit):
+        raise ValueError(f"Key range per worker ({shard_rows} rows) too small for work_unit/update_unit, use fewer threads")
+    if args.rate < 0:
+        raise ValueError("Target rate must be positive")
+    if args.rate and args.fts:
+        raise ValueError("Target rate is not supported with Full Table Scans")
+    if args.engine == 'async' and args.fts:
+        raise ValueError("Full Table Scans are not supported with the async engine")
+    if args.metrics_port and args.interval <= 0:
+        raise ValueError("The metrics exporter requires a sample interval")
+    if args.agents > args.threads:
+        raise ValueError("More agents than workers")
+    if not 0 <= config.update_pct <= 100:
+        raise ValueError("Update percentage must be between 0 and 100")
+    if config.indexed_pct < 0 or config.churn_pct < 0 or config.indexed_pct + config.churn_pct > 100:
+        raise ValueError("indexed_pct + churn_pct must be between 0 and 100")
+    if barrier and (args.agents or args.metrics_port):
+        raise ValueError("Agents and the metrics exporter are not supported with multiple targets")
+
+    tables = [f'pgio{n}' for n in range(schemas)]
+    cache_check(db, tables)
+
+    # Tables built with another layout profile give misleading results
+    layout, status = get_layout(config), db.table_status()
+    for table_name, tablespace, schema in table_placement(config)[:schemas]:
+        st = status.get(table_name)
+        if st and st.layout != table_layout(layout, tablespace, schema):
+            logging.warning("Table %s has layout '%s', expected '%s' (run pgio setup)", table_name, st.layout, table_layout(layout, tablespace, schema))
+    cached_pct = db.cached_pct(tables)
+
+    options = {k: getattr(args, k) for k in ('engine', 'depth', 'rate', 'fts', 'interval', 'agents')}
+    run_id  = db.new_run(args.threads, args.runtime, config.snapshot(), options, config.tablespaces or config.tablespace, cached_pct)
+    if started:
+        started(run_id)
+    cache_state = db.fetchone("SELECT cache_state FROM pgio_runs WHERE run_id = %s", (run_id,)).cache_state
 
     logging.info("PyPGIO %s", versioninfo['version'])
 
+    logging.info("Run ID:         %s", run_id)
     logging.info("Date:           %s", t_start.strftime('%Y-%m-%d %H:%M:%S'))
     logging.info("Server:         %s", db.conn.info.host)
     logging.info("Database:       %s", db.conn.info.dbname)
     logging.info("Shared Buffers: %s (MiB)", buffers.size_mb)
+    if cached_pct is None:
+        logging.info("Cache state:    %s", cache_state)
+    else:
+        logging.info("Cache state:    %s (%s%% of the blocks in shared_buffers)", cache_state, cached_pct)
     logging.info("Runtime:        %s", args.runtime)
     logging.info("Workers:        %s", args.threads)
+    logging.info("Engine:         %s", args.engine)
     logging.info("Update %%:       %s", config.update_pct)
+    if config.update_pct and (config.indexed_pct or config.churn_pct):
+        logging.info("Write ops:      %s%% update, %s%% indexed, %s%% churn", 100 - config.indexed_pct - config.churn_pct, config.indexed_pct, config.churn_pct)
+    if config.update_pct and config.commit_every:
+        logging.info("Commit every:   %s writes", config.commit_every)
+    logging.info("Layout:         %s", layout.describe())
     logging.info("Work_unit:      %s", config.work_unit)
     logging.info("Update_unit:    %s", config.update_unit)
+    logging.info("Interval:       %s", args.interval)
+    if config.distribution == 'zipf':
+        logging.info("Distribution:   zipf (theta %s)", config.theta)
+    elif config.distribution == 'hotspot':
+        logging.info("Distribution:   hotspot (%s%% of accesses to %s%% of keys)", config.hot_access, config.hot_pct)
+    else:
+        logging.info("Distribution:   %s", config.distribution or 'uniform')
+    if args.rate:
+        logging.info("Target rate:    %s ops/s (%s per worker)", args.rate, round(args.rate / args.threads, 2))
 
-    logging.info("Testing %s thread(s) accessing %s (%s blocks) each.", args.threads, config.size, config.scale)
+    logging.info("Testing %s thread(s) accessing %s (%s rows) each.", args.threads, config.size, config.scale)
+    if args.threads > schemas:
+        logging.info("Sharing %s table(s), key range per worker: %s rows", schemas, shard_rows)
 
-    threads = []
-    syncwait = Event()
+    host = HostStats(config.osstats) if config.osstats else None
+    if host:
+        logging.info("OS stats:       %s", config.osstats)
 
-    for i in range(args.threads):
-        schema_num = i % schemas
-        proc = Thread(target=worker_thread, args=(schema_num, args, config, syncwait))
-        proc.start()
-        threads.append(proc)
+    metrics, server = None, None
+    if args.metrics_port:
+        metrics = Metrics()
+        metrics.update(pgio_run=run_id)
+        server = MetricsServer(args.metrics_port, metrics)
+        server.start()
+        logging.info("Metrics:        http://%s:%s/metrics", os.uname().nodename, args.metrics_port)
 
-    db.update_stats()
+    syncwait, connects, threads = Event(), Queue(), []
+    if args.agents:
+        start_at = dispatch(db, run_id, workers, args, config)
+    else:
+        # Connect phase (ramp-up), not part of the measured window
+        t_connect = time.monotonic()
+        threads   = start_workers(workers, run_id, args, config, syncwait, connects, metrics, TARGET_WAIT + 3 if barrier else 3)
+        connected = wait_connects(connects, len(workers), (config.ramp_up or 0) + CONNECT_WAIT)
+        connect_secs = time.monotonic() - t_connect
+        pooled = bool(config.pool) and args.engine != 'async'
+        db.save_connects(run_id, connected, pooled, connect_secs)
+        if connected:
+            logging.info("Connected:      %s sessions in %s seconds (avg %s ms, max %s ms%s)", len(connected), round(connect_secs, 2),
+                round(1000 * sum(connected.values()) / len(connected), 2), round(1000 * max(connected.values()), 2), ', pooled' if pooled else '')
+
+    sampler = Sampler(config, args.interval, run_id, metrics, host, args.fts) if args.interval > 0 else None
+
+    if args.agents:
+        time.sleep(max(0, db.seconds_until(start_at)))
+    if barrier:
+        barrier.wait(TARGET_WAIT)
+    db.update_stats(run_id, host)
     syncwait.set()
-    logging.info("Started %s threads...", len(threads))
+    if sampler:
+        sampler.start()
+    logging.info("Started %s workers...", args.threads)
+    try:
+        wait_workers(db, run_id, args, threads)
+    except KeyboardInterrupt:
+        # Workers finish their current statement and save their counters
+        logging.warning("Stopping the workers, saving partial results (Ctrl-C again to abort)")
+        db.stop_run(run_id)
+        wait_workers(db, run_id, args, threads)
+    if sampler:
+        sampler.stop()
+    if server:
+        server.stop()
+    db.update_stats(run_id, host)
+    return run_id
+
+def wait_workers(db, run_id, args, threads):
+    """Wait until the local worker threads or the agents have finished"""
+    if args.agents:
+        wait_agents(db, run_id)
+    else:
+        for thread in threads:
+            thread.join()
+
+def target_thread(target, args, config, barrier, runs, started):
+    """Thread running the workload on one target, started gets the run_id as soon as it is known"""
+    try:
+        runs[target] = run_workload(args, config.for_target(target), barrier, lambda run_id: started.update({target: run_id}))
+    except (DatabaseError, ValueError, BrokenBarrierError) as e:
+        logging.error("Target %s: %s", target, e)
+        barrier.abort()
+
+def run_targets(args, config):
+    """Run the workload on all targets with a shared start, returns {target: run_id}"""
+    for target in args.targets:
+        config.for_target(target)
+    barrier = Barrier(len(args.targets))
+    runs, started = {}, {}
+    threads = [Thread(target=target_thread, args=(target, args, config, barrier, runs, started)) for target in args.targets]
     for thread in threads:
-        thread.join()
-    db.update_stats()
+        thread.start()
+    try:
+        for thread in threads:
+            thread.join()
+    except KeyboardInterrupt:
+        # Ctrl-C only reaches the main thread: stop the runs of all targets, targets still starting fail at the barrier
+        logging.warning("Stopping the workers of all targets, saving partial results (Ctrl-C again to abort)")
+        barrier.abort()
+        for target, run_id in list(started.items()):
+            Database(config.for_target(target), name='pgio_runner').stop_run(run_id)
+        for thread in threads:
+            thread.join()
+    return {target: runs[target] for target in args.targets if target in runs}
+
+def combined(head, rows, sums=(), maxes=()):
+    """Combined row of the rows of several targets: sum or max of the given columns, None for the others"""
+    row = []
+    for i, name in enumerate(head):
+        values = [r[i] for r in rows if r[i] is not None]
+        if values and name in sums:
+            row.append(sum(values))
+        elif values and name in maxes:
+            row.append(max(values))
+        else:
+            row.append(None)
+    return row
+
+def report_targets(args, config, runs):
+    """Report the results and the database I/O per target and combined, runs is {target: run_id}"""
+    summary, dbstats, intervals = [], [], {}
+    for target, run_id in runs.items():
+        db = Database(config.for_target(target))
+        params = {'run_id': run_id}
+        s_head, data = db.report('pgio_summary.sql', params)
+        summary.append([target, run_id] + list(data[-1]))
+        d_head, data = db.report('pgio_dbstats.sql', params)
+        dbstats += [[target, run_id] + list(row) for row in data]
+        i_head, intervals[target] = db.report('pgio_intervals.sql', params)
+    if not summary:
+        raise ValueError("No results")
 
-    report(args, config)
+    t = Pretty(['target', 'run'] + s_head, 'Results per target')
+    t.rows(summary)
+    t.linebreak()
+    t.data.append(['Combined', None] + combined(s_head, [r[2:] for r in summary],
+        sums=('tables', 'loops', 'selects', 'updates', 'selected', 'updated', 'read/s', 'write/s', 'iops', 'ops/s', 'target/s'),
+        maxes=('runtime', 'max_select', 'max_update')))
+    t.print(args)
+
+    t = Pretty(['target', 'run'] + d_head, 'Database I/O stats per target')
+    t.rows(dbstats)
+    t.linebreak()
+    t.data.append(['Combined', None] + combined(d_head, [r[2:] for r in dbstats],
+        sums=('hits', 'reads', 'returned', 'fetched', 'updated', 'fetch/s', 'reads/s', 'writes/s', 'MiB/s'),
+        maxes=('runtime',)))
+    t.print(args)
+
+    # Intervals of the targets are matched by their sequence number, all targets start at the same time
+    t = Pretty(['target', 'interval'] + i_head, 'Database I/O per interval per target')
+    rows = []
+    for n in range(max(len(data) for data in intervals.values())):
+        group = [[target, n + 1] + list(data[n]) for target, data in intervals.items() if n < len(data)]
+        rows += group
+        t.breaks.append(len(rows))
+        rows.append(['Combined', n + 1] + combined(i_head, [r[2:] for r in group], sums=('reads/s', 'writes/s', 'MiB/s'), maxes=('runtime',)))
+        t.breaks.append(len(rows))
+    t.rows(rows)
+    t.print(args)
+
+def runit(args, config):
+    if args.targets:
+        report_targets(args, config, run_targets(args, config))
+        return
+    run_id = run_workload(args, config)
+    report(args, config, run_id)
+
+def history(args, config):
+    db = Database(config)
+    head, data = db.report('pgio_history.sql')
+    t = Pretty(head, 'Run history')
+    t.rows(data)
+    t.print(args)
+
+def compare(args, config):
+    """Show the metrics of two runs side by side with the differences"""
+    db = Database(config)
+    head, data_a = db.report('pgio_run_metrics.sql', {'run_id': args.run_a})
+    head, data_b = db.report('pgio_run_metrics.sql', {'run_id': args.run_b})
+    if not data_a or not data_b:
+        raise ValueError(f"Run {args.run_a if not data_a else args.run_b} not found")
+
+    rows = []
+    for metric, a, b in zip(head, data_a[0], data_b[0]):
+        if a is None or b is None or isinstance(a, str):
+            rows.append([metric, a, b, None, None])
+        else:
+            delta = b - a
+            rows.append([metric, round(a, 3), round(b, 3), round(delta, 3), round(100 * delta / a, 2) if a else None])
+    t = Pretty(['metric', f'run {args.run_a}', f'run {args.run_b}', 'delta', 'delta %'], 'Compare runs')
+    t.rows(rows)
+    t.print(args)
+
+    # Settings that differ between the runs
+    head, data = db.report('pgio_run_config.sql', {'run_a': args.run_a, 'run_b': args.run_b})
+    if data:
+        t = Pretty(head, 'Configuration differences')
+        t.rows(data)
+        t.print(args)
+
+def calibrate(args, config):
+    """Measure the cost of the generator itself: run mypgio() single threaded against a key range
+    that is fully cached in shared_buffers, with dynamic SQL and with prepared statements"""
+    db, layout = Database(config, name='pgio_calibrate'), get_layout(config)
+    table_name = table_placement(config)[0][0]
+    buffers = db.fetchone("SELECT setting::bigint blocks FROM pg_settings WHERE name = 'shared_buffers'")
+
+    # Key range that fits in half of shared_buffers (the keys of a shuffled range are spread over more blocks)
+    rows = min(config.scale, buffers.blocks // 2 * layout.rows_per_block)
+    while rows > config.work_unit and layout.range_blocks(rows, config.scale) > buffers.blocks // 2:
+        rows //= 2
+    if rows <= config.work_unit:
+        raise ValueError(f'Shared buffers too small to cache {config.work_unit} rows')
+
+    logging.info('Caching %s rows (%s blocks) of %s', rows, round(layout.range_blocks(rows, config.scale)), table_name)
+    for _ in range(2):
+        db.cache_range(table_name, 1, 1 + rows)
+
+    result = []
+    for prepared in (False, True):
+        mode = 'prepared' if prepared else 'dynamic'
+        logging.info('Running %s seconds with %s SQL', args.runtime, mode)
+        data, cpu = db.calibrate(table_name, config, args.runtime, 1, 1 + rows, prepared)
+        ops = data[1]
+        if not ops:
+            raise ValueError(f'Calibration with {mode} SQL completed no operations in {args.runtime} seconds, increase the runtime')
+        cpu_op = None if cpu is None else round(1000000 * cpu / ops, 2)
+        result.append([mode, ops, round(ops / args.runtime), round(1000000 * args.runtime / ops, 2),
+            round(1000000 * args.runtime / (ops * config.work_unit), 3), cpu_op])
+
+    t = Pretty(['mode', 'ops', 'ops/s', 'us/op', 'us/block', 'cpu us/op'], 'Generator overhead (cached)')
+    t.rows(result)
+    t.print(args)
+    if result[0][5] is None:
+        logging.info('Backend CPU not available (database not on this host), us/op is the elapsed time per operation')
+
+def sweep_report(args, config, sweep_id):
+    db = Database(config)
+    head, data = db.report('pgio_sweep.sql', {'sweep_id': sweep_id})
+    # The report returns NUMERIC (Decimal) throughput
+    points = [(row[1], float(row[4] or 0)) for row in data]
+    knee = find_knee(points, args.knee)
+    rows = []
+    for i, (row, efficiency) in enumerate(zip(data, scaling(points))):
+        rows.append(list(row) + [None if efficiency is None else round(efficiency, 1), '<-- knee' if i == knee else ''])
+
+    t = Pretty(head + ['scaling %', ''], 'Concurrency sweep')
+    t.rows(rows)
+    t.print(args)
+
+    if knee is None:
+        logging.info("No saturation knee found, throughput still scales at %s workers", points[-1][0] if points else 0)
+    else:
+        logging.info("Saturation knee at %s workers (%s iops)", points[knee][0], points[knee][1])
+
+def sweep(args, config):
+    """Run the workload for a series of worker counts and show the throughput vs latency curve"""
+    if args.targets:
+        raise ValueError("Sweep does not support multiple targets")
+    steps = args.steps or doubling(args.max)
+    db = Database(config, name='pgio_runner')
+    sweep_id = db.new_sweep()
+
+    for step, threads in enumerate(steps):
+        logging.info("Sweep step %s of %s: %s workers", step + 1, len(steps), threads)
+        run_id = run_workload(argparse.Namespace(**{**vars(args), 'threads': threads}), config)
+        db.sweep_step(sweep_id, step, threads, run_id)
+
+    sweep_report(args, config, sweep_id)
+
+def namelist(value):
+    """Comma separated list of names"""
+    return [x.strip() for x in value.split(',') if x.strip()]
+
+def intlist(value):
+    """Comma separated list of integers"""
+    return [int(x) for x in value.split(',')]
 
 def main():
     formatter = lambda prog: argparse.HelpFormatter(prog, max_help_position=40)
@@ -217,13 +939,32 @@ def main():
     parser.add_argument('-n', '--nohead',  help="No heading (with --tabs)", action="store_true")
     parser.add_argument('-V', '--version', help="Show version and copyright", action="store_true")
 
+    # Options shared by run and sweep
+    run_options = argparse.ArgumentParser(add_help=False)
+    run_options.add_argument('-v', '--verbose', help="Extra details", action="store_true")
+    run_options.add_argument('-f', '--fts', help="Full Table Scans", action="store_true")
+    run_options.add_argument('-e', '--engine', choices=('plpgsql', 'async'), default='plpgsql', help="Workload engine (server-side mypgio or client-side asyncio)")
+    run_options.add_argument('-d', '--depth', metavar='<n>', type=int, default=1, help="Statements per pipeline sync (async engine)")
+    run_options.add_argument('-r', '--rate', metavar='<ops/s>', type=float, default=0, help="Open loop: total target operations/s, spread over the workers (0=closed loop)")
+    run_options.add_argument('-T', '--targets', metavar='<name,...>', type=namelist, help="Run on several target profiles at the same time ('default' = default settings)")
+    run_options.add_argument('-a', '--agents', metavar='<n>', type=int, default=0, help="Distribute the workers over <n> agents (pgio agent) with a shared start")
+    run_options.add_argument('-p', '--metrics-port', metavar='<port>', type=int, help="Serve live OpenMetrics on http://<host>:<port>/metrics during the run")
+    run_options.add_argument('-i', '--interval', metavar='<secs>', type=int, default=10, help="Sample interval for database stats (0=disable)")
+
     subparsers      = parser.add_subparsers(title='commands', dest='cmd')
     parser_destroy  = subparsers.add_parser('destroy',   help='Destroy PGIO data/config')
     parser_config   = subparsers.add_parser('configure', formatter_class=formatter, help='Configure settings')
     parser_setup    = subparsers.add_parser('setup',     help='Setup tables')
     parser_list     = subparsers.add_parser('list',      help='List tablesizes')
-    parser_run      = subparsers.add_parser('run',       help='run benchmark')
+    parser_run      = subparsers.add_parser('run',       parents=[run_options], help='run benchmark')
+    parser_sweep    = subparsers.add_parser('sweep',     parents=[run_options], help='Run benchmark for a series of worker counts')
     parser_report   = subparsers.add_parser('report',    help='Report')
+    parser_history  = subparsers.add_parser('history',   help='List previous runs')
+    parser_compare  = subparsers.add_parser('compare',   help='Compare two runs')
+    parser_prewarm  = subparsers.add_parser('prewarm',   help='Load tables into the cache')
+    parser_cold     = subparsers.add_parser('coldstart', help='Evict tables from the cache')
+    parser_calib    = subparsers.add_parser('calibrate', help='Measure generator overhead on cached data')
+    parser_agent    = subparsers.add_parser('agent',     help='Run workers for a coordinator (run --agents)')
     parser_abort    = subparsers.add_parser('abort',     help='Cancel running jobs')
     parser_complete = subparsers.add_parser('complete',  help='Dump bash completion file')
 
@@ -232,31 +973,74 @@ def main():
     parser_setup.set_defaults(func=setup)
     parser_list.set_defaults(func=tablesizes)
     parser_run.set_defaults(func=runit)
+    parser_sweep.set_defaults(func=sweep)
     parser_report.set_defaults(func=report)
+    parser_history.set_defaults(func=history)
+    parser_compare.set_defaults(func=compare)
+    parser_prewarm.set_defaults(func=prewarm)
+    parser_cold.set_defaults(func=coldstart)
+    parser_calib.set_defaults(func=calibrate)
+    parser_agent.set_defaults(func=agent)
     parser_abort.set_defaults(func=abort)
     parser_complete.set_defaults(func=complete)
 
     parser_config.set_defaults(func=configure)
     parser_config.add_argument('--defaults', action='store_true',     help='Default settings')
+    parser_config.add_argument('--target',     metavar='name',        help='Store the db settings in target profile <name>')
+    parser_config.add_argument('--remove_target', metavar='name',     help='Remove target profile <name>')
     parser_config.add_argument('--dbhost',     metavar='hostname',    help='Database host')
     parser_config.add_argument('--dbname',     metavar='database',    help='Database name')
     parser_config.add_argument('--dbuser',     metavar='user',        help='Database user')
     parser_config.add_argument('--dbpass',     metavar='password',    help='Database password')
     parser_config.add_argument('--dbport',     metavar='port',        help='Database port', type=int)
-    parser_config.add_argument('--update_pct', metavar='pct',         help='Update percentage', type=int)
+    parser_config.add_argument('--update_pct', metavar='pct',         help='Update percentage (0-100)', type=int)
+    parser_config.add_argument('--indexed_pct', metavar='pct', type=float, help="Percentage of the writes that update the indexed key (non-HOT)")
+    parser_config.add_argument('--churn_pct',  metavar='pct', type=float, help="Percentage of the writes that delete and re-insert the rows")
+    parser_config.add_argument('--commit_every', metavar='n', type=int, help="Commit after every n writes (0: mypgio commits every heartbeat, async autocommits)")
     parser_config.add_argument('--scale',      metavar="<size>M|G|T", help="Schema size")
     parser_config.add_argument('--schemas',    metavar="n", type=int, help="Number of user schemas")
     parser_config.add_argument('--work_unit',  metavar="n", type=int, help="Work unit")
     parser_config.add_argument('--update_unit',metavar="n", type=int, help="Update unit")
     parser_config.add_argument('--tablespace', metavar='name',        help="Tablespace")
+    parser_config.add_argument('--tablespaces', metavar='name[:weight],...', help="Spread the tables over tablespaces (weighted round robin), '' for the default tablespace")
+    parser_config.add_argument('--table_schemas', choices=('yes', 'no'), help="Put each table in its own schema (pgioN.pgioN) instead of public")
+    parser_config.add_argument('--pool',       choices=('yes', 'no'), help="Reuse database sessions from a connection pool (requires psycopg_pool)")
+    parser_config.add_argument('--ramp_up',    metavar='seconds', type=float, help="Spread the connects of the worker sessions over <seconds> before the run starts")
+    parser_config.add_argument('--layout',     metavar='name',        help=f"Layout profile ({', '.join(profiles)} or a custom profile)")
+    parser_config.add_argument('--add_layout', metavar="'name key=value ...'", help="Add a custom layout profile (rows_per_block, filler, fillfactor, compress, index, order)")
+    parser_config.add_argument('--remove_layout', metavar='name',     help='Remove custom layout profile <name>')
+    parser_config.add_argument('--distribution', choices=distributions, help="Key distribution")
+    parser_config.add_argument('--theta',      metavar='n', type=float, help="Zipf skew (0.0 = uniform, higher = more skewed)")
+    parser_config.add_argument('--hot_pct',    metavar='pct', type=float, help="Hotspot size as percentage of the keys")
+    parser_config.add_argument('--hot_access', metavar='pct', type=float, help="Percentage of accesses that go to the hotspot")
+    parser_config.add_argument('--osstats',    metavar='source',      help="Collect OS stats of the database host: local, [ssh://]user@host or '' to disable (per target with --target)")
 
+    for subparser in (parser_setup, parser_list, parser_prewarm, parser_cold, parser_destroy):
+        subparser.add_argument('-T', '--targets', metavar='<name,...>', type=namelist, help="Run on each of these target profiles in turn ('default' = default settings)")
+    parser_setup.add_argument('-l', '--loader', choices=('seed', 'copy'), default='seed', help="Copy from seed table or stream rows from the client with COPY")
+    parser_setup.add_argument('-u', '--unlogged', action='store_true', help="Load into UNLOGGED tables, then set them LOGGED")
+    parser_setup.add_argument('-f', '--force', action='store_true', help="Rebuild all tables, also if they are up to date")
     parser_setup.add_argument('threads', metavar="<n>", type=int, nargs='?', default=1, help="Number of workers for schema creation")
     parser_report.add_argument('-v', '--verbose', help="Extra details", action="store_true")
+    parser_report.add_argument('-T', '--targets', metavar='<name,...>', type=namelist, help="Report the last run of each target, per target and combined")
+    parser_report.add_argument('-r', '--run', metavar='<id>', type=int, help="Run ID (default: last run)")
+    parser_compare.add_argument('run_a', metavar='<a>', type=int, help="Run ID (baseline)")
+    parser_compare.add_argument('run_b', metavar='<b>', type=int, help="Run ID")
 
-    parser_run.add_argument('-v', '--verbose', help="Extra details", action="store_true")
-    parser_run.add_argument('-f', '--fts', help="Full Table Scans", action="store_true")
     parser_run.add_argument('runtime', metavar='<runtime>', type=int, help="Runtime in seconds")
-    parser_run.add_argument('threads', metavar="<threads>", type=int, help="Number of workers per schema")
+    parser_run.add_argument('threads', metavar="<threads>", type=int, help="Number of workers (may exceed the number of schemas)")
+
+    parser_prewarm.add_argument('-m', '--mode', choices=('buffer', 'read', 'prefetch'), default='buffer', help="pg_prewarm mode: shared_buffers (buffer) or OS page cache (read, prefetch)")
+    parser_prewarm.add_argument('threads', metavar="<n>", type=int, nargs='?', default=1, help="Number of parallel workers")
+    parser_cold.add_argument('threads', metavar="<n>", type=int, nargs='?', default=1, help="Number of parallel workers")
+    parser_abort.add_argument('-g', '--graceful', action='store_true', help="Stop the active runs and keep their partial results")
+    parser_agent.add_argument('-n', '--name', metavar='<name>', help="Agent name (default: hostname)")
+    parser_calib.add_argument('runtime', metavar='<runtime>', type=int, nargs='?', default=10, help="Runtime per mode in seconds")
+
+    parser_sweep.add_argument('-s', '--steps', metavar='<n,n,...>', type=intlist, help="Comma separated list of worker counts")
+    parser_sweep.add_argument('-m', '--max', metavar='<n>', type=int, default=32, help="Double the workers from 1 up to <n> (if no --steps)")
+    parser_sweep.add_argument('-k', '--knee', metavar='<pct>', type=float, default=10, help="Scaling efficiency %% below which the knee is detected")
+    parser_sweep.add_argument('runtime', metavar='<runtime>', type=int, help="Runtime per step in seconds")
 
     args = parser.parse_args()
 
@@ -271,6 +1055,8 @@ def main():
         config = Config()
         if args.cmd is None:
             tablesizes(args, config)
+        elif args.cmd in ('setup', 'list', 'prewarm', 'coldstart', 'destroy') and args.targets:
+            each_target(args, config)
         else:
             args.func(args, config)
     except KeyboardInterrupt:
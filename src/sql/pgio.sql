@@ -14,6 +14,28 @@
 
 -- 2023-11-22 - [Bart Sjerps] Added IF EXISTS clause for pgio_return
 -- 2023-12-11 - [Bart Sjerps] changed BETWEEN clauses to fix incorrect block counts
+-- 2026-10-18 - [Bart Sjerps] Added log2 latency histograms (microseconds) for selects and updates
+-- 2026-10-18 - [Bart Sjerps] Added key range [v_key_low, v_key_high) so multiple workers can share a table
+-- 2026-10-18 - [Bart Sjerps] Added open-loop mode: v_rate > 0 paces operations on a fixed schedule,
+--                            latency is measured from the scheduled start (no coordinated omission)
+-- 2026-10-18 - [Bart Sjerps] Key selection inline with configurable distribution:
+--                            uniform, zipf (v_theta), hotspot (v_hot_access % of accesses go to v_hot_pct % of keys)
+--                            or sequential
+-- 2026-10-18 - [Bart Sjerps] Range SELECT/UPDATE run as prepared statements with a generic plan, so they
+--                            are not parsed and planned for each operation. v_prepared = FALSE uses the
+--                            original dynamic SQL (for comparing generator overhead with pgio calibrate)
+-- 2026-10-18 - [Bart Sjerps] mypgio is now a procedure. Every v_heartbeat seconds the counters so far are saved
+--                            in pgio_progress and committed, the final counters are saved at the end.
+--                            The loop ends early when pgio_runs.stop is set (pgio abort --graceful or Ctrl-C)
+-- 2026-10-18 - [Bart Sjerps] Any update percentage 0-100: each operation is an update with probability v_pctupd %
+--                            (replaces the 51-99 restriction and the per 100 operations quota).
+--                            Write operation types: v_indexed_pct % of the writes are non-HOT updates of the
+--                            indexed key (keys reversed within the range), v_churn_pct % delete and re-insert
+--                            the range, the rest update scratch. v_commit_every > 0 commits after every n writes
+-- 2026-10-18 - [Bart Sjerps] v_resume continues from the counters saved in pgio_progress by a previous call in the
+--                            same session, v_final = FALSE saves the counters at the end as not final. This runs a
+--                            worker as a series of short calls, the session is idle in between so PostgreSQL
+--                            publishes its statistics while the run is in progress
 
 DROP TYPE IF EXISTS pgio_return CASCADE;
 CREATE TYPE pgio_return AS (
@@ -24,21 +46,69 @@ sql_updates bigint,
 sql_select_max_tm numeric, 
 sql_update_max_tm numeric ,
 select_blk_touch_cnt bigint,
-update_blk_touch_cnt bigint
+update_blk_touch_cnt bigint,
+select_hist bigint[],
+update_hist bigint[]
 );
 
 
-CREATE OR REPLACE FUNCTION mypgio(
+-- Save the counters of a worker in pgio_progress (one row per worker, replaced by each heartbeat)
+DROP FUNCTION IF EXISTS pgio_save_progress;
+CREATE FUNCTION pgio_save_progress(
+v_run_id int, v_pid int, v_loops bigint, v_selects bigint, v_updates bigint,
+v_select_max_tm numeric, v_update_max_tm numeric, v_select_blks bigint, v_update_blks bigint,
+v_select_hist bigint[], v_update_hist bigint[], v_indexed bigint, v_churn bigint, v_commits bigint, v_final boolean,
+v_select_tm numeric DEFAULT 0, v_update_tm numeric DEFAULT 0
+) RETURNS void LANGUAGE sql
+AS $$
+INSERT INTO pgio_progress (run_id, mypid, ts, loop_iterations, sql_selects, sql_updates, sql_select_max_tm, sql_update_max_tm
+, select_blk_touch_cnt, update_blk_touch_cnt, select_hist, update_hist, sql_indexed, sql_churn, commits, final, select_tm, update_tm)
+VALUES (v_run_id, v_pid, clock_timestamp(), v_loops, v_selects, v_updates, v_select_max_tm, v_update_max_tm
+, v_select_blks, v_update_blks, v_select_hist, v_update_hist, v_indexed, v_churn, v_commits, v_final, v_select_tm, v_update_tm)
+ON CONFLICT (run_id, mypid) DO UPDATE SET ts = EXCLUDED.ts
+, loop_iterations      = EXCLUDED.loop_iterations
+, sql_selects          = EXCLUDED.sql_selects
+, sql_updates          = EXCLUDED.sql_updates
+, sql_select_max_tm    = EXCLUDED.sql_select_max_tm
+, sql_update_max_tm    = EXCLUDED.sql_update_max_tm
+, select_blk_touch_cnt = EXCLUDED.select_blk_touch_cnt
+, update_blk_touch_cnt = EXCLUDED.update_blk_touch_cnt
+, select_hist          = EXCLUDED.select_hist
+, update_hist          = EXCLUDED.update_hist
+, sql_indexed          = EXCLUDED.sql_indexed
+, sql_churn            = EXCLUDED.sql_churn
+, commits              = EXCLUDED.commits
+, final                = EXCLUDED.final
+, select_tm            = EXCLUDED.select_tm
+, update_tm            = EXCLUDED.update_tm;
+$$;
+
+DROP PROCEDURE IF EXISTS mypgio;
+CREATE PROCEDURE mypgio(
 v_mytab             varchar,
 v_pctupd            int,
 v_runtime_secs      bigint,
 v_scale             bigint,
 v_select_batch_size	int,
-v_update_batch_size	int
-) RETURNS pgio_return LANGUAGE plpgsql
+v_update_batch_size	int,
+v_key_low		bigint DEFAULT 1,
+v_key_high		bigint DEFAULT NULL,
+v_rate			numeric DEFAULT 0,
+v_dist			varchar DEFAULT 'uniform',
+v_theta			numeric DEFAULT 0.99,
+v_hot_pct		numeric DEFAULT 10,
+v_hot_access		numeric DEFAULT 90,
+v_prepared		boolean DEFAULT TRUE,
+v_run_id		int DEFAULT 0,
+v_heartbeat		int DEFAULT 10,
+v_indexed_pct		numeric DEFAULT 0,
+v_churn_pct		numeric DEFAULT 0,
+v_commit_every		int DEFAULT 0,
+v_resume		boolean DEFAULT FALSE,
+v_final			boolean DEFAULT TRUE
+) LANGUAGE plpgsql
 AS  $$
 DECLARE
-rec_myvar pgio_return%rowtype;
 
 v_mytab        		ALIAS for $1;
 v_pctupd       		ALIAS for $2;
@@ -46,16 +116,52 @@ v_runtime_secs 		ALIAS for $3;
 v_scale        		ALIAS for $4;
 v_select_batch_size	ALIAS for $5;
 v_update_batch_size	ALIAS for $6;
+v_key_low		ALIAS for $7;
+v_key_high		ALIAS for $8;
+v_rate			ALIAS for $9;
+v_dist			ALIAS for $10;
+v_theta			ALIAS for $11;
+v_hot_pct		ALIAS for $12;
+v_hot_access		ALIAS for $13;
+v_prepared		ALIAS for $14;
+v_run_id		ALIAS for $15;
+v_heartbeat		ALIAS for $16;
+v_indexed_pct		ALIAS for $17;
+v_churn_pct		ALIAS for $18;
+v_commit_every		ALIAS for $19;
+v_resume		ALIAS for $20;
+v_final			ALIAS for $21;
 
 v_end_time 		timestamp WITHOUT TIME ZONE; 
 v_before		timestamp WITHOUT TIME ZONE; 
 v_after			timestamp WITHOUT TIME ZONE; 
 v_tm			timestamp WITHOUT TIME ZONE; 
+v_next			timestamp WITHOUT TIME ZONE; 
+v_op_interval		interval;
+v_next_check		timestamp WITHOUT TIME ZONE;
+v_next_beat		timestamp WITHOUT TIME ZONE;
+v_stop			boolean		:= FALSE;
+v_sleep			float8		:= 0.0;
+v_range			bigint		:= 0;
+v_hot_keys		bigint		:= 0;
+v_zipf_base		float8		:= 0.0;
+v_zipf_exp		float8		:= 0.0;
+v_seq			bigint		:= 0;
 v_tm_delta		numeric		:= 0.0;
 v_select_max_tm		numeric		:= 0.0;
 v_update_max_tm		numeric		:= 0.0;
-v_select_batch_tm_total	numeric		:= 0.0;
-v_update_batch_tm_total	numeric		:= 0.0;
+v_select_tot_tm		numeric		:= 0.0;
+v_update_tot_tm		numeric		:= 0.0;
+v_select_hist		bigint[]	:= array_fill(0::bigint, ARRAY[32]);
+v_update_hist		bigint[]	:= array_fill(0::bigint, ARRAY[32]);
+v_bucket		int		:= 0;
+v_writeop		int		:= 0;
+v_rnd			float8		:= 0.0;
+v_stmt			text;
+v_indexed_cnt		bigint		:= 0;
+v_churn_cnt		bigint		:= 0;
+v_commit_cnt		bigint		:= 0;
+v_uncommitted		int		:= 0;
 
 v_tmp 			bigint		:= 0;
 v_scratch 		bigint		:= 0;
@@ -63,127 +169,232 @@ v_optype 		int 		:= 0;
 v_master_loop_cnt 	bigint 		:= 0;
 v_mykey 		bigint 		:= 0;
 v_pid 			int 		:= 0;
-v_op_cnt 		int 		:= 0;
-v_select_cnt 		int 		:= 0;
-v_update_cnt 		int 		:= 0;
 v_select_cnt_total 	bigint 		:= 0;
 v_update_cnt_total	bigint 		:= 0;
 v_select_blk_touch_cnt	bigint		:= 0;
 v_update_blk_touch_cnt	bigint		:= 0;
-v_update_quota		boolean 	:= FALSE;
-v_select_quota		boolean 	:= FALSE;
-v_select_only		boolean  	:= FALSE;
-v_update_only		boolean  	:= FALSE;
 
 BEGIN
-rec_myvar.mypid 		:= 0 ;
-rec_myvar.sql_updates		:= 0 ;
-rec_myvar.sql_selects		:= 0 ;
-rec_myvar.loop_iterations	:= 0 ;
-rec_myvar.sql_select_max_tm	:= 0.0;
-rec_myvar.sql_update_max_tm	:= 0.0;
-rec_myvar.select_blk_touch_cnt	:= 0;
-rec_myvar.update_blk_touch_cnt	:= 0;
-
 SELECT pg_backend_pid() into v_pid;
 
 CASE
-	WHEN ( v_pctupd = 0 )   THEN v_select_only = TRUE ;
-	WHEN ( v_pctupd = 100 ) THEN v_update_only = TRUE ;
-	
 	WHEN ( v_pctupd > 100 ) THEN RAISE EXCEPTION 'FATAL : UPDATE_PCT "%" IS GREATER THAN 100.', v_pctupd ;
 	WHEN ( v_pctupd < 0 )   THEN RAISE EXCEPTION 'FATAL : UPDATE_PCT "%" IS LESS THAN ZERO.', v_pctupd ;
-	WHEN v_pctupd BETWEEN 51 AND 99 THEN RAISE EXCEPTION 'FATAL : UPDATE_PCT "%" BETWEEN 51 and 99 ARE NOT SUPPORTED.', v_pctupd ;
-
+	WHEN ( v_indexed_pct < 0 OR v_churn_pct < 0 OR v_indexed_pct + v_churn_pct > 100 ) THEN
+		RAISE EXCEPTION 'FATAL : INDEXED_PCT "%" + CHURN_PCT "%" MUST BE BETWEEN 0 AND 100.', v_indexed_pct, v_churn_pct ;
+WHEN ( v_resume ) THEN NULL;
 ELSE
 	RAISE NOTICE 'I am PID "%" : My table is "%" : UPDATE_PCT "%" : RUN TIME SECONDS "%"', v_pid, v_mytab, v_pctupd, v_runtime_secs ;
 END CASE;
 
 
-v_end_time := clock_timestamp() + (v_runtime_secs || ' seconds')::interval ;
+-- Number of possible start keys for a select range
+v_range := COALESCE(v_key_high, v_scale) - v_select_batch_size - v_key_low;
+IF ( v_range < 1 ) THEN
+	RAISE EXCEPTION 'FATAL : KEY RANGE TOO SMALL FOR WORK_UNIT "%"', v_select_batch_size ;
+END IF;
+
+CASE v_dist
+	WHEN 'uniform' THEN NULL;
+	WHEN 'zipf' THEN
+		-- Inverse CDF of a continuous power law x^-theta on [1, v_range + 1]
+		IF ( v_theta = 1 ) THEN
+			v_zipf_base := ln(v_range + 1);
+		ELSE
+			v_zipf_base := power(v_range + 1, 1 - v_theta::float8) - 1;
+			v_zipf_exp  := 1 / (1 - v_theta::float8);
+		END IF;
+	WHEN 'hotspot' THEN
+		v_hot_keys := GREATEST(1, trunc(v_range * v_hot_pct / 100));
+	WHEN 'sequential' THEN
+		v_seq := trunc(random() * v_range);
+ELSE
+	RAISE EXCEPTION 'FATAL : UNKNOWN DISTRIBUTION "%"', v_dist ;
+END CASE;
 
-WHILE ( clock_timestamp()::timestamp < v_end_time ) LOOP
+IF ( v_resume ) THEN
+	SELECT loop_iterations, sql_selects, sql_updates, sql_select_max_tm, sql_update_max_tm, select_blk_touch_cnt, update_blk_touch_cnt
+	, select_hist, update_hist, sql_indexed, sql_churn, commits, select_tm, update_tm
+	INTO v_master_loop_cnt, v_select_cnt_total, v_update_cnt_total, v_select_max_tm, v_update_max_tm, v_select_blk_touch_cnt, v_update_blk_touch_cnt
+	, v_select_hist, v_update_hist, v_indexed_cnt, v_churn_cnt, v_commit_cnt, v_select_tot_tm, v_update_tot_tm
+	FROM pgio_progress WHERE run_id = v_run_id AND mypid = v_pid;
+	IF ( NOT FOUND ) THEN
+		v_master_loop_cnt := 0;
+		v_select_cnt_total := 0;
+		v_update_cnt_total := 0;
+		v_select_max_tm := 0.0;
+		v_update_max_tm := 0.0;
+		v_select_blk_touch_cnt := 0;
+		v_update_blk_touch_cnt := 0;
+		v_select_hist := array_fill(0::bigint, ARRAY[32]);
+		v_update_hist := array_fill(0::bigint, ARRAY[32]);
+		v_indexed_cnt := 0;
+		v_churn_cnt := 0;
+		v_commit_cnt := 0;
+		v_select_tot_tm := 0.0;
+		v_update_tot_tm := 0.0;
+	END IF;
+	-- The sequential walk continues where the previous call left off
+	v_seq := (v_master_loop_cnt * v_select_batch_size) % v_range;
+END IF;
 
-SELECT pgio_get_random_number(1, v_scale - v_select_batch_size) INTO v_mykey;    
+IF ( v_prepared ) THEN
+	-- Plan once for the session, each operation only binds the key range
+	PERFORM set_config('plan_cache_mode', 'force_generic_plan', false);
+	FOR v_stmt IN SELECT name FROM pg_prepared_statements WHERE name IN ('pgio_select', 'pgio_update', 'pgio_indexed', 'pgio_churn') LOOP
+		EXECUTE 'DEALLOCATE ' || v_stmt;
+	END LOOP;
+	EXECUTE format('PREPARE pgio_select (bigint, bigint) AS SELECT sum(scratch) FROM %I WHERE mykey BETWEEN $1 AND $2', v_mytab);
+	EXECUTE format('PREPARE pgio_update (bigint, bigint) AS UPDATE %I SET scratch = scratch + 1 WHERE mykey BETWEEN $1 AND $2', v_mytab);
+	-- Reversing the keys within the range changes the indexed column, so these updates cannot be HOT
+	EXECUTE format('PREPARE pgio_indexed (bigint, bigint) AS UPDATE %I SET mykey = $1 + $2 - mykey WHERE mykey BETWEEN $1 AND $2', v_mytab);
+	EXECUTE format('PREPARE pgio_churn (bigint, bigint) AS WITH d AS (DELETE FROM %I WHERE mykey BETWEEN $1 AND $2 RETURNING mykey, scratch, filler) '
+		'INSERT INTO %I SELECT mykey, scratch + 1, filler FROM d', v_mytab, v_mytab);
+END IF;
 
-IF     ( v_update_only = TRUE ) THEN 
-	v_optype := 1;
-ELSEIF ((v_update_only = FALSE AND v_select_only = FALSE AND (MOD(v_mykey , 2) = 0) AND ( v_update_quota != TRUE )) OR (v_select_quota = TRUE) ) THEN
+v_end_time := clock_timestamp() + (v_runtime_secs || ' seconds')::interval ;
+v_next     := clock_timestamp();
+v_next_check := clock_timestamp() + interval '1 second';
+v_next_beat  := clock_timestamp() + (v_heartbeat || ' seconds')::interval;
+IF ( v_rate > 0 ) THEN
+	v_op_interval := (1.0 / v_rate) * interval '1 second';
+END IF;
+
+WHILE ( clock_timestamp()::timestamp < v_end_time AND NOT v_stop ) LOOP
+
+IF ( v_dist = 'uniform' ) THEN
+	v_mykey := v_key_low + trunc(random() * v_range);
+ELSEIF ( v_dist = 'zipf' AND v_theta = 1 ) THEN
+	v_mykey := v_key_low + LEAST(v_range - 1, trunc(exp(random() * v_zipf_base)) - 1);
+ELSEIF ( v_dist = 'zipf' ) THEN
+	v_mykey := v_key_low + LEAST(v_range - 1, trunc(power(random() * v_zipf_base + 1, v_zipf_exp)) - 1);
+ELSEIF ( v_dist = 'hotspot' AND random() * 100 < v_hot_access ) OR ( v_hot_keys >= v_range ) THEN
+	v_mykey := v_key_low + trunc(random() * v_hot_keys);
+ELSEIF ( v_dist = 'hotspot' ) THEN
+	v_mykey := v_key_low + v_hot_keys + trunc(random() * (v_range - v_hot_keys));
+ELSE
+	v_mykey := v_key_low + v_seq;
+	v_seq   := (v_seq + v_select_batch_size) % v_range;
+END IF;
+
+IF ( random() * 100 < v_pctupd ) THEN
 	v_optype := 1;
-ELSEIF ( v_select_only = TRUE ) THEN 
-	v_optype := 0;
+	v_rnd    := random() * 100;
+	IF ( v_rnd < v_indexed_pct ) THEN
+		v_writeop := 1;
+	ELSEIF ( v_rnd < v_indexed_pct + v_churn_pct ) THEN
+		v_writeop := 2;
+	ELSE
+		v_writeop := 0;
+	END IF;
 ELSE
 	v_optype := 0;
-END IF;	
+END IF;
 
-v_before := clock_timestamp();
+IF ( v_rate > 0 ) THEN
+	-- Wait for the scheduled start. When behind schedule, start immediately but
+	-- measure from the scheduled time so queueing delay is included in the latency
+	v_sleep := extract(epoch from (v_next - clock_timestamp()));
+	IF ( v_sleep > 0 ) THEN
+		PERFORM pg_sleep(v_sleep);
+	END IF;
+	v_before := v_next;
+	v_next   := v_next + v_op_interval;
+ELSE
+	v_before := clock_timestamp();
+END IF;
 
 IF ( v_optype = 0 ) THEN
-	EXECUTE 'SELECT sum(scratch) FROM ' || v_mytab || ' WHERE mykey BETWEEN ' || v_mykey || ' AND ' || v_mykey + v_select_batch_size - 1 INTO v_scratch;
+	IF ( v_prepared ) THEN
+		EXECUTE 'EXECUTE pgio_select(' || v_mykey || ',' || v_mykey + v_select_batch_size - 1 || ')' INTO v_scratch;
+	ELSE
+		EXECUTE 'SELECT sum(scratch) FROM ' || v_mytab || ' WHERE mykey BETWEEN ' || v_mykey || ' AND ' || v_mykey + v_select_batch_size - 1 INTO v_scratch;
+	END IF;
 
 	v_tm_delta := cast(extract(epoch from (clock_timestamp() - v_before)) as numeric(12,8));
-
+	v_bucket := LEAST(31, floor(ln(GREATEST(v_tm_delta * 1000000, 1)::float8) / ln(2::float8))::int) + 1;
+	v_select_hist[v_bucket] := v_select_hist[v_bucket] + 1;
+	v_select_tot_tm := v_select_tot_tm + v_tm_delta;
 
 	IF ( v_tm_delta > v_select_max_tm ) THEN
 		v_select_max_tm := v_tm_delta;
 	END IF;
 
-	v_select_cnt := v_select_cnt + 1;
 	v_select_cnt_total := v_select_cnt_total + 1;
 	v_select_blk_touch_cnt := v_select_blk_touch_cnt + v_select_batch_size;
 
-	v_select_batch_tm_total := v_select_batch_tm_total + v_tm_delta;
-
-	IF ( v_select_cnt >= ( 100 - v_pctupd) ) THEN
-		v_select_quota := TRUE;
+ELSE
+	IF ( v_writeop = 1 AND v_prepared ) THEN
+		EXECUTE 'EXECUTE pgio_indexed(' || v_mykey || ',' || v_mykey + v_update_batch_size - 1 || ')';
+	ELSEIF ( v_writeop = 1 ) THEN
+		EXECUTE 'UPDATE ' || v_mytab || ' SET mykey = ' || 2 * v_mykey + v_update_batch_size - 1 || ' - mykey WHERE mykey BETWEEN ' || v_mykey || ' AND ' || v_mykey + v_update_batch_size - 1;
+	ELSEIF ( v_writeop = 2 AND v_prepared ) THEN
+		EXECUTE 'EXECUTE pgio_churn(' || v_mykey || ',' || v_mykey + v_update_batch_size - 1 || ')';
+	ELSEIF ( v_writeop = 2 ) THEN
+		EXECUTE 'WITH d AS (DELETE FROM ' || v_mytab || ' WHERE mykey BETWEEN ' || v_mykey || ' AND ' || v_mykey + v_update_batch_size - 1
+			|| ' RETURNING mykey, scratch, filler) INSERT INTO ' || v_mytab || ' SELECT mykey, scratch + 1, filler FROM d';
+	ELSEIF ( v_prepared ) THEN
+		EXECUTE 'EXECUTE pgio_update(' || v_mykey || ',' || v_mykey + v_update_batch_size - 1 || ')';
+	ELSE
+		EXECUTE 'UPDATE ' || v_mytab || ' SET scratch = scratch + 1 WHERE mykey BETWEEN ' || v_mykey || ' AND ' || v_mykey + v_update_batch_size - 1;
 	END IF;
 
-ELSE
-	EXECUTE 'UPDATE ' || v_mytab || ' SET scratch = scratch + 1 WHERE mykey BETWEEN ' || v_mykey || ' AND ' || v_mykey + v_update_batch_size - 1;
+	-- Commit batching: the write that completes a batch includes the commit (WAL flush) in its latency
+	v_uncommitted := v_uncommitted + 1;
+	IF ( v_commit_every > 0 AND v_uncommitted >= v_commit_every ) THEN
+		COMMIT;
+		v_commit_cnt  := v_commit_cnt + 1;
+		v_uncommitted := 0;
+	END IF;
 
 	v_tm_delta := cast(extract(epoch from (clock_timestamp() - v_before)) as numeric(12,8));
+	v_bucket := LEAST(31, floor(ln(GREATEST(v_tm_delta * 1000000, 1)::float8) / ln(2::float8))::int) + 1;
+	v_update_hist[v_bucket] := v_update_hist[v_bucket] + 1;
+	v_update_tot_tm := v_update_tot_tm + v_tm_delta;
 
 	IF ( v_tm_delta > v_update_max_tm ) THEN
 		v_update_max_tm := v_tm_delta;
 	END IF;
 
-	v_update_cnt := v_update_cnt + 1;
 	v_update_cnt_total := v_update_cnt_total + 1;
 	v_update_blk_touch_cnt := v_update_blk_touch_cnt + v_update_batch_size;
 
-	v_update_batch_tm_total := v_update_batch_tm_total + v_tm_delta;
-
-	IF ( v_update_cnt >= v_pctupd ) THEN
-		v_update_quota := TRUE;
+	IF ( v_writeop = 1 ) THEN
+		v_indexed_cnt := v_indexed_cnt + 1;
+	ELSEIF ( v_writeop = 2 ) THEN
+		v_churn_cnt := v_churn_cnt + 1;
 	END IF;
 
 END IF;
 
-v_op_cnt := v_op_cnt + 1 ;
 v_master_loop_cnt := v_master_loop_cnt + 1 ;
 
-
-IF ( v_op_cnt >= 100 ) THEN
-	v_op_cnt := 0;
-	v_select_cnt := 0;
-	v_update_cnt := 0;
-	v_select_batch_tm_total := 0;
-	v_update_batch_tm_total := 0;
-	v_update_quota := FALSE;
-	v_select_quota := FALSE;
+-- Once per second: check for a stop request, save progress every heartbeat
+IF ( clock_timestamp() >= v_next_check ) THEN
+	v_next_check := clock_timestamp() + interval '1 second';
+	SELECT stop INTO v_stop FROM pgio_runs WHERE run_id = v_run_id;
+	v_stop := COALESCE(v_stop, FALSE);
+
+	IF ( clock_timestamp() >= v_next_beat ) THEN
+		v_next_beat := clock_timestamp() + (v_heartbeat || ' seconds')::interval;
+		PERFORM pgio_save_progress(v_run_id, v_pid, v_master_loop_cnt, v_select_cnt_total, v_update_cnt_total,
+			v_select_max_tm, v_update_max_tm, v_select_blk_touch_cnt, v_update_blk_touch_cnt,
+			v_select_hist, v_update_hist, v_indexed_cnt, v_churn_cnt, v_commit_cnt + 1, FALSE, v_select_tot_tm, v_update_tot_tm);
+		COMMIT;
+		v_commit_cnt  := v_commit_cnt + 1;
+		v_uncommitted := 0;
+	END IF;
 END IF;
 
 END LOOP;
 
-rec_myvar.mypid			:= v_pid;
-rec_myvar.loop_iterations	:= v_master_loop_cnt;
-rec_myvar.sql_selects		:= v_select_cnt_total;
-rec_myvar.sql_updates		:= v_update_cnt_total;
-rec_myvar.sql_select_max_tm   	:= v_select_max_tm;
-rec_myvar.sql_update_max_tm   	:= v_update_max_tm;
-rec_myvar.select_blk_touch_cnt  := v_select_blk_touch_cnt;
-rec_myvar.update_blk_touch_cnt  := v_update_blk_touch_cnt;
+IF ( v_stop ) THEN
+	RAISE NOTICE 'PID "%" : stopped on request', v_pid;
+END IF;
+
+PERFORM pgio_save_progress(v_run_id, v_pid, v_master_loop_cnt, v_select_cnt_total, v_update_cnt_total,
+	v_select_max_tm, v_update_max_tm, v_select_blk_touch_cnt, v_update_blk_touch_cnt,
+	v_select_hist, v_update_hist, v_indexed_cnt, v_churn_cnt, v_commit_cnt + 1, v_final, v_select_tot_tm, v_update_tot_tm);
 
-RETURN rec_myvar;
 END;
 $$;
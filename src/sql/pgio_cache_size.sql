@@ -0,0 +1,13 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_cache_size.sql
+-- Description : Size of the pgio tables + indexes vs the cache sizes (whole MiB)
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+SELECT (SELECT ROUND(COALESCE(SUM(pg_total_relation_size(c.oid)), 0) / 1048576)::bigint
+	FROM pg_class c
+	JOIN pg_namespace n ON n.oid = c.relnamespace
+	WHERE n.nspname IN ('public', c.relname) AND c.relkind = 'r' AND c.relname = ANY(%(tables)s)) working_set
+, (SELECT setting::bigint * 8 / 1024 FROM pg_settings WHERE name = 'shared_buffers')       shared_buffers
+, (SELECT setting::bigint * 8 / 1024 FROM pg_settings WHERE name = 'effective_cache_size') effective_cache_size
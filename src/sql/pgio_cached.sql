@@ -0,0 +1,22 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_cached.sql
+-- Description : Percentage of the blocks of the pgio tables + indexes in shared_buffers
+--               (requires pg_buffercache)
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+WITH tables AS (
+	SELECT to_regclass(t) oid FROM unnest(%(tables)s::text[]) t
+), rels AS (
+	SELECT c.oid, pg_relation_filenode(c.oid) filenode, pg_relation_size(c.oid) / 8192 blocks
+	FROM pg_class c
+	WHERE c.oid IN (SELECT oid FROM tables)
+	OR c.oid IN (SELECT indexrelid FROM pg_index WHERE indrelid IN (SELECT oid FROM tables))
+)
+SELECT ROUND(100.0 * (
+	SELECT count(*)
+	FROM pg_buffercache b
+	JOIN rels r ON b.relfilenode = r.filenode
+	WHERE b.reldatabase = (SELECT oid FROM pg_database WHERE datname = current_database())
+	) / NULLIF((SELECT SUM(blocks) FROM rels), 0), 2) pct
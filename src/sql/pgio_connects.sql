@@ -0,0 +1,19 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_connects.sql
+-- Description : Report the connect phase of the worker sessions (not part of the measured window)
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+SELECT count(*)                                                              sessions
+, bool_or(c.pooled)                                                          pooled
+, r.config->>'ramp_up'                                                       ramp_up
+, ROUND(r.connect_secs, 2)                                                   "phase (s)"
+, ROUND(min(c.connect_ms), 2)                                                "min ms"
+, ROUND(avg(c.connect_ms), 2)                                                "avg ms"
+, ROUND((percentile_cont(0.95) WITHIN GROUP (ORDER BY c.connect_ms))::numeric, 2) "p95 ms"
+, ROUND(max(c.connect_ms), 2)                                                "max ms"
+FROM pgio_connects c
+JOIN pgio_runs r USING (run_id)
+WHERE c.run_id = %(run_id)s
+GROUP BY r.config->>'ramp_up', r.connect_secs
@@ -0,0 +1,36 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_cpustats.sql
+-- Description : Report CPU and paging of the database host over the whole run
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+WITH d AS (
+	SELECT extract(epoch FROM MAX(ts) - MIN(ts)) runtime
+	, MAX(cpu_user + cpu_nice) - MIN(cpu_user + cpu_nice) usr
+	, MAX(cpu_system)  - MIN(cpu_system)  sys
+	, MAX(cpu_idle)    - MIN(cpu_idle)    idle
+	, MAX(cpu_iowait)  - MIN(cpu_iowait)  iowait
+	, MAX(cpu_irq + cpu_softirq) - MIN(cpu_irq + cpu_softirq) irq
+	, MAX(cpu_steal)   - MIN(cpu_steal)   steal
+	, MAX(ctxt)        - MIN(ctxt)        ctxt
+	, MAX(pgpgin)      - MIN(pgpgin)      pgpgin
+	, MAX(pgpgout)     - MIN(pgpgout)     pgpgout
+	, MAX(pswpin + pswpout) - MIN(pswpin + pswpout) swap
+	FROM pgio_hoststats
+	WHERE run_id = %(run_id)s
+), t AS (
+	SELECT *, NULLIF(usr + sys + idle + iowait + irq + steal, 0) total FROM d
+)
+SELECT ROUND(100.0 * usr / total, 1)    "usr %%"
+, ROUND(100.0 * sys / total, 1)         "sys %%"
+, ROUND(100.0 * iowait / total, 1)      "iowait %%"
+, ROUND(100.0 * irq / total, 1)         "irq %%"
+, ROUND(100.0 * steal / total, 1)       "steal %%"
+, ROUND(100.0 * idle / total, 1)        "idle %%"
+, ROUND(ctxt / NULLIF(runtime, 0))      "cs/s"
+, ROUND(pgpgin / 1024.0 / NULLIF(runtime, 0), 2)  "pgin MB/s"
+, ROUND(pgpgout / 1024.0 / NULLIF(runtime, 0), 2) "pgout MB/s"
+, ROUND(swap / NULLIF(runtime, 0))      "swap/s"
+FROM t
+WHERE total IS NOT NULL
@@ -1,6 +1,6 @@
 -----------------------------------------------------------------------------
 -- Title       : pgio_dbstats.sql
--- Description : Report database IO statistics over the last iteration 
+-- Description : Report database IO statistics over the whole run
 -- Author      : Bart Sjerps <bart@dirty-cache.com>
 -- License     : GPLv3+
 -----------------------------------------------------------------------------
@@ -12,7 +12,8 @@ SELECT to_char(last_stamp, 'HH24:MI:SS') timestamp
 , returned
 , fetched
 , updated
-, 100*reads/returned        "read %"
+, 100*reads/returned        "read %%"
+, ROUND(100*hits::numeric/NULLIF(hits+reads,0),2) "hit %%"
 , ROUND(fetched/runtime)    "fetch/s"
 , ROUND(reads/runtime)      "reads/s"
 , ROUND(updated/runtime)    "writes/s"
@@ -20,13 +21,14 @@ SELECT to_char(last_stamp, 'HH24:MI:SS') timestamp
 FROM (
 	SELECT ts
 	, max(ts) OVER () last_stamp
-	, extract(epoch FROM ts - lag(ts) OVER ()) runtime  -- runtime in seconds
-	, blks_hit     - lag(blks_hit)     OVER () hits     -- Number of times disk blocks were found already in the db buffer cache
-	, blks_read    - lag(blks_read)    OVER () reads    -- Number of disk blocks read in this database
-	, tup_returned - lag(tup_returned) OVER () returned -- Number of live rows fetched by sequential scans and index entries returned by index scans in this database
-	, tup_fetched  - lag(tup_fetched)  OVER () fetched  -- Number of live rows fetched by index scans in this database
-	, tup_updated  - lag(tup_updated)  OVER () updated  -- Number of rows updated by queries in this database
+	, extract(epoch FROM ts - first_value(ts) OVER w) runtime  -- runtime in seconds
+	, blks_hit     - first_value(blks_hit)     OVER w hits     -- Number of times disk blocks were found already in the db buffer cache
+	, blks_read    - first_value(blks_read)    OVER w reads    -- Number of disk blocks read in this database
+	, tup_returned - first_value(tup_returned) OVER w returned -- Number of live rows fetched by sequential scans and index entries returned by index scans in this database
+	, tup_fetched  - first_value(tup_fetched)  OVER w fetched  -- Number of live rows fetched by index scans in this database
+	, tup_updated  - first_value(tup_updated)  OVER w updated  -- Number of rows updated by queries in this database
 	FROM pgio_dbstats
-	ORDER BY ts
+	WHERE run_id = %(run_id)s
+	WINDOW w AS (ORDER BY ts)
 ) t
 WHERE ts = last_stamp
@@ -8,7 +8,23 @@
 DROP TABLE IF EXISTS pgio_seed;
 DROP TABLE IF EXISTS pgio_table_stats;
 DROP TABLE IF EXISTS pgio_dbstats;
-DROP FUNCTION IF EXISTS mypgio(varchar, int4, int8, int8, int4, int4);
-DROP FUNCTION IF EXISTS pgio_fts(varchar, int8);
+DROP TABLE IF EXISTS pgio_latency_hist;
+DROP TABLE IF EXISTS pgio_relstats;
+DROP TABLE IF EXISTS pgio_iostats;
+DROP TABLE IF EXISTS pgio_diskstats;
+DROP TABLE IF EXISTS pgio_hoststats;
+DROP TABLE IF EXISTS pgio_walstats;
+DROP TABLE IF EXISTS pgio_connects;
+DROP TABLE IF EXISTS pgio_table_chunks;
+DROP TABLE IF EXISTS pgio_tables;
+DROP TABLE IF EXISTS pgio_sweep;
+DROP TABLE IF EXISTS pgio_runs;
+DROP TABLE IF EXISTS pgio_cache_events;
+DROP TABLE IF EXISTS pgio_agents;
+DROP TABLE IF EXISTS pgio_progress;
+DROP PROCEDURE IF EXISTS mypgio;
+DROP FUNCTION IF EXISTS pgio_save_progress;
+DROP PROCEDURE IF EXISTS pgio_fts;
 DROP FUNCTION IF EXISTS pgio_get_random_number(int8, int8);
+DROP FUNCTION IF EXISTS pgio_permute(int8, int8, int8);
 DROP TYPE IF EXISTS pgio_return;
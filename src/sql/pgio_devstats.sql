@@ -0,0 +1,50 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_devstats.sql
+-- Description : Report device I/O of the database host over the whole run,
+--               with the amplification vs the database I/O
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+-- read amp  = device bytes read / database blocks read (pg_stat_database)
+-- write amp = device bytes written / blocks written by all backends (pg_stat_io, PostgreSQL 16+)
+
+WITH dev AS (
+	SELECT device
+	, extract(epoch FROM MAX(ts) - MIN(ts)) runtime
+	, MAX(reads)         - MIN(reads)         reads
+	, MAX(read_sectors)  - MIN(read_sectors)  read_sectors
+	, MAX(read_ms)       - MIN(read_ms)       read_ms
+	, MAX(writes)        - MIN(writes)        writes
+	, MAX(write_sectors) - MIN(write_sectors) write_sectors
+	, MAX(write_ms)      - MIN(write_ms)      write_ms
+	, MAX(io_ms)         - MIN(io_ms)         io_ms
+	FROM pgio_diskstats
+	WHERE run_id = %(run_id)s
+	GROUP BY device
+), db AS (
+	SELECT MAX(blks_read) - MIN(blks_read) blks_read
+	FROM pgio_dbstats
+	WHERE run_id = %(run_id)s
+), io AS (
+	SELECT SUM(writes) blks_written
+	FROM (
+		SELECT MAX(writes) - MIN(writes) writes
+		FROM pgio_iostats
+		WHERE run_id = %(run_id)s
+		GROUP BY backend_type, object, context
+	) w
+)
+SELECT device
+, ROUND(reads / NULLIF(runtime, 0))                          "r/s"
+, ROUND(writes / NULLIF(runtime, 0))                         "w/s"
+, ROUND(read_sectors / 2048.0 / NULLIF(runtime, 0), 2)         "rMB/s"
+, ROUND(write_sectors / 2048.0 / NULLIF(runtime, 0), 2)        "wMB/s"
+, ROUND(read_ms::numeric / NULLIF(reads, 0), 3)                       "r_await"
+, ROUND(write_ms::numeric / NULLIF(writes, 0), 3)                     "w_await"
+, ROUND(100 * io_ms / NULLIF(runtime * 1000, 0), 1)          "util %%"
+, ROUND(read_sectors * 512.0 / NULLIF(db.blks_read * 8192, 0), 2)     "read amp"
+, ROUND(write_sectors * 512.0 / NULLIF(io.blks_written * 8192, 0), 2) "write amp"
+FROM dev, db, io
+WHERE reads + writes > 0
+ORDER BY device
@@ -0,0 +1,14 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_evict.sql
+-- Description : Evict a pgio table and its indexes from shared_buffers
+--               (pg_buffercache_evict, PostgreSQL 17+)
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+SELECT count(pg_buffercache_evict(b.bufferid)) buffers
+FROM pg_buffercache b
+JOIN pg_class c ON b.relfilenode = pg_relation_filenode(c.oid)
+WHERE b.reldatabase = (SELECT oid FROM pg_database WHERE datname = current_database())
+AND (c.oid = %(table_name)s::regclass
+  OR c.oid IN (SELECT indexrelid FROM pg_index WHERE indrelid = %(table_name)s::regclass))
@@ -5,15 +5,29 @@
 -- License     : GPLv3+
 -----------------------------------------------------------------------------
 
-CREATE OR REPLACE FUNCTION pgio_fts(v_mytab VARCHAR, v_runtime_secs BIGINT) 
-RETURNS pgio_return LANGUAGE plpgsql
+-- pgio_fts is a procedure so it can commit its heartbeats: between scans it checks
+-- pgio_runs.stop once per second and saves the counters so far in pgio_progress
+-- every v_heartbeat seconds, as mypgio does. The final counters are saved at the end.
+-- v_resume and v_final work as in mypgio, for running a worker as a series of short calls.
+
+DROP FUNCTION IF EXISTS pgio_fts(varchar, bigint);
+DROP PROCEDURE IF EXISTS pgio_fts;
+CREATE PROCEDURE pgio_fts(v_mytab VARCHAR, v_runtime_secs BIGINT, v_run_id INT DEFAULT 0, v_heartbeat INT DEFAULT 10,
+	v_resume BOOLEAN DEFAULT FALSE, v_final BOOLEAN DEFAULT TRUE)
+LANGUAGE plpgsql
 AS $$
 DECLARE
-record     pgio_return%rowtype;
-v_end_time TIMESTAMP WITHOUT TIME ZONE;
-v_before   TIMESTAMP WITHOUT TIME ZONE; 
-v_count    BIGINT  := 0;
-v_tm_delta NUMERIC := 0.0;
+record       pgio_return%rowtype;
+v_end_time   TIMESTAMP WITHOUT TIME ZONE;
+v_before     TIMESTAMP WITHOUT TIME ZONE; 
+v_next_check TIMESTAMP WITHOUT TIME ZONE;
+v_next_beat  TIMESTAMP WITHOUT TIME ZONE;
+v_stop       BOOLEAN := FALSE;
+v_count      BIGINT  := 0;
+v_commits    BIGINT  := 0;
+v_tm_delta   NUMERIC := 0.0;
+v_total_tm   NUMERIC := 0.0;
+v_bucket     INT     := 0;
 
 BEGIN
 	record.mypid                = pg_backend_pid();
@@ -24,21 +38,66 @@ BEGIN
 	record.loop_iterations      = 0;
 	record.select_blk_touch_cnt = 0;
 	record.update_blk_touch_cnt = 0;
-	
-	v_end_time := clock_timestamp() + (v_runtime_secs || ' seconds')::interval;
+	record.select_hist          = array_fill(0::bigint, ARRAY[32]);
+	record.update_hist          = array_fill(0::bigint, ARRAY[32]);
+
+	IF ( v_resume ) THEN
+		SELECT loop_iterations, sql_selects, sql_select_max_tm, select_blk_touch_cnt, select_hist, commits, select_tm
+		INTO record.loop_iterations, record.sql_selects, record.sql_select_max_tm, record.select_blk_touch_cnt, record.select_hist, v_commits, v_total_tm
+		FROM pgio_progress WHERE run_id = v_run_id AND mypid = record.mypid;
+		IF ( NOT FOUND ) THEN
+			record.loop_iterations      = 0;
+			record.sql_selects          = 0;
+			record.sql_select_max_tm    = 0.0;
+			record.select_blk_touch_cnt = 0;
+			record.select_hist          = array_fill(0::bigint, ARRAY[32]);
+			v_commits                   = 0;
+			v_total_tm                  = 0.0;
+		END IF;
+	END IF;
 
-	WHILE ( clock_timestamp()::timestamp < v_end_time ) LOOP
+	v_end_time   := clock_timestamp() + (v_runtime_secs || ' seconds')::interval;
+	v_next_check := clock_timestamp() + interval '1 second';
+	v_next_beat  := clock_timestamp() + (v_heartbeat || ' seconds')::interval;
+
+	WHILE ( clock_timestamp()::timestamp < v_end_time AND NOT v_stop ) LOOP
 		v_before := clock_timestamp();
 		EXECUTE 'SELECT COUNT(scratch) FROM ' || v_mytab INTO v_count;
 		v_tm_delta := cast(extract(epoch from (clock_timestamp() - v_before)) AS NUMERIC(12,8));
+		v_total_tm := v_total_tm + v_tm_delta;
+		v_bucket   := LEAST(31, floor(ln(GREATEST(v_tm_delta * 1000000, 1)::float8) / ln(2::float8))::int) + 1;
+		record.select_hist[v_bucket] := record.select_hist[v_bucket] + 1;
 		IF ( v_tm_delta > record.sql_select_max_tm ) THEN
 			record.sql_select_max_tm := v_tm_delta;
 		END IF;
 		record.loop_iterations      = record.loop_iterations + 1;
 		record.sql_selects          = record.sql_selects + 1;
 		record.select_blk_touch_cnt = record.select_blk_touch_cnt + v_count;
+
+		-- Between scans: check for a stop request, save progress every heartbeat
+		IF ( clock_timestamp() >= v_next_check ) THEN
+			v_next_check := clock_timestamp() + interval '1 second';
+			SELECT stop INTO v_stop FROM pgio_runs WHERE run_id = v_run_id;
+			v_stop := COALESCE(v_stop, FALSE);
+
+			IF ( clock_timestamp() >= v_next_beat ) THEN
+				v_next_beat := clock_timestamp() + (v_heartbeat || ' seconds')::interval;
+				v_commits   := v_commits + 1;
+				PERFORM pgio_save_progress(v_run_id, record.mypid, record.loop_iterations, record.sql_selects, record.sql_updates,
+					record.sql_select_max_tm, record.sql_update_max_tm, record.select_blk_touch_cnt, record.update_blk_touch_cnt,
+					record.select_hist, record.update_hist, 0, 0, v_commits, FALSE, v_total_tm, 0);
+				COMMIT;
+			END IF;
+		END IF;
 	END LOOP;
-	RETURN record;
+
+	IF ( v_stop ) THEN
+		RAISE NOTICE 'PID "%" : stopped on request', record.mypid;
+	END IF;
+
+	PERFORM pgio_save_progress(v_run_id, record.mypid, record.loop_iterations, record.sql_selects, record.sql_updates,
+		record.sql_select_max_tm, record.sql_update_max_tm, record.select_blk_touch_cnt, record.update_blk_touch_cnt,
+		record.select_hist, record.update_hist, 0, 0, v_commits + 1, v_final, v_total_tm, 0);
 END;
 $$
 ;
\ No newline at end of file
@@ -0,0 +1,31 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_history.sql
+-- Description : List all runs with their main settings and results
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+SELECT r.run_id                                "run"
+, to_char(r.ts, 'YYYY-MM-DD HH24:MI:SS')       "date"
+, r.workers
+, r.runtime
+, r.options->>'engine'                         engine
+, r.config->>'update_pct'                      "upd %"
+, COALESCE(r.config->>'distribution', 'uniform') dist
+, (r.config->>'work_unit') || ':' || (r.config->>'update_unit') "units"
+, r.config->>'rows'                            "rows"
+, r.shared_buffers
+, r.tablespace
+, r.cache_state                                 "cache"
+, ROUND(s.loops/NULLIF(s.runtime,0))                 "ops/s"
+, ROUND((s.selected+s.updated)/NULLIF(s.runtime,0))  "iops"
+FROM pgio_runs r
+LEFT JOIN LATERAL (
+	SELECT extract(epoch FROM MAX(ts_end) - MIN(ts_start)) runtime
+	, SUM(loop_iterations)      loops
+	, SUM(select_blk_touch_cnt) selected
+	, SUM(update_blk_touch_cnt) updated
+	FROM pgio_table_stats t
+	WHERE t.run_id = r.run_id
+) s ON TRUE
+ORDER BY r.run_id
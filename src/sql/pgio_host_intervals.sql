@@ -0,0 +1,50 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_host_intervals.sql
+-- Description : Report database vs host device IO per sample interval
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+-- Host stats have the same timestamps as the database stats.
+-- "dev MB/s" and "util %%" are of the busiest device in the interval
+
+SELECT to_char(ts, 'HH24:MI:SS') timestamp
+, ROUND(runtime,2)                                      runtime
+, ROUND(reads/runtime)                                  "db reads/s"
+, ROUND(reads*8/1024.0/runtime,2)                       "db rMB/s"
+, ROUND(d.sectors/2048.0/runtime,2)                     "dev MB/s"
+, ROUND(d.io_ms/10.0/runtime,1)                         "util %%"
+, ROUND(100.0*(h.ticks-h.idle)/NULLIF(h.ticks,0),1)     "cpu %%"
+, ROUND(100.0*h.iowait/NULLIF(h.ticks,0),1)             "iowait %%"
+FROM (
+	SELECT ts
+	, extract(epoch FROM ts - lag(ts) OVER w) runtime
+	, blks_read - lag(blks_read) OVER w reads
+	FROM pgio_dbstats
+	WHERE run_id = %(run_id)s
+	WINDOW w AS (ORDER BY ts)
+) t
+JOIN (
+	SELECT ts, MAX(sectors) sectors, MAX(io_ms) io_ms
+	FROM (
+		SELECT ts
+		, read_sectors + write_sectors - lag(read_sectors + write_sectors) OVER w sectors
+		, io_ms - lag(io_ms) OVER w io_ms
+		FROM pgio_diskstats
+		WHERE run_id = %(run_id)s
+		WINDOW w AS (PARTITION BY device ORDER BY ts)
+	) x
+	GROUP BY ts
+) d USING (ts)
+JOIN (
+	SELECT ts
+	, cpu_user + cpu_nice + cpu_system + cpu_idle + cpu_iowait + cpu_irq + cpu_softirq + cpu_steal
+	- lag(cpu_user + cpu_nice + cpu_system + cpu_idle + cpu_iowait + cpu_irq + cpu_softirq + cpu_steal) OVER w ticks
+	, cpu_idle + cpu_iowait - lag(cpu_idle + cpu_iowait) OVER w idle
+	, cpu_iowait - lag(cpu_iowait) OVER w iowait
+	FROM pgio_hoststats
+	WHERE run_id = %(run_id)s
+	WINDOW w AS (ORDER BY ts)
+) h USING (ts)
+WHERE runtime > 0
+ORDER BY ts
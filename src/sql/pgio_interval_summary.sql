@@ -0,0 +1,36 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_interval_summary.sql
+-- Description : Min/avg/max/stddev of the database IO rates across intervals
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+SELECT metric
+, ROUND(MIN(val),2)         "min"
+, ROUND(AVG(val),2)         "avg"
+, ROUND(MAX(val),2)         "max"
+, ROUND(STDDEV_SAMP(val),2) "stddev"
+FROM (
+	SELECT reads/runtime                         reads_s
+	, updated/runtime                            writes_s
+	, (reads+updated)*8/1024.0/runtime           mib_s
+	, 100*hits::numeric/NULLIF(hits+reads,0)     hit_pct
+	FROM (
+		SELECT extract(epoch FROM ts - lag(ts) OVER w) runtime
+		, blks_hit    - lag(blks_hit)    OVER w hits
+		, blks_read   - lag(blks_read)   OVER w reads
+		, tup_updated - lag(tup_updated) OVER w updated
+		FROM pgio_dbstats
+		WHERE run_id = %(run_id)s
+		WINDOW w AS (ORDER BY ts)
+	) t
+	WHERE runtime > 0
+) i
+CROSS JOIN LATERAL (VALUES
+	(1, 'reads/s',  reads_s),
+	(2, 'writes/s', writes_s),
+	(3, 'MiB/s',    mib_s),
+	(4, 'hit %%',    hit_pct)
+) m(seq, metric, val)
+GROUP BY seq, metric
+ORDER BY seq
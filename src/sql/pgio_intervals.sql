@@ -0,0 +1,25 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_intervals.sql
+-- Description : Report database IO statistics per sample interval
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+SELECT to_char(ts, 'HH24:MI:SS') timestamp
+, ROUND(runtime,2)                                      runtime
+, ROUND(reads/runtime)                                  "reads/s"
+, ROUND(updated/runtime)                                "writes/s"
+, ROUND((reads+updated)*8/1024.0/runtime,2)             "MiB/s"
+, ROUND(100*hits::numeric/NULLIF(hits+reads,0),2)       "hit %%"
+FROM (
+	SELECT ts
+	, extract(epoch FROM ts - lag(ts) OVER w) runtime
+	, blks_hit    - lag(blks_hit)    OVER w hits
+	, blks_read   - lag(blks_read)   OVER w reads
+	, tup_updated - lag(tup_updated) OVER w updated
+	FROM pgio_dbstats
+	WHERE run_id = %(run_id)s
+	WINDOW w AS (ORDER BY ts)
+) t
+WHERE runtime > 0
+ORDER BY ts
@@ -0,0 +1,37 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_iostats.sql
+-- Description : Report pg_stat_io per backend type over the whole run (PostgreSQL 16+)
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+-- pg_stat_io is cluster wide, so this includes I/O of other databases
+
+WITH delta AS (
+	SELECT backend_type
+	, MAX(reads)      - MIN(reads)      reads
+	, MAX(hits)       - MIN(hits)       hits
+	, MAX(writes)     - MIN(writes)     writes
+	, MAX(extends)    - MIN(extends)    extends
+	, MAX(evictions)  - MIN(evictions)  evictions
+	, MAX(fsyncs)     - MIN(fsyncs)     fsyncs
+	, MAX(read_time)  - MIN(read_time)  read_time
+	, MAX(write_time) - MIN(write_time) write_time
+	FROM pgio_iostats
+	WHERE run_id = %(run_id)s
+	GROUP BY backend_type, object, context
+)
+SELECT backend_type
+, SUM(reads)     reads
+, SUM(hits)      hits
+, ROUND(100 * SUM(hits) / NULLIF(SUM(reads + hits), 0), 2) "hit %%"
+, SUM(writes)    writes
+, SUM(extends)   extends
+, SUM(evictions) evictions
+, SUM(fsyncs)    fsyncs
+, ROUND(SUM(read_time)::numeric, 1)  "read ms"
+, ROUND(SUM(write_time)::numeric, 1) "write ms"
+FROM delta
+GROUP BY backend_type
+HAVING SUM(reads + hits + writes + extends + evictions + fsyncs) > 0
+ORDER BY backend_type
@@ -0,0 +1,36 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_latency.sql
+-- Description : Latency percentiles per thread and total from the histograms
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+-- Percentiles are reported as the upper bound of the log2 bucket (in ms)
+
+WITH hist AS (
+	SELECT mypid::text pid, optype, bucket, cnt
+	FROM pgio_latency_hist
+	WHERE run_id = %(run_id)s
+	UNION ALL
+	SELECT 'Total', optype, bucket, SUM(cnt)
+	FROM pgio_latency_hist
+	WHERE run_id = %(run_id)s
+	GROUP BY optype, bucket
+), cumulative AS (
+	SELECT pid
+	, optype
+	, power(2, bucket+1)::numeric/1000                               bucket_ms
+	, SUM(cnt) OVER (PARTITION BY pid, optype ORDER BY bucket)      running
+	, SUM(cnt) OVER (PARTITION BY pid, optype)                      total
+	FROM hist
+)
+SELECT pid
+, optype                                                          "op"
+, MAX(total)                                                      "count"
+, ROUND(MIN(bucket_ms) FILTER (WHERE running >= 0.500*total), 3) "p50 (ms)"
+, ROUND(MIN(bucket_ms) FILTER (WHERE running >= 0.900*total), 3) "p90 (ms)"
+, ROUND(MIN(bucket_ms) FILTER (WHERE running >= 0.990*total), 3) "p99 (ms)"
+, ROUND(MIN(bucket_ms) FILTER (WHERE running >= 0.999*total), 3) "p99.9 (ms)"
+FROM cumulative
+GROUP BY pid, optype
+ORDER BY pid = 'Total', NULLIF(pid, 'Total')::int, optype
@@ -0,0 +1,18 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_live_stats.sql
+-- Description : Current database counters and active workers for the metrics exporter
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+SELECT (SELECT count(*)
+	FROM pg_stat_activity
+	WHERE datname = %(dbname)s
+	AND application_name ~ '^pgio_[0-9]+$'
+	AND state = 'active') workers
+, blks_read
+, blks_hit
+, tup_fetched
+, tup_updated
+FROM pg_stat_database
+WHERE datname = %(dbname)s
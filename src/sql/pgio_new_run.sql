@@ -0,0 +1,23 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_new_run.sql
+-- Description : Register a new run, returns the run_id
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+-- cache_state is the last prewarm/coldstart since the previous run,
+-- or 'previous run' if the cache is as the previous run left it
+
+INSERT INTO pgio_runs (workers, runtime, config, options, shared_buffers, server_version, tablespace, cache_state, cached_pct)
+SELECT %(workers)s, %(runtime)s, %(config)s, %(options)s
+, current_setting('shared_buffers')
+, current_setting('server_version')
+, COALESCE(%(tablespace)s, NULLIF(current_setting('default_tablespace'), ''), 'pg_default')
+, COALESCE(
+	(SELECT action
+	 FROM pgio_cache_events
+	 WHERE ts > COALESCE((SELECT MAX(ts) FROM pgio_runs), '-infinity')
+	 ORDER BY ts DESC LIMIT 1),
+	CASE WHEN EXISTS (SELECT FROM pgio_runs) THEN 'previous run' ELSE 'unknown' END)
+, %(cached_pct)s
+RETURNING run_id
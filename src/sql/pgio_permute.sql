@@ -0,0 +1,47 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_permute.sql
+-- Description : Seeded pseudo-random permutation of the keys for loading the seed table
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+-- Same permutation as lib/loader.py (Permutation): a Feistel network on the smallest
+-- even number of bits that covers v_n, with cycle walking. Maps position v_pos in
+-- [0, v_n) to a unique value in [0, v_n), without memory. All intermediate values stay
+-- below 2^62 so they fit in a bigint.
+
+CREATE OR REPLACE FUNCTION pgio_permute(v_pos bigint, v_n bigint, v_seed bigint) RETURNS bigint
+LANGUAGE plpgsql IMMUTABLE STRICT
+AS $$
+DECLARE
+	v_half	int	:= 1;
+	v_mask	bigint;
+	v_keys	bigint[]	:= ARRAY[]::bigint[];
+	v_x	bigint	:= v_pos;
+	v_left	bigint;
+	v_right	bigint;
+	v_tmp	bigint;
+	v_key	bigint;
+BEGIN
+	WHILE (1::bigint << (2 * v_half)) < v_n LOOP
+		v_half := v_half + 1;
+	END LOOP;
+	v_mask := (1::bigint << v_half) - 1;
+	FOR i IN 0..3 LOOP
+		v_keys := v_keys || ((((v_seed % 2147483647) * (i + 1) * 16807) % 2147483647) & v_mask);
+	END LOOP;
+
+	LOOP
+		v_left  := v_x >> v_half;
+		v_right := v_x & v_mask;
+		FOREACH v_key IN ARRAY v_keys LOOP
+			v_tmp   := v_right;
+			v_right := v_left # ((((v_right # v_key) * 1540483477) + (v_right >> 5)) & v_mask);
+			v_left  := v_tmp;
+		END LOOP;
+		v_x := (v_left << v_half) | v_right;
+		EXIT WHEN v_x < v_n;
+	END LOOP;
+	RETURN v_x;
+END;
+$$;
@@ -0,0 +1,13 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_prewarm.sql
+-- Description : Load a pgio table and its indexes into the cache with pg_prewarm
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+-- mode: buffer (shared_buffers), read or prefetch (OS page cache)
+
+SELECT COALESCE(SUM(pg_prewarm(c.oid, %(mode)s)), 0) blocks
+FROM pg_class c
+WHERE c.oid = %(table_name)s::regclass
+OR c.oid IN (SELECT indexrelid FROM pg_index WHERE indrelid = %(table_name)s::regclass)
@@ -0,0 +1,23 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_progress.sql
+-- Description : Counters of the mypgio() worker of this session (pgio_return layout)
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+SELECT mypid
+, loop_iterations
+, sql_selects
+, sql_updates
+, sql_select_max_tm
+, sql_update_max_tm
+, select_blk_touch_cnt
+, update_blk_touch_cnt
+, select_hist
+, update_hist
+, sql_indexed
+, sql_churn
+, commits
+FROM pgio_progress
+WHERE run_id = %(run_id)s
+AND mypid = pg_backend_pid()
@@ -0,0 +1,16 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_progress_hist.sql
+-- Description : Latency histograms of all mypgio() workers of a run so far
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+SELECT 'select' optype, bucket - 1 bucket, SUM(cnt) cnt
+FROM pgio_progress, unnest(select_hist) WITH ORDINALITY AS h(cnt, bucket)
+WHERE run_id = %(run_id)s
+GROUP BY bucket
+UNION ALL
+SELECT 'update' optype, bucket - 1 bucket, SUM(cnt) cnt
+FROM pgio_progress, unnest(update_hist) WITH ORDINALITY AS h(cnt, bucket)
+WHERE run_id = %(run_id)s
+GROUP BY bucket
@@ -1,16 +1,18 @@
 -----------------------------------------------------------------------------
 -- Title       : pgio_purgelist.sql
--- Description : Shows the excess tables to be deleted after changing schemas
+-- Description : Shows the excess tables to be deleted after changing schemas,
+--               and tables in the wrong schema after changing table_schemas
 -- Author      : Bart Sjerps <bart@dirty-cache.com>
 -- License     : GPLv3+
 -----------------------------------------------------------------------------
 
-SELECT table_name
+SELECT table_name, table_schema
 FROM (
-	SELECT table_name, LTRIM(table_name,'pgio')::INT table_num
+	SELECT table_schema, table_name, LTRIM(table_name,'pgio')::INT table_num
 	FROM information_schema.tables
-	WHERE table_schema = 'public'
-	AND table_name ~ 'pgio\d+'
+	WHERE table_schema IN ('public', table_name)
+	AND table_name ~ '^pgio\d+$'
 ) t
-WHERE table_num >= %s
+WHERE table_num >= %(schemas)s
+OR table_schema <> CASE WHEN %(table_schemas)s THEN table_name ELSE 'public' END
 ORDER BY table_num
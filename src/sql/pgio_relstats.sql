@@ -0,0 +1,40 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_relstats.sql
+-- Description : Report heap and index blocks read vs hit per table over the whole run,
+--               and the heap blocks per operation measured vs estimated from the layout
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+-- Counters only increase, so max - min is the delta over the run
+
+WITH delta AS (
+	SELECT table_name, relkind
+	, MAX(blks_read) - MIN(blks_read) reads
+	, MAX(blks_hit)  - MIN(blks_hit)  hits
+	FROM pgio_relstats
+	WHERE run_id = %(run_id)s
+	GROUP BY table_name, relation, relkind
+), ops AS (
+	SELECT table_name
+	, SUM(sql_selects + sql_updates) ops
+	, SUM(select_blk_touch_cnt + update_blk_touch_cnt) est
+	FROM pgio_table_stats
+	WHERE run_id = %(run_id)s
+	GROUP BY table_name
+)
+SELECT table_name "table"
+, SUM(reads) FILTER (WHERE relkind = 'heap')  heap_read
+, SUM(hits)  FILTER (WHERE relkind = 'heap')  heap_hit
+, ROUND(100 * SUM(hits) FILTER (WHERE relkind = 'heap')
+  / NULLIF(SUM(reads + hits) FILTER (WHERE relkind = 'heap'), 0), 2)  "heap hit %%"
+, SUM(reads) FILTER (WHERE relkind = 'index') idx_read
+, SUM(hits)  FILTER (WHERE relkind = 'index') idx_hit
+, ROUND(100 * SUM(hits) FILTER (WHERE relkind = 'index')
+  / NULLIF(SUM(reads + hits) FILTER (WHERE relkind = 'index'), 0), 2) "idx hit %%"
+, ROUND(SUM(reads + hits) FILTER (WHERE relkind = 'heap') / NULLIF(MAX(o.ops), 0), 1) "heap blks/op"
+, ROUND(MAX(o.est) / NULLIF(MAX(o.ops), 0), 1) "est blks/op"
+FROM delta
+LEFT JOIN ops o USING (table_name)
+GROUP BY table_name
+ORDER BY length(table_name), table_name
@@ -12,7 +12,7 @@ SELECT pid
 , loops
 , selects
 , updates
-, ROUND(100*updates::numeric/loops,2) "upd %"
+, ROUND(100*updates::numeric/loops,2) "upd %%"
 , ROUND(max_select,4)                 "max_select"
 , ROUND(max_update,4)                 "max_update"
 , selected                            "selected"
@@ -20,7 +20,9 @@ SELECT pid
 , ROUND(selected/runtime)             "read/s"
 , ROUND(updated/runtime)              "write/s"
 , ROUND((selected+updated)/runtime)   "iops"
-, ROUND(100*updated/NULLIF(selected+updated,0),2) "write %"
+, ROUND(100*updated/NULLIF(selected+updated,0),2) "write %%"
+, ROUND(loops/runtime)                "ops/s"
+, NULLIF(ROUND(target_rate),0)        "target/s"
 FROM (
 	SELECT mypid pid
 	, table_name            
@@ -34,6 +36,8 @@ FROM (
 	, sql_update_max_tm     max_update
 	, select_blk_touch_cnt  selected
 	, update_blk_touch_cnt  updated
+	, target_rate
 	FROM pgio_table_stats
+	WHERE run_id = %(run_id)s
 	ORDER BY pid
 ) t
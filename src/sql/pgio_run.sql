@@ -0,0 +1,30 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_run.sql
+-- Description : Run mypgio() for one worker
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+CALL mypgio(
+  v_mytab             => %(table_name)s::varchar
+, v_pctupd            => %(update_pct)s::int
+, v_runtime_secs      => %(runtime)s::bigint
+, v_scale             => %(scale)s::bigint
+, v_select_batch_size => %(work_unit)s::int
+, v_update_batch_size => %(update_unit)s::int
+, v_key_low           => %(key_low)s::bigint
+, v_key_high          => %(key_high)s::bigint
+, v_rate              => %(rate)s::numeric
+, v_dist              => %(distribution)s::varchar
+, v_theta             => %(theta)s::numeric
+, v_hot_pct           => %(hot_pct)s::numeric
+, v_hot_access        => %(hot_access)s::numeric
+, v_prepared          => %(prepared)s::boolean
+, v_run_id            => %(run_id)s::int
+, v_heartbeat         => %(heartbeat)s::int
+, v_indexed_pct       => %(indexed_pct)s::numeric
+, v_churn_pct         => %(churn_pct)s::numeric
+, v_commit_every      => %(commit_every)s::int
+, v_resume            => %(resume)s::boolean
+, v_final             => %(final)s::boolean
+)
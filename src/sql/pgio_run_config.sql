@@ -0,0 +1,24 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_run_config.sql
+-- Description : Settings that differ between two runs
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+WITH settings AS (
+	SELECT run_id, key, value
+	FROM pgio_runs
+	, jsonb_each_text(config || options || jsonb_build_object(
+		'workers',        workers,
+		'runtime',        runtime,
+		'shared_buffers', shared_buffers,
+		'server_version', server_version,
+		'tablespace',     tablespace))
+)
+SELECT key      "setting"
+, a.value       "run a"
+, b.value       "run b"
+FROM (SELECT key, value FROM settings WHERE run_id = %(run_a)s) a
+FULL JOIN (SELECT key, value FROM settings WHERE run_id = %(run_b)s) b USING (key)
+WHERE a.value IS DISTINCT FROM b.value
+ORDER BY key
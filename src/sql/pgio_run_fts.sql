@@ -0,0 +1,15 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_run_fts.sql
+-- Description : Run pgio_fts() (full table scans) for one worker
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+CALL pgio_fts(
+  v_mytab        => %(table_name)s::varchar
+, v_runtime_secs => %(runtime)s::bigint
+, v_run_id       => %(run_id)s::int
+, v_heartbeat    => %(heartbeat)s::int
+, v_resume       => %(resume)s::boolean
+, v_final        => %(final)s::boolean
+)
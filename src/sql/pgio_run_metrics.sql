@@ -0,0 +1,54 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_run_metrics.sql
+-- Description : Key metrics of one run (one row) for pgio compare
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+SELECT s.runtime                                       "runtime"
+, s.loops/NULLIF(s.runtime,0)                          "ops/s"
+, (s.selected+s.updated)/NULLIF(s.runtime,0)           "iops"
+, s.selected/NULLIF(s.runtime,0)                       "read/s"
+, s.updated/NULLIF(s.runtime,0)                        "write/s"
+, s.max_select*1000                                    "max select (ms)"
+, s.max_update*1000                                    "max update (ms)"
+, l.p50_ms                                             "p50 (ms)"
+, l.p99_ms                                             "p99 (ms)"
+, l.p999_ms                                            "p99.9 (ms)"
+, d.reads/NULLIF(d.runtime,0)                          "db reads/s"
+, d.updated/NULLIF(d.runtime,0)                        "db writes/s"
+, (d.reads+d.updated)*8/1024.0/NULLIF(d.runtime,0)     "MiB/s"
+, 100*d.hits::numeric/NULLIF(d.hits+d.reads,0)         "hit %%"
+FROM pgio_runs r
+, (
+	SELECT extract(epoch FROM MAX(ts_end) - MIN(ts_start)) runtime
+	, SUM(loop_iterations)      loops
+	, SUM(select_blk_touch_cnt) selected
+	, SUM(update_blk_touch_cnt) updated
+	, MAX(sql_select_max_tm)    max_select
+	, MAX(sql_update_max_tm)    max_update
+	FROM pgio_table_stats
+	WHERE run_id = %(run_id)s
+) s
+, (
+	SELECT extract(epoch FROM MAX(ts) - MIN(ts)) runtime
+	, MAX(blks_read)   - MIN(blks_read)   reads
+	, MAX(blks_hit)    - MIN(blks_hit)    hits
+	, MAX(tup_updated) - MIN(tup_updated) updated
+	FROM pgio_dbstats
+	WHERE run_id = %(run_id)s
+) d
+, (
+	SELECT MIN(bucket_ms) FILTER (WHERE running >= 0.500*total) p50_ms
+	, MIN(bucket_ms) FILTER (WHERE running >= 0.990*total)      p99_ms
+	, MIN(bucket_ms) FILTER (WHERE running >= 0.999*total)      p999_ms
+	FROM (
+		SELECT power(2, bucket+1)::numeric/1000 bucket_ms
+		, SUM(SUM(cnt)) OVER (ORDER BY bucket)  running
+		, SUM(SUM(cnt)) OVER ()                 total
+		FROM pgio_latency_hist
+		WHERE run_id = %(run_id)s
+		GROUP BY bucket
+	) h
+) l
+WHERE r.run_id = %(run_id)s
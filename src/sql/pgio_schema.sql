@@ -5,7 +5,67 @@
 -- License     : GPLv3+
 -----------------------------------------------------------------------------
 
-CREATE TABLE IF NOT EXISTS pgio_table_stats(mypid INT PRIMARY KEY
+CREATE TABLE IF NOT EXISTS pgio_runs(run_id INTEGER PRIMARY KEY GENERATED ALWAYS AS IDENTITY
+, ts             TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+, workers        INTEGER NOT NULL
+, runtime        INTEGER NOT NULL
+, config         JSONB NOT NULL  -- Config.info (without password)
+, options        JSONB NOT NULL  -- run options (engine, rate, ...)
+, shared_buffers TEXT
+, server_version TEXT
+, tablespace     TEXT
+);
+
+ALTER TABLE pgio_runs ADD COLUMN IF NOT EXISTS cache_state TEXT;     -- prewarm/coldstart before the run
+ALTER TABLE pgio_runs ADD COLUMN IF NOT EXISTS cached_pct  NUMERIC;  -- pct of pgio blocks in shared_buffers at the start
+
+ALTER TABLE pgio_runs ADD COLUMN IF NOT EXISTS stop BOOLEAN NOT NULL DEFAULT FALSE;  -- graceful stop requested
+
+-- Latest counters of each mypgio() worker, saved every heartbeat and at the end (final)
+CREATE TABLE IF NOT EXISTS pgio_progress(run_id INTEGER NOT NULL
+, mypid                INT NOT NULL
+, ts                   TIMESTAMP NOT NULL
+, loop_iterations      BIGINT NOT NULL
+, sql_selects          BIGINT NOT NULL
+, sql_updates          BIGINT NOT NULL
+, sql_select_max_tm    NUMERIC NOT NULL
+, sql_update_max_tm    NUMERIC NOT NULL
+, select_blk_touch_cnt BIGINT NOT NULL
+, update_blk_touch_cnt BIGINT NOT NULL
+, select_hist          BIGINT[]
+, update_hist          BIGINT[]
+, final                BOOLEAN NOT NULL DEFAULT FALSE
+, PRIMARY KEY (run_id, mypid)
+);
+
+-- Write operation types and commits (sql_updates is the total of all writes)
+ALTER TABLE pgio_progress ADD COLUMN IF NOT EXISTS sql_indexed BIGINT NOT NULL DEFAULT 0;  -- non-HOT updates of the key
+ALTER TABLE pgio_progress ADD COLUMN IF NOT EXISTS sql_churn   BIGINT NOT NULL DEFAULT 0;  -- delete + insert
+ALTER TABLE pgio_progress ADD COLUMN IF NOT EXISTS commits     BIGINT NOT NULL DEFAULT 0;
+
+-- Total latency (seconds) for the OpenMetrics histogram sums
+ALTER TABLE pgio_progress ADD COLUMN IF NOT EXISTS select_tm   NUMERIC NOT NULL DEFAULT 0;
+ALTER TABLE pgio_progress ADD COLUMN IF NOT EXISTS update_tm   NUMERIC NOT NULL DEFAULT 0;
+
+CREATE TABLE IF NOT EXISTS pgio_cache_events(ts TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+, action TEXT NOT NULL
+);
+
+-- Agents for distributed runs (pgio agent), the coordinator assigns a task and a shared start time
+CREATE TABLE IF NOT EXISTS pgio_agents(agent_id INTEGER PRIMARY KEY GENERATED ALWAYS AS IDENTITY
+, name       TEXT NOT NULL
+, host       TEXT
+, pid        INTEGER
+, registered TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp()
+, last_seen  TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp()
+, state      TEXT NOT NULL DEFAULT 'idle'  -- idle, assigned, running, done, failed
+, run_id     INTEGER
+, start_at   TIMESTAMPTZ
+, task       JSONB
+);
+
+CREATE TABLE IF NOT EXISTS pgio_table_stats(run_id INTEGER
+, mypid                INT NOT NULL
 , table_name           TEXT NOT NULL
 , ts_start             TIMESTAMP NOT NULL
 , ts_end               TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
@@ -18,9 +78,21 @@ CREATE TABLE IF NOT EXISTS pgio_table_stats(mypid INT PRIMARY KEY
 , sql_update_max_tm    NUMERIC NOT NULL
 , select_blk_touch_cnt BIGINT NOT NULL
 , update_blk_touch_cnt BIGINT NOT NULL
+, target_rate          NUMERIC NOT NULL DEFAULT 0
 );
 
+-- Upgrade from versions without run history (mypid was the primary key)
+ALTER TABLE pgio_table_stats ADD COLUMN IF NOT EXISTS target_rate NUMERIC NOT NULL DEFAULT 0;
+ALTER TABLE pgio_table_stats ADD COLUMN IF NOT EXISTS run_id INTEGER;
+ALTER TABLE pgio_table_stats DROP CONSTRAINT IF EXISTS pgio_table_stats_pkey;
+CREATE INDEX IF NOT EXISTS pgio_table_stats_run_idx ON pgio_table_stats(run_id, mypid);
+
+ALTER TABLE pgio_table_stats ADD COLUMN IF NOT EXISTS sql_indexed BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE pgio_table_stats ADD COLUMN IF NOT EXISTS sql_churn   BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE pgio_table_stats ADD COLUMN IF NOT EXISTS commits     BIGINT NOT NULL DEFAULT 0;
+
 CREATE TABLE IF NOT EXISTS pgio_dbstats(id INTEGER PRIMARY KEY GENERATED ALWAYS AS IDENTITY
+, run_id       INTEGER
 , ts           TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
 , blks_hit     BIGINT NOT NULL
 , blks_read    BIGINT NOT NULL
@@ -28,3 +100,147 @@ CREATE TABLE IF NOT EXISTS pgio_dbstats(id INTEGER PRIMARY KEY GENERATED ALWAYS
 , tup_fetched  BIGINT NOT NULL
 , tup_updated  BIGINT NOT NULL
 );
+
+ALTER TABLE pgio_dbstats ADD COLUMN IF NOT EXISTS run_id INTEGER;
+CREATE INDEX IF NOT EXISTS pgio_dbstats_run_idx ON pgio_dbstats(run_id, ts);
+
+-- Snapshots of pg_statio_user_tables/indexes for the pgio tables
+CREATE TABLE IF NOT EXISTS pgio_relstats(run_id INTEGER NOT NULL
+, ts         TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+, table_name TEXT NOT NULL
+, relation   TEXT NOT NULL
+, relkind    TEXT NOT NULL  -- heap or index
+, tablespace TEXT
+, blks_read  BIGINT NOT NULL
+, blks_hit   BIGINT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS pgio_relstats_run_idx ON pgio_relstats(run_id, ts);
+
+-- Tuples written (pg_stat_user_tables, heap only)
+ALTER TABLE pgio_relstats ADD COLUMN IF NOT EXISTS tup_upd     BIGINT;
+ALTER TABLE pgio_relstats ADD COLUMN IF NOT EXISTS tup_hot_upd BIGINT;
+ALTER TABLE pgio_relstats ADD COLUMN IF NOT EXISTS tup_ins     BIGINT;
+ALTER TABLE pgio_relstats ADD COLUMN IF NOT EXISTS tup_del     BIGINT;
+
+-- Snapshots of pg_stat_io (PostgreSQL 16+, cluster wide)
+CREATE TABLE IF NOT EXISTS pgio_iostats(run_id INTEGER NOT NULL
+, ts           TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+, backend_type TEXT NOT NULL
+, object       TEXT NOT NULL
+, context      TEXT NOT NULL
+, reads        BIGINT NOT NULL
+, hits         BIGINT NOT NULL
+, writes       BIGINT NOT NULL
+, extends      BIGINT NOT NULL
+, evictions    BIGINT NOT NULL
+, fsyncs       BIGINT NOT NULL
+, read_time    FLOAT8 NOT NULL
+, write_time   FLOAT8 NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS pgio_iostats_run_idx ON pgio_iostats(run_id, ts);
+
+-- Snapshots of /proc/diskstats of the database host (sectors are 512 bytes)
+CREATE TABLE IF NOT EXISTS pgio_diskstats(run_id INTEGER NOT NULL
+, ts            TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+, device        TEXT NOT NULL
+, reads         BIGINT NOT NULL
+, read_sectors  BIGINT NOT NULL
+, read_ms       BIGINT NOT NULL
+, writes        BIGINT NOT NULL
+, write_sectors BIGINT NOT NULL
+, write_ms      BIGINT NOT NULL
+, io_ms         BIGINT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS pgio_diskstats_run_idx ON pgio_diskstats(run_id, ts);
+
+-- Snapshots of /proc/stat (cpu ticks) and /proc/vmstat of the database host
+CREATE TABLE IF NOT EXISTS pgio_hoststats(run_id INTEGER NOT NULL
+, ts          TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+, cpu_user    BIGINT NOT NULL
+, cpu_nice    BIGINT NOT NULL
+, cpu_system  BIGINT NOT NULL
+, cpu_idle    BIGINT NOT NULL
+, cpu_iowait  BIGINT NOT NULL
+, cpu_irq     BIGINT NOT NULL
+, cpu_softirq BIGINT NOT NULL
+, cpu_steal   BIGINT NOT NULL
+, ctxt        BIGINT NOT NULL
+, pgpgin      BIGINT NOT NULL
+, pgpgout     BIGINT NOT NULL
+, pswpin      BIGINT NOT NULL
+, pswpout     BIGINT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS pgio_hoststats_run_idx ON pgio_hoststats(run_id, ts);
+
+-- Snapshots of pg_stat_wal, pg_stat_bgwriter/pg_stat_checkpointer and the WAL position (PostgreSQL 14+, cluster wide)
+CREATE TABLE IF NOT EXISTS pgio_walstats(run_id INTEGER NOT NULL
+, ts                    TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+, wal_lsn               NUMERIC NOT NULL  -- bytes since 0/0
+, wal_records           BIGINT NOT NULL
+, wal_fpi               BIGINT NOT NULL
+, wal_bytes             NUMERIC NOT NULL
+, wal_buffers_full      BIGINT NOT NULL
+, checkpoints_timed     BIGINT NOT NULL
+, checkpoints_req       BIGINT NOT NULL
+, checkpoint_write_time DOUBLE PRECISION NOT NULL  -- ms
+, checkpoint_sync_time  DOUBLE PRECISION NOT NULL  -- ms
+, buffers_checkpoint    BIGINT NOT NULL
+, buffers_clean         BIGINT NOT NULL
+, maxwritten_clean      BIGINT NOT NULL
+, buffers_backend       BIGINT NOT NULL
+, buffers_backend_fsync BIGINT NOT NULL
+, buffers_alloc         BIGINT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS pgio_walstats_run_idx ON pgio_walstats(run_id, ts);
+
+-- Time to get the database connection of each worker session, before the measured window.
+-- With ramp-up the connects are spread over ramp_up seconds, pooled connections may be reused
+CREATE TABLE IF NOT EXISTS pgio_connects(run_id INTEGER NOT NULL
+, worker     INTEGER NOT NULL
+, connect_ms NUMERIC NOT NULL
+, pooled     BOOLEAN NOT NULL
+, PRIMARY KEY (run_id, worker)
+);
+
+ALTER TABLE pgio_runs ADD COLUMN IF NOT EXISTS connect_secs NUMERIC;  -- connect phase (ramp-up) before the measured window
+
+CREATE TABLE IF NOT EXISTS pgio_latency_hist(run_id INTEGER NOT NULL
+, mypid  INT NOT NULL
+, optype TEXT NOT NULL
+, bucket INTEGER NOT NULL  -- log2 bucket: latency in [2^bucket, 2^(bucket+1)) microseconds
+, cnt    BIGINT NOT NULL
+, PRIMARY KEY (run_id, mypid, optype, bucket)
+);
+
+CREATE TABLE IF NOT EXISTS pgio_tables(table_name TEXT PRIMARY KEY
+, rows   BIGINT NOT NULL
+, layout TEXT NOT NULL
+, ready  BOOLEAN NOT NULL DEFAULT FALSE
+, ts     TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS pgio_table_chunks(table_name TEXT NOT NULL REFERENCES pgio_tables ON DELETE CASCADE
+, part INTEGER NOT NULL
+, PRIMARY KEY (table_name, part)
+);
+
+-- Steps of the concurrency sweeps, one sweep_id per pgio sweep
+CREATE TABLE IF NOT EXISTS pgio_sweep(sweep_id INTEGER NOT NULL
+, step    INTEGER NOT NULL
+, run_id  INTEGER NOT NULL
+, ts      TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+, workers INTEGER NOT NULL
+, runtime NUMERIC
+, ops     NUMERIC  -- operations/s
+, iops    NUMERIC  -- blocks touched/s
+, reads   NUMERIC  -- database blocks read/s
+, hit_pct NUMERIC
+, p50_ms  NUMERIC
+, p99_ms  NUMERIC
+, PRIMARY KEY (sweep_id, step)
+);
@@ -1,14 +1,17 @@
 -----------------------------------------------------------------------------
 -- Title       : pgio_seed.sql
--- Description : Create the seed table for pgio
+-- Description : Load one chunk (partition) of the seed table for pgio
 -- Author      : Bart Sjerps <bart@dirty-cache.com>
 -- Original    : Kevin Closson (https://github.com/therealkevinc/pgio)
 -- License     : GPLv3+
 -----------------------------------------------------------------------------
 
-CREATE TABLE IF NOT EXISTS pgio_seed AS
-SELECT mykey::bigint
+-- The chunk holds the keys at positions low..high of the key order: a permutation
+-- of all keys (shuffled) or the keys themselves (clustered), see {key}
+
+INSERT INTO {seed} (part, mykey, scratch, filler)
+SELECT %(part)s::int
+, mykey
 , (random()*1000000000)::bigint AS scratch
-, repeat('X', 1024)::char(1024) AS filler 
-FROM generate_series(1,%s) AS mykey
-ORDER BY scratch
\ No newline at end of file
+, {filler} AS filler
+FROM (SELECT {key} AS mykey FROM generate_series(%(low)s::bigint, %(high)s::bigint) AS pos) AS keys
@@ -0,0 +1,19 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_stop.sql
+-- Description : Graceful stop: ask the workers of a run (or all active runs) to stop
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+-- Without a run_id: the runs that started less than their runtime (+ 1 minute) ago and still
+-- have live workers, i.e. sessions that saved progress that is not final yet. Runs that have
+-- no progress yet (first heartbeat) are stopped if any pgio worker session is connected
+
+UPDATE pgio_runs r SET stop = TRUE
+WHERE NOT stop
+AND (run_id = %(run_id)s
+  OR (%(run_id)s IS NULL AND ts > CURRENT_TIMESTAMP - make_interval(secs => runtime + 60)
+    AND (EXISTS (SELECT 1 FROM pgio_progress p JOIN pg_stat_activity a ON a.pid = p.mypid WHERE p.run_id = r.run_id AND NOT p.final)
+      OR (NOT EXISTS (SELECT 1 FROM pgio_progress p WHERE p.run_id = r.run_id)
+        AND EXISTS (SELECT 1 FROM pg_stat_activity a WHERE a.application_name ~ '^pgio_[0-9]+$')))))
+RETURNING run_id
@@ -21,6 +21,8 @@ SELECT 'Total' pid
 , ROUND(updated/runtime)              "write/s"
 , ROUND((selected+updated)/runtime)   "iops"
 , ROUND(100*updated/NULLIF(selected+updated,0),2) "writepct"
+, ROUND(loops/runtime)                "ops/s"
+, NULLIF(ROUND(target_rate),0)        "target/s"
 FROM (
 	SELECT COUNT(*)             threads
 	, COUNT(table_name)         tables
@@ -34,7 +36,9 @@ FROM (
 	, MAX(sql_update_max_tm)    max_update
 	, SUM(select_blk_touch_cnt) selected
 	, SUM(update_blk_touch_cnt) updated
+	, SUM(target_rate)          target_rate
 	, TO_CHAR(MIN(ts_start), 'HH24:MI:SS') ts_start
 	, TO_CHAR(MAX(ts_end), 'HH24:MI:SS')   ts_end
 	FROM pgio_table_stats
+	WHERE run_id = %(run_id)s
 ) t
@@ -0,0 +1,19 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_sweep.sql
+-- Description : Show the throughput vs latency curve of a sweep
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+SELECT step + 1        step
+, workers
+, ROUND(runtime,2)     runtime
+, ROUND(ops)           "ops/s"
+, ROUND(iops)          iops
+, ROUND(reads)         "reads/s"
+, ROUND(hit_pct,2)     "hit %%"
+, ROUND(p50_ms,3)      "p50 (ms)"
+, ROUND(p99_ms,3)      "p99 (ms)"
+FROM pgio_sweep
+WHERE sweep_id = %(sweep_id)s
+ORDER BY step
@@ -0,0 +1,46 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_sweep_step.sql
+-- Description : Save the summary of the last run as a sweep step
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+INSERT INTO pgio_sweep (sweep_id, step, run_id, workers, runtime, ops, iops, reads, hit_pct, p50_ms, p99_ms)
+SELECT %(sweep_id)s
+, %(step)s
+, %(run_id)s
+, %(workers)s
+, s.runtime
+, s.loops / NULLIF(s.runtime, 0)
+, (s.selected + s.updated) / NULLIF(s.runtime, 0)
+, d.reads / NULLIF(d.runtime, 0)
+, 100 * d.hits::numeric / NULLIF(d.hits + d.reads, 0)
+, l.p50_ms
+, l.p99_ms
+FROM (
+	SELECT extract(epoch FROM MAX(ts_end) - MIN(ts_start)) runtime
+	, SUM(loop_iterations)      loops
+	, SUM(select_blk_touch_cnt) selected
+	, SUM(update_blk_touch_cnt) updated
+	FROM pgio_table_stats
+	WHERE run_id = %(run_id)s
+) s
+, (
+	SELECT extract(epoch FROM MAX(ts) - MIN(ts)) runtime
+	, MAX(blks_read) - MIN(blks_read) reads
+	, MAX(blks_hit)  - MIN(blks_hit)  hits
+	FROM pgio_dbstats
+	WHERE run_id = %(run_id)s
+) d
+, (
+	SELECT MIN(bucket_ms) FILTER (WHERE running >= 0.50*total) p50_ms
+	, MIN(bucket_ms) FILTER (WHERE running >= 0.99*total)      p99_ms
+	FROM (
+		SELECT power(2, bucket+1)::numeric/1000 bucket_ms
+		, SUM(SUM(cnt)) OVER (ORDER BY bucket)  running
+		, SUM(SUM(cnt)) OVER ()                 total
+		FROM pgio_latency_hist
+		WHERE run_id = %(run_id)s
+		GROUP BY bucket
+	) h
+) l
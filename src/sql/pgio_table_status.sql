@@ -0,0 +1,16 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_table_status.sql
+-- Description : Setup state of the existing pgio tables (for incremental setup)
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+SELECT table_name
+, rows
+, layout
+, ready
+, relpersistence = 'u' unlogged
+, ARRAY(SELECT part FROM pgio_table_chunks c WHERE c.table_name = t.table_name ORDER BY part) parts
+FROM pgio_tables t
+JOIN pg_class ON oid = to_regclass(table_name)
+ORDER BY table_name
@@ -6,10 +6,11 @@
 -----------------------------------------------------------------------------
 
 SELECT table_schema schema
-, tablespace
+, COALESCE(tablespace, (SELECT spcname FROM pg_tablespace t JOIN pg_database d ON t.oid = d.dattablespace WHERE d.datname = current_database())) tablespace
 , table_name "table"
-, pg_size_pretty(pg_table_size(table_schema || '.' || table_name)) "size"
+, pg_size_pretty(pg_table_size(format('%I.%I', table_schema, table_name))) "size"
 FROM information_schema.tables
 JOIN pg_tables ON schemaname = table_schema AND tablename = table_name
-WHERE table_name ~ 'pgio\d+'
-ORDER BY table_name
\ No newline at end of file
+WHERE table_name ~ '^pgio\d+$'
+AND table_schema IN ('public', table_name)
+ORDER BY length(table_name), table_name
@@ -0,0 +1,52 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_tablespace_load.sql
+-- Description : Report the workload throughput per tablespace, to show how evenly the I/O is spread
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+-- The tablespace of each table comes from the relation stats of the run
+
+WITH tbs AS (
+	SELECT DISTINCT table_name, tablespace
+	FROM pgio_relstats
+	WHERE run_id = %(run_id)s AND relkind = 'heap'
+), runtime AS (
+	SELECT extract(epoch FROM MAX(ts_end) - MIN(ts_start)) runtime
+	FROM pgio_table_stats
+	WHERE run_id = %(run_id)s
+), phys AS (
+	SELECT tablespace, SUM(reads) reads
+	FROM (
+		SELECT tablespace, MAX(blks_read) - MIN(blks_read) reads
+		FROM pgio_relstats
+		WHERE run_id = %(run_id)s
+		GROUP BY tablespace, relation
+	) t
+	GROUP BY tablespace
+), load AS (
+	SELECT COALESCE(s.tablespace, '?') tablespace
+	, COUNT(DISTINCT w.table_name) tables
+	, COUNT(*)                     workers
+	, SUM(w.loop_iterations)       loops
+	, SUM(w.select_blk_touch_cnt)  selected
+	, SUM(w.update_blk_touch_cnt)  updated
+	FROM pgio_table_stats w
+	LEFT JOIN tbs s USING (table_name)
+	WHERE w.run_id = %(run_id)s
+	GROUP BY 1
+)
+SELECT l.tablespace
+, tables
+, workers
+, ROUND(loops / runtime)                    "ops/s"
+, ROUND(selected / runtime)                 "read/s"
+, ROUND(updated / runtime)                  "write/s"
+, ROUND(100 * (selected + updated) / NULLIF(SUM(selected + updated) OVER (), 0), 2) "io %%"
+, ROUND(p.reads / runtime)                  "blks read/s"
+, ROUND(100 * p.reads / NULLIF(SUM(p.reads) OVER (), 0), 2) "blks read %%"
+FROM load l
+LEFT JOIN phys p USING (tablespace)
+CROSS JOIN runtime
+WHERE runtime > 0
+ORDER BY l.tablespace
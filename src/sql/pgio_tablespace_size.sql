@@ -0,0 +1,26 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_tablespace_size.sql
+-- Description : Report the number and size of the pgio tables (+ indexes) per tablespace
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+WITH rels AS (
+	SELECT COALESCE(t.spcname, d.spcname) tablespace
+	, c.relkind
+	, pg_relation_size(c.oid) bytes
+	FROM pg_class c
+	JOIN pg_namespace n ON n.oid = c.relnamespace
+	LEFT JOIN pg_tablespace t ON t.oid = c.reltablespace
+	CROSS JOIN (SELECT spcname FROM pg_tablespace t JOIN pg_database d ON t.oid = d.dattablespace WHERE d.datname = current_database()) d
+	WHERE n.nspname IN ('public', c.relname, regexp_replace(c.relname, '_idx$', ''))
+	AND c.relname ~ '^pgio\d+(_idx)?$'
+)
+SELECT tablespace
+, COUNT(*) FILTER (WHERE relkind = 'r') tables
+, COUNT(*) FILTER (WHERE relkind = 'i') indexes
+, pg_size_pretty(SUM(bytes)) "size"
+, ROUND(100 * SUM(bytes) / NULLIF(SUM(SUM(bytes)) OVER (), 0), 2) "pct"
+FROM rels
+GROUP BY tablespace
+ORDER BY tablespace
@@ -0,0 +1,24 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_tablespace_stats.sql
+-- Description : Report heap and index blocks read vs hit per tablespace over the whole run
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+WITH delta AS (
+	SELECT tablespace, relkind
+	, MAX(blks_read) - MIN(blks_read) reads
+	, MAX(blks_hit)  - MIN(blks_hit)  hits
+	FROM pgio_relstats
+	WHERE run_id = %(run_id)s
+	GROUP BY tablespace, relation, relkind
+)
+SELECT tablespace
+, relkind
+, SUM(reads) reads
+, SUM(hits)  hits
+, ROUND(100 * SUM(hits) / NULLIF(SUM(reads + hits), 0), 2) "hit %%"
+, ROUND(SUM(reads) * 8 / 1024, 2) "MiB read"
+FROM delta
+GROUP BY tablespace, relkind
+ORDER BY tablespace, relkind
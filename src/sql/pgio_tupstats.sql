@@ -0,0 +1,32 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_tupstats.sql
+-- Description : Report the tuples written to the pgio tables and the commits over the whole run
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+-- Tuple counters from pg_stat_user_tables (max - min per table), commits from the workers
+
+WITH delta AS (
+	SELECT MAX(tup_upd)     - MIN(tup_upd)     upd
+	, MAX(tup_hot_upd) - MIN(tup_hot_upd) hot_upd
+	, MAX(tup_ins)     - MIN(tup_ins)     ins
+	, MAX(tup_del)     - MIN(tup_del)     del
+	FROM pgio_relstats
+	WHERE run_id = %(run_id)s AND relkind = 'heap'
+	GROUP BY relation
+), commits AS (
+	SELECT SUM(commits) commits, SUM(sql_updates) writes
+	FROM pgio_table_stats
+	WHERE run_id = %(run_id)s
+)
+SELECT SUM(upd)              updated
+, SUM(hot_upd)               "HOT"
+, SUM(upd - hot_upd)         "non-HOT"
+, ROUND(100 * SUM(hot_upd) / NULLIF(SUM(upd), 0), 2) "HOT %%"
+, SUM(ins)                   inserted
+, SUM(del)                   deleted
+, MAX(commits)               commits
+, ROUND(MAX(writes) / NULLIF(MAX(commits), 0)::numeric, 2) "writes/commit"
+FROM delta, commits
+HAVING SUM(upd + ins + del) > 0
@@ -0,0 +1,10 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_update_hoststats.sql
+-- Description : Save current OS cpu and vm stats of the database host
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+INSERT INTO pgio_hoststats(run_id, cpu_user, cpu_nice, cpu_system, cpu_idle, cpu_iowait, cpu_irq, cpu_softirq, cpu_steal, ctxt, pgpgin, pgpgout, pswpin, pswpout)
+VALUES (%(run_id)s, %(cpu_user)s, %(cpu_nice)s, %(cpu_system)s, %(cpu_idle)s, %(cpu_iowait)s, %(cpu_irq)s, %(cpu_softirq)s, %(cpu_steal)s
+, %(ctxt)s, %(pgpgin)s, %(pgpgout)s, %(pswpin)s, %(pswpout)s)
@@ -0,0 +1,18 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_update_iostats.sql
+-- Description : Save current pg_stat_io stats (PostgreSQL 16+)
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+INSERT INTO pgio_iostats(run_id, backend_type, object, context, reads, hits, writes, extends, evictions, fsyncs, read_time, write_time)
+SELECT %(run_id)s, backend_type, object, context
+, COALESCE(reads, 0)
+, COALESCE(hits, 0)
+, COALESCE(writes, 0)
+, COALESCE(extends, 0)
+, COALESCE(evictions, 0)
+, COALESCE(fsyncs, 0)
+, COALESCE(read_time, 0)
+, COALESCE(write_time, 0)
+FROM pg_stat_io
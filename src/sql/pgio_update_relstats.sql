@@ -0,0 +1,32 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_update_relstats.sql
+-- Description : Save current heap and index I/O stats of the pgio tables
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+WITH dbspace AS (
+	SELECT spcname
+	FROM pg_database d
+	JOIN pg_tablespace t ON t.oid = d.dattablespace
+	WHERE d.datname = %(dbname)s
+)
+INSERT INTO pgio_relstats(run_id, table_name, relation, relkind, tablespace, blks_read, blks_hit, tup_upd, tup_hot_upd, tup_ins, tup_del)
+SELECT %(run_id)s, s.relname, s.relname, 'heap', COALESCE(t.spcname, d.spcname)
+, COALESCE(s.heap_blks_read, 0), COALESCE(s.heap_blks_hit, 0)
+, u.n_tup_upd, u.n_tup_hot_upd, u.n_tup_ins, u.n_tup_del
+FROM pg_statio_user_tables s
+JOIN pg_stat_user_tables u ON u.relid = s.relid
+JOIN pg_class c ON c.oid = s.relid
+LEFT JOIN pg_tablespace t ON t.oid = c.reltablespace
+CROSS JOIN dbspace d
+WHERE s.schemaname IN ('public', s.relname) AND s.relname ~ '^pgio[0-9]+$'
+UNION ALL
+SELECT %(run_id)s, s.relname, s.indexrelname, 'index', COALESCE(t.spcname, d.spcname)
+, COALESCE(s.idx_blks_read, 0), COALESCE(s.idx_blks_hit, 0)
+, NULL, NULL, NULL, NULL
+FROM pg_statio_user_indexes s
+JOIN pg_class c ON c.oid = s.indexrelid
+LEFT JOIN pg_tablespace t ON t.oid = c.reltablespace
+CROSS JOIN dbspace d
+WHERE s.schemaname IN ('public', s.relname) AND s.relname ~ '^pgio[0-9]+$'
@@ -5,7 +5,7 @@
 -- License     : GPLv3+
 -----------------------------------------------------------------------------
 
-INSERT INTO pgio_dbstats(blks_hit, blks_read, tup_returned, tup_fetched, tup_updated)
-SELECT blks_hit, blks_read,tup_returned,tup_fetched,tup_updated
+INSERT INTO pgio_dbstats(run_id, blks_hit, blks_read, tup_returned, tup_fetched, tup_updated)
+SELECT %(run_id)s, blks_hit, blks_read,tup_returned,tup_fetched,tup_updated
 FROM pg_stat_database
-WHERE datname = %s
+WHERE datname = %(dbname)s
@@ -0,0 +1,15 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_update_walstats.sql
+-- Description : Save current WAL, checkpoint and background writer stats (PostgreSQL 14-16)
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+INSERT INTO pgio_walstats(run_id, wal_lsn, wal_records, wal_fpi, wal_bytes, wal_buffers_full
+, checkpoints_timed, checkpoints_req, checkpoint_write_time, checkpoint_sync_time
+, buffers_checkpoint, buffers_clean, maxwritten_clean, buffers_backend, buffers_backend_fsync, buffers_alloc)
+SELECT %(run_id)s, pg_current_wal_lsn() - '0/0'::pg_lsn
+, w.wal_records, w.wal_fpi, w.wal_bytes, w.wal_buffers_full
+, b.checkpoints_timed, b.checkpoints_req, b.checkpoint_write_time, b.checkpoint_sync_time
+, b.buffers_checkpoint, b.buffers_clean, b.maxwritten_clean, b.buffers_backend, b.buffers_backend_fsync, b.buffers_alloc
+FROM pg_stat_wal w, pg_stat_bgwriter b
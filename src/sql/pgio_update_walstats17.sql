@@ -0,0 +1,21 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_update_walstats17.sql
+-- Description : Save current WAL, checkpoint and background writer stats (PostgreSQL 17+)
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+-- The checkpoint counters moved to pg_stat_checkpointer, backend writes and fsyncs
+-- are no longer in pg_stat_bgwriter and come from pg_stat_io
+
+INSERT INTO pgio_walstats(run_id, wal_lsn, wal_records, wal_fpi, wal_bytes, wal_buffers_full
+, checkpoints_timed, checkpoints_req, checkpoint_write_time, checkpoint_sync_time
+, buffers_checkpoint, buffers_clean, maxwritten_clean, buffers_backend, buffers_backend_fsync, buffers_alloc)
+SELECT %(run_id)s, pg_current_wal_lsn() - '0/0'::pg_lsn
+, w.wal_records, w.wal_fpi, w.wal_bytes, w.wal_buffers_full
+, c.num_timed, c.num_requested, c.write_time, c.sync_time
+, c.buffers_written, b.buffers_clean, b.maxwritten_clean, io.writes, io.fsyncs, b.buffers_alloc
+FROM pg_stat_wal w, pg_stat_checkpointer c, pg_stat_bgwriter b
+, (SELECT COALESCE(SUM(writes), 0) writes, COALESCE(SUM(fsyncs), 0) fsyncs
+   FROM pg_stat_io
+   WHERE backend_type = 'client backend' AND object = 'relation') io
@@ -0,0 +1,41 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_wal_intervals.sql
+-- Description : Report database writes next to WAL, checkpoints and buffer writes per sample interval
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+-- Database and WAL stats are saved in the same transaction, so they have the same timestamp.
+-- ckpts is the number of checkpoints started in the interval
+
+SELECT to_char(ts, 'HH24:MI:SS') timestamp
+, ROUND(runtime, 2)                                  runtime
+, ROUND(reads / runtime)                             "reads/s"
+, ROUND(updated / runtime)                           "writes/s"
+, ROUND(wal / 1048576 / runtime, 2)                  "WAL MiB/s"
+, fpi                                                "FPI"
+, ckpts
+, checkpointer                                       "ckpt bufs"
+, bgwriter                                           "bgwriter bufs"
+, backend                                            "backend bufs"
+, ROUND(sync_time::numeric)                          "sync ms"
+FROM (
+	SELECT w.ts
+	, extract(epoch FROM w.ts - lag(w.ts) OVER win)              runtime
+	, d.blks_read          - lag(d.blks_read)          OVER win reads
+	, d.tup_updated        - lag(d.tup_updated)        OVER win updated
+	, w.wal_lsn            - lag(w.wal_lsn)            OVER win wal
+	, w.wal_fpi            - lag(w.wal_fpi)            OVER win fpi
+	, w.checkpoints_timed + w.checkpoints_req
+	  - lag(w.checkpoints_timed + w.checkpoints_req)   OVER win ckpts
+	, w.buffers_checkpoint - lag(w.buffers_checkpoint) OVER win checkpointer
+	, w.buffers_clean      - lag(w.buffers_clean)      OVER win bgwriter
+	, w.buffers_backend    - lag(w.buffers_backend)    OVER win backend
+	, w.checkpoint_sync_time - lag(w.checkpoint_sync_time) OVER win sync_time
+	FROM pgio_walstats w
+	JOIN pgio_dbstats d ON d.run_id = w.run_id AND d.ts = w.ts
+	WHERE w.run_id = %(run_id)s
+	WINDOW win AS (ORDER BY w.ts)
+) t
+WHERE runtime > 0
+ORDER BY ts
@@ -0,0 +1,42 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_walstats.sql
+-- Description : Report WAL, checkpoint and buffer write stats over the whole run
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+-- Cluster wide, so this includes WAL and writes of other databases
+
+SELECT ROUND(runtime, 2)                              runtime
+, ROUND(wal / 1048576, 2)                             "WAL MiB"
+, ROUND(wal / 1048576 / NULLIF(runtime, 0), 2)        "WAL MiB/s"
+, records                                             "WAL records"
+, fpi                                                 "FPI"
+, buffers_full                                        "buffers full"
+, timed                                               "ckpt timed"
+, req                                                 "ckpt req"
+, checkpointer                                        "ckpt bufs"
+, bgwriter                                            "bgwriter bufs"
+, backend                                             "backend bufs"
+, ROUND(100 * backend::numeric / NULLIF(checkpointer + bgwriter + backend, 0), 2) "backend %%"
+, backend_fsync                                       "backend fsyncs"
+, ROUND(write_time::numeric)                          "ckpt write ms"
+, ROUND(sync_time::numeric)                           "ckpt sync ms"
+FROM (
+	SELECT extract(epoch FROM MAX(ts) - MIN(ts))                   runtime
+	, MAX(wal_lsn)               - MIN(wal_lsn)               wal
+	, MAX(wal_records)           - MIN(wal_records)           records
+	, MAX(wal_fpi)               - MIN(wal_fpi)               fpi
+	, MAX(wal_buffers_full)      - MIN(wal_buffers_full)      buffers_full
+	, MAX(checkpoints_timed)     - MIN(checkpoints_timed)     timed
+	, MAX(checkpoints_req)       - MIN(checkpoints_req)       req
+	, MAX(buffers_checkpoint)    - MIN(buffers_checkpoint)    checkpointer
+	, MAX(buffers_clean)         - MIN(buffers_clean)         bgwriter
+	, MAX(buffers_backend)       - MIN(buffers_backend)       backend
+	, MAX(buffers_backend_fsync) - MIN(buffers_backend_fsync) backend_fsync
+	, MAX(checkpoint_write_time) - MIN(checkpoint_write_time) write_time
+	, MAX(checkpoint_sync_time)  - MIN(checkpoint_sync_time)  sync_time
+	FROM pgio_walstats
+	WHERE run_id = %(run_id)s
+	HAVING COUNT(*) > 1
+) t
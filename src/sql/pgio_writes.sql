@@ -0,0 +1,37 @@
+-----------------------------------------------------------------------------
+-- Title       : pgio_writes.sql
+-- Description : Report the write volume per write operation type
+-- Author      : Bart Sjerps <bart@dirty-cache.com>
+-- License     : GPLv3+
+-----------------------------------------------------------------------------
+
+-- Rows written per operation: update and indexed rewrite update_unit rows,
+-- churn deletes and re-inserts them (1 row per block with the default layout)
+
+WITH ops AS (
+	SELECT SUM(sql_updates - sql_indexed - sql_churn) updates
+	, SUM(sql_indexed) indexed
+	, SUM(sql_churn)   churn
+	, SUM(sql_updates) writes
+	, MAX(update_unit) update_unit
+	, extract(epoch FROM MAX(ts_end) - MIN(ts_start)) runtime
+	FROM pgio_table_stats
+	WHERE run_id = %(run_id)s
+), writeops AS (
+	SELECT 1 seq, 'update' op, 'scratch column (HOT)' description, updates cnt, updates * update_unit written, writes, runtime FROM ops
+	UNION ALL
+	SELECT 2, 'indexed', 'key column (non-HOT)', indexed, indexed * update_unit, writes, runtime FROM ops
+	UNION ALL
+	SELECT 3, 'churn', 'delete + insert', churn, 2 * churn * update_unit, writes, runtime FROM ops
+)
+SELECT op "write op"
+, description
+, cnt ops
+, ROUND(100 * cnt::numeric / NULLIF(writes, 0), 2) "pct"
+, ROUND(cnt / NULLIF(runtime, 0)) "ops/s"
+, written "rows"
+, ROUND(written / NULLIF(runtime, 0)) "rows/s"
+, ROUND(written * 8 / 1024 / NULLIF(runtime, 0)::numeric, 2) "MiB/s"
+FROM writeops
+WHERE writes > 0
+ORDER BY seq
@@ -0,0 +1,11 @@
+"""
+conftest.py - pytest setup for the pypgio tests
+Copyright (c) 2024 - Bart Sjerps <bart@dirty-cache.com>
+License: GPLv3+
+
+The tests import the modules from src, as pgio.py does when it runs from a checkout.
+"""
+
+import os, sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
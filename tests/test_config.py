@@ -0,0 +1,40 @@
+"""
+test_config.py - Tests for the key range and table placement helpers
+Copyright (c) 2024 - Bart Sjerps <bart@dirty-cache.com>
+License: GPLv3+
+"""
+
+import pytest
+
+from lib.config import key_range, chunks, place_tables
+
+def test_key_range():
+    assert key_range(100, 0, 1) == (1, 101)
+    assert key_range(10, 0, 3) == (1, 4)
+    assert key_range(10, 2, 3) == (7, 11)
+
+def test_key_ranges_are_disjoint():
+    ranges = [key_range(1000, part, 7) for part in range(7)]
+    assert ranges[0][0] == 1 and ranges[-1][1] == 1001
+    assert all(high == low for (_, high), (low, _) in zip(ranges, ranges[1:]))
+
+def test_chunks_cover_all_keys():
+    for rows in (1, 16383, 16384, 100000, 2**24 + 7):
+        parts = chunks(rows)
+        assert parts[0][0] == 1 and parts[-1][1] == rows + 1
+        assert all(high == low for (_, high), (low, _) in zip(parts, parts[1:]))
+        assert len(parts) <= 1024
+
+def test_chunks_depend_on_rows_only():
+    assert chunks(100000) == chunks(100000)
+    assert len(chunks(100, min_rows=10)) == 10
+
+def test_place_tables():
+    assert place_tables(3, None) == [None, None, None]
+    assert place_tables(4, 'a,b') == ['a', 'b', 'a', 'b']
+    placement = place_tables(8, 'a:3,b')
+    assert placement.count('a') == 6 and placement.count('b') == 2
+    # Smooth round robin: b is not at the end
+    assert placement.index('b') < 4
+    with pytest.raises(ValueError):
+        place_tables(2, 'a:0')
@@ -0,0 +1,58 @@
+"""
+test_database.py - Tests of the loaders against a PostgreSQL database
+Copyright (c) 2024 - Bart Sjerps <bart@dirty-cache.com>
+License: GPLv3+
+
+Skipped unless PGIO_TEST_DATABASE names a database to use, the other connection
+settings come from the standard PGHOST, PGPORT, PGUSER and PGPASSWORD variables.
+The pgio schema is created in that database, use a throwaway one (scripts/selfbench
+creates a temporary cluster).
+"""
+
+import os
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip('psycopg')
+
+from lib.database import Database
+from lib.layout import Layout
+from lib.loader import shuffled_keys, permutation_seed
+
+TABLE = 'pgio_test_copy'
+
+@pytest.fixture
+def db():
+    if not os.environ.get('PGIO_TEST_DATABASE'):
+        pytest.skip('PGIO_TEST_DATABASE not set')
+    config = SimpleNamespace(dbhost=None, dbname=os.environ['PGIO_TEST_DATABASE'], dbuser=None, dbpass=None, dbport=None,
+        table_schemas=False, schemas=1, pool=False)
+    db = Database(config)
+    db.schema()
+    yield db
+    db.drop_table(TABLE)
+
+@pytest.mark.parametrize('spec', ['rows_per_block=1 filler=1024 fillfactor=10', 'rows_per_block=32 order=clustered'])
+def test_copy_chunk(db, spec):
+    layout = Layout('test', spec)
+    rows, low, high = 1000, 1, 101
+    db.create_table(TABLE, rows, layout)
+    db.copy_table(TABLE, layout, rows, 0, low, high)
+
+    data = db.fetchall(f'SELECT mykey, length(filler) filler FROM {TABLE}')
+    expected = list(shuffled_keys(low, high, rows, permutation_seed(TABLE))) if layout.order == 'shuffled' else list(range(low, high))
+    assert sorted(row.mykey for row in data) == sorted(expected)
+    assert {row.filler for row in data} == {layout.filler}
+    assert db.table_status()[TABLE].parts == [0]
+
+def test_incomplete_table_not_ready(db):
+    layout = Layout('test', 'rows_per_block=32 order=clustered')
+    db.create_table(TABLE, 1000, layout)
+    # An empty chunk is not recorded, and the table is only marked ready with all chunks loaded
+    with pytest.raises(ValueError):
+        db.copy_table(TABLE, layout, 1000, 1, 101, 101)
+    db.copy_table(TABLE, layout, 1000, 0, 1, 101)
+    with pytest.raises(ValueError):
+        db.index_table(TABLE, 2)
+    assert db.table_status()[TABLE].parts == [0]
+    assert not db.table_status()[TABLE].ready
@@ -0,0 +1,29 @@
+"""
+test_hoststats.py - Tests for the parsers of the host OS counters
+Copyright (c) 2024 - Bart Sjerps <bart@dirty-cache.com>
+License: GPLv3+
+"""
+
+from lib.hoststats import parse_diskstats, parse_stat, parse_vmstat
+
+DISKSTATS = """\
+   7       0 loop0 10 0 20 1 0 0 0 0 0 1 1 0 0 0 0
+   8       0 sda 100 5 2000 50 200 10 4000 80 0 120 130 0 0 0 0
+   8       1 sda1 90 5 1800 45 190 10 3800 75 0 110 120 0 0 0 0
+ 259       0 nvme0n1 300 0 6000 30 400 0 8000 40 0 60 70 0 0 0 0
+ 259       1 nvme0n1p1 300 0 6000 30 400 0 8000 40 0 60 70 0 0 0 0
+"""
+
+def test_parse_diskstats():
+    assert parse_diskstats(DISKSTATS) == [
+        ('sda', 100, 2000, 50, 200, 4000, 80, 120),
+        ('nvme0n1', 300, 6000, 30, 400, 8000, 40, 60)]
+
+def test_parse_stat():
+    text = "cpu  1 2 3 4 5 6 7 8 0 0\ncpu0 1 2 3 4 5 6 7 8 0 0\nintr 123\nctxt 999\n"
+    assert parse_stat(text) == {'cpu_user': 1, 'cpu_nice': 2, 'cpu_system': 3, 'cpu_idle': 4,
+        'cpu_iowait': 5, 'cpu_irq': 6, 'cpu_softirq': 7, 'cpu_steal': 8, 'ctxt': 999}
+
+def test_parse_vmstat():
+    text = "nr_free_pages 100\npgpgin 10\npgpgout 20\npswpin 1\n"
+    assert parse_vmstat(text) == {'pgpgin': 10, 'pgpgout': 20, 'pswpin': 1, 'pswpout': 0}
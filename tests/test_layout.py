@@ -0,0 +1,50 @@
+"""
+test_layout.py - Tests for the layout profiles and the block estimates
+Copyright (c) 2024 - Bart Sjerps <bart@dirty-cache.com>
+License: GPLv3+
+"""
+
+import pytest
+
+from lib.layout import Layout
+
+def test_layout_blocks_default():
+    layout = Layout('default', 'rows_per_block=1 filler=1024 fillfactor=10')
+    assert layout.range_blocks(255, 100000) == 255
+    assert layout.blocks(1000, 255, 100000) == 1000
+
+def test_layout_blocks_clustered():
+    layout = Layout('clustered', 'rows_per_block=32 order=clustered')
+    assert layout.range_blocks(1, 100000) == 1
+    assert layout.range_blocks(33, 100000) == 2
+    assert layout.blocks(3200, 0, 100000) == 100
+
+def test_layout_blocks_shuffled():
+    layout = Layout('dense', 'rows_per_block=32')
+    rows = 32 * 1000
+    # A few keys each hit another block, a range of all keys touches every block
+    assert layout.range_blocks(2, rows) == pytest.approx(2, rel=0.01)
+    assert layout.range_blocks(rows, rows) == pytest.approx(1000)
+    assert layout.range_blocks(255, rows) < 255
+
+def test_layout_blocks_brin():
+    layout = Layout('brin', 'rows_per_block=32 order=clustered index=brin')
+    rows = 32 * 10000
+    # The 9 blocks of 255 clustered keys overlap one or two block ranges of 128 blocks
+    assert layout.scan_blocks(255, rows) == pytest.approx(8.9375 - 1 + 128)
+    assert layout.blocks(255 * 10, 255, rows) == 1359
+    # A small table is scanned completely
+    assert layout.scan_blocks(255, 32 * 100) == 100
+    # No block range can be skipped on shuffled keys
+    assert Layout('brin', 'rows_per_block=32 index=brin').scan_blocks(255, rows) == 10000
+
+def test_layout_blocks_no_index():
+    layout = Layout('none', 'rows_per_block=1 filler=1024 fillfactor=10 index=none')
+    assert layout.blocks(255 * 3, 255, 100000) == 300000
+    assert layout.blocks(100000, 0, 100000) == 100000
+
+def test_layout_invalid():
+    with pytest.raises(ValueError):
+        Layout('bad', 'order=random')
+    with pytest.raises(ValueError):
+        Layout('bad', 'rows_per_block=1000')
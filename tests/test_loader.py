@@ -0,0 +1,30 @@
+"""
+test_loader.py - Tests for the key permutation of the loaders
+Copyright (c) 2024 - Bart Sjerps <bart@dirty-cache.com>
+License: GPLv3+
+"""
+
+import pytest
+
+from lib.config import chunks
+from lib.loader import Permutation, shuffled_keys, permutation_seed
+
+@pytest.mark.parametrize('n', [1, 2, 3, 5, 16, 17, 1000, 65537])
+def test_permutation_is_bijection(n):
+    permute = Permutation(n, 42)
+    assert sorted(permute(pos) for pos in range(n)) == list(range(n))
+
+def test_permutation_seed():
+    n = 10000
+    assert [Permutation(n, 1)(pos) for pos in range(100)] == [Permutation(n, 1)(pos) for pos in range(100)]
+    assert [Permutation(n, 1)(pos) for pos in range(100)] != [Permutation(n, 2)(pos) for pos in range(100)]
+    assert permutation_seed('pgio0') == permutation_seed('pgio0') != permutation_seed('pgio1')
+
+def test_shuffled_keys_span_the_table():
+    rows = 100000
+    parts = chunks(rows, min_rows=10000)
+    keys = [list(shuffled_keys(low, high, rows, 7)) for low, high in parts]
+    assert sorted(key for part in keys for key in part) == list(range(1, rows + 1))
+    # Each chunk has keys from the whole table, not a key range
+    for part in keys:
+        assert min(part) < rows // 10 and max(part) > rows - rows // 10
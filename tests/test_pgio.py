@@ -0,0 +1,36 @@
+"""
+test_pgio.py - Tests for the helpers of the pgio command (requires psycopg)
+Copyright (c) 2024 - Bart Sjerps <bart@dirty-cache.com>
+License: GPLv3+
+"""
+
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip('psycopg')
+pytest.importorskip('prettytable')
+
+from pgio import combined, each_target
+
+def test_combined():
+    head = ['runtime', 'iops', 'name']
+    rows = [[60, 1000, 'a'], [61, None, 'b'], [59, 500, 'c']]
+    assert combined(head, rows, sums=('iops',), maxes=('runtime',)) == [61, 1500, None]
+    assert combined(head, [], sums=('iops',)) == [None, None, None]
+
+def test_each_target():
+    class Targets:
+        def for_target(self, name):
+            if name == 'missing':
+                raise ValueError(name)
+            return name
+    calls = []
+    args = SimpleNamespace(targets=['default', 'db1'], func=lambda args, config: calls.append(config))
+    each_target(args, Targets())
+    assert calls == ['default', 'db1']
+    # All profiles are checked before the command runs on the first one
+    calls.clear()
+    args.targets = ['db1', 'missing']
+    with pytest.raises(ValueError):
+        each_target(args, Targets())
+    assert calls == []
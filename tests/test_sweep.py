@@ -0,0 +1,27 @@
+"""
+test_sweep.py - Tests for the concurrency sweep helpers
+Copyright (c) 2024 - Bart Sjerps <bart@dirty-cache.com>
+License: GPLv3+
+"""
+
+from decimal import Decimal
+import pytest
+
+from lib.sweep import doubling, scaling, find_knee
+
+def test_doubling():
+    assert doubling(1) == [1]
+    assert doubling(8) == [1, 2, 4, 8]
+    assert doubling(12) == [1, 2, 4, 8, 12]
+
+def test_scaling_and_knee():
+    points = [(1, 100), (2, 200), (4, 400), (8, 420)]
+    assert scaling(points) == [None, 100, 100, pytest.approx(5)]
+    assert find_knee(points, 10) == 2
+    assert find_knee(points[:3], 10) is None
+    assert scaling([(1, 0), (2, 10)]) == [None, None]
+
+def test_scaling_decimal():
+    points = [(1, Decimal('100.5')), (2, Decimal('201')), (4, Decimal('211.05'))]
+    assert scaling(points) == [None, pytest.approx(100), pytest.approx(5)]
+    assert find_knee(points, 10) == 1